@@ -0,0 +1,285 @@
+"""Times the BaseModel, EDACleaning and FeatureEngineer hot paths on synthetic King
+County data and records the results in a JSON history, flagging regressions against a
+stored baseline.
+
+Run from the repository root:
+    python -m benchmarks.run --sizes 20k 1m
+    python -m benchmarks.run --sizes 20k --update-baseline
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "future files"))
+
+from benchmarks.synthetic import SIZES, make_dataset  # noqa: E402
+
+DATA_DIR = os.path.join(ROOT, "benchmarks", "data")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+CONTINUOUS = ["sqft_living", "sqft_lot", "bedrooms", "bathrooms", "grade", "yr_built"]
+
+
+def _model(path: str, **kwargs):
+    from module6.module6_regression_model import RegressionModel
+
+    # fresh split and memo directories, so no case reads results stored by an
+    # earlier run unless it warms them itself
+    kwargs.setdefault("memo_dir", tempfile.mkdtemp())
+    model = RegressionModel(path, seed=0, split_dir=tempfile.mkdtemp(), **kwargs)
+    model.set_target("price")
+    return model
+
+
+def _engineer():
+    from feature_engineering import FeatureEngineer
+
+    return FeatureEngineer("price")
+
+
+# each case takes the dataset path, does its setup untimed and returns the timed call
+
+
+def load_file_cold(path: str):
+    model = _model(path, cache=False)
+    return lambda: model._load_file(path)
+
+
+def load_file_cached(path: str):
+    model = _model(path)
+    model._load_file(path)
+    return lambda: model._load_file(path)
+
+
+def drop_dupes(path: str):
+    model = _model(path)
+    return lambda: model.drop_dupes(save=False)
+
+
+def remove_outliers(path: str):
+    model = _model(path)
+    return lambda: model.remove_outliers(
+        ["price", "sqft_living", "sqft_lot"], save=False
+    )
+
+
+def show_correlated_pairs(path: str):
+    model = _model(path)
+    return model.show_correlated_pairs
+
+
+def show_correlated_pairs_cached(path: str):
+    # a new model on a warmed memo directory, read back from the disk tier
+    memo_dir = tempfile.mkdtemp()
+    _model(path, memo_dir=memo_dir).show_correlated_pairs()
+    return _model(path, memo_dir=memo_dir).show_correlated_pairs
+
+
+def target_encoding(path: str):
+    model = _model(path)
+    half = len(model.df) * 4 // 5
+    train, test = model.df.iloc[:half], model.df.iloc[half:]
+    engineer = _engineer()
+    return lambda: engineer.target_encoding(train, test, "zipcode", random_state=0)
+
+
+def one_hot_categories(path: str):
+    model = _model(path)
+    engineer = _engineer()
+    return lambda: engineer.one_hot_categories(model.df, ["zipcode", "grade"])
+
+
+def test_feature_combinations(path: str):
+    model = _model(path)
+    engineer = _engineer()
+    target, variables = model.df["price"], model.df[CONTINUOUS]
+    return lambda: engineer.test_feature_combinations(target, variables, random_state=0)
+
+
+def split_data(path: str):
+    model = _model(path)
+    return lambda: model.split_data(stratify=True)
+
+
+CASES = {
+    case.__name__: case
+    for case in (
+        load_file_cold,
+        load_file_cached,
+        drop_dupes,
+        remove_outliers,
+        show_correlated_pairs,
+        show_correlated_pairs_cached,
+        target_encoding,
+        one_hot_categories,
+        test_feature_combinations,
+        split_data,
+    )
+}
+
+
+def _current_rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's peak RSS mark so it covers only the timed call (Linux)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure(name: str, path: str, allocations: bool) -> dict:
+    """Run one case in this process: wall and CPU time, and peak RSS above the RSS
+    before the call, or with allocations the peak traced bytes and net blocks
+    allocated under tracemalloc"""
+    run = CASES[name](path)
+    gc.collect()
+    if allocations:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        run()
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+        return {"traced_peak_bytes": peak, "allocated_blocks": blocks}
+    rss = _current_rss()
+    _reset_peak_rss()
+    wall, cpu = time.perf_counter(), time.process_time()
+    run()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return {"wall_s": wall, "cpu_s": cpu, "peak_rss_bytes": max(_peak_rss() - rss, 0)}
+
+
+def _in_subprocess(name: str, path: str, allocations: bool) -> dict:
+    """Measure in a fresh interpreter so memory from earlier cases does not count"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(measure, name, path, allocations).result()
+
+
+def run_benchmarks(
+    sizes: list, cases: list, repeat: int = 3, allocations: bool = True
+) -> dict:
+    results = {}
+    for size in sizes:
+        path = make_dataset(size, DATA_DIR)
+        for name in cases:
+            runs = [_in_subprocess(name, path, False) for _ in range(repeat)]
+            result = min(runs, key=lambda run: run["wall_s"])
+            if allocations:
+                result.update(_in_subprocess(name, path, True))
+            results[f"{name}@{size}"] = result
+            print(f"{name}@{size}: {result['wall_s']:.4f}s", flush=True)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Cases whose wall time or peak RSS grew by more than threshold over baseline"""
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        for metric in ("wall_s", "peak_rss_bytes"):
+            old, new = baseline[key].get(metric), result.get(metric)
+            if old and new and new > old * (1 + threshold):
+                regressions.append(f"{key} {metric}: {old:.4g} -> {new:.4g}")
+    return regressions
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _read_json(path: str, default):
+    if not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json(path: str, data) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f"{path}.tmp"
+    with open(temp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp, path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["20k"], choices=list(SIZES))
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-allocations", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--results", default=RESULTS_DIR)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.sizes, args.cases, args.repeat, not args.no_allocations
+    )
+    history_path = os.path.join(args.results, "history.json")
+    baseline_path = os.path.join(args.results, "baseline.json")
+    history = _read_json(history_path, [])
+    history.append(
+        {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "results": results,
+        }
+    )
+    _write_json(history_path, history)
+
+    baseline = _read_json(baseline_path, {})
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if args.update_baseline:
+        baseline.update(results)
+        _write_json(baseline_path, baseline)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
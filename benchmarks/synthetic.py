@@ -0,0 +1,60 @@
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+SOURCE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "resources",
+    "kc_house_data.csv",
+)
+SIZES = {"20k": 20_000, "1m": 1_000_000, "10m": 10_000_000}
+CHUNK_ROWS = 1_000_000
+
+
+def synthesize(
+    source: pd.DataFrame, rows: int, rng: np.random.Generator
+) -> pd.DataFrame:
+    """Rows drawn from source with replacement, with new ids and jittered prices and
+    sizes, so the result keeps the King County schema and value ranges"""
+    sample = source.iloc[rng.integers(0, len(source), rows)].reset_index(drop=True)
+    sample["id"] = rng.integers(1_000_000, 9_999_999_999, rows)
+    sample["price"] = (sample["price"] * rng.lognormal(0, 0.1, rows)).round()
+    for column in ("sqft_living", "sqft_lot"):
+        jitter = rng.normal(1, 0.05, rows)
+        sample[column] = np.maximum((sample[column] * jitter).round(), 1).astype(
+            np.int64
+        )
+    return sample
+
+
+def make_dataset(
+    size: str, directory: str, seed: int = 0, source: Optional[str] = None
+) -> str:
+    """Write a synthetic King County csv of the named size, or reuse an existing one
+    Args:
+        size (str): key of SIZES
+        directory (str): where datasets are kept
+        seed (int, optional): generator seed. Defaults to 0.
+        source (str, optional): csv to draw rows from. Defaults to resources/kc_house_data.csv.
+    Returns:
+        str: path to the csv
+    """
+    path = os.path.join(directory, f"kc_synthetic_{size}_{seed}.csv")
+    if os.path.exists(path):
+        return path
+    os.makedirs(directory, exist_ok=True)
+    source_df = pd.read_csv(source or SOURCE, dtype={"date": str})
+    rng = np.random.default_rng(seed)
+    temp = f"{path}.tmp"
+    remaining = SIZES[size]
+    with open(temp, "w", newline="") as f:
+        header = True
+        while remaining:
+            rows = min(remaining, CHUNK_ROWS)
+            synthesize(source_df, rows, rng).to_csv(f, index=False, header=header)
+            header = False
+            remaining -= rows
+    os.replace(temp, path)
+    return path
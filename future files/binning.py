@@ -0,0 +1,202 @@
+import json
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+STRATEGIES = ("quantile", "uniform", "monotone")
+
+
+def _sample(
+    values: np.ndarray, sample_size: Optional[int], rng: np.random.Generator
+) -> np.ndarray:
+    """Non-missing values, or a random sample of sample_size of them"""
+    values = values[~np.isnan(values)]
+    if sample_size and len(values) > sample_size:
+        values = values[rng.choice(len(values), sample_size, replace=False)]
+    return values
+
+
+def quantile_edges(values: np.ndarray, n_bins: int) -> np.ndarray:
+    """Inner cut points of equal-frequency bins. Tied quantiles are merged, so heavily
+    repeated values give fewer bins."""
+    if not len(values):
+        return np.empty(0)
+    quantiles = np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1])
+    return np.unique(quantiles)
+
+
+def uniform_edges(values: np.ndarray, n_bins: int) -> np.ndarray:
+    """Inner cut points of equal-width bins between the smallest and largest value"""
+    if not len(values):
+        return np.empty(0)
+    return np.unique(np.linspace(values.min(), values.max(), n_bins + 1)[1:-1])
+
+
+def monotone_edges(
+    values: np.ndarray, y: np.ndarray, n_bins: int, prebins: Optional[int] = None
+) -> np.ndarray:
+    """Inner cut points of bins whose target means rise or fall monotonically with the
+    value. Fine quantile bins are pooled with the pool adjacent violators algorithm in
+    the direction of the value's correlation with the target, then the adjacent bins
+    with the closest means are merged until at most n_bins remain.
+    Args:
+        values (np.ndarray): non-missing feature values
+        y (np.ndarray): target values for the same rows
+        n_bins (int): most bins kept
+        prebins (int, optional): quantile bins to start from. Defaults to 4 * n_bins.
+    """
+    cuts = quantile_edges(values, prebins or 4 * n_bins)
+    codes = np.searchsorted(cuts, values, side="left")
+    counts = np.bincount(codes, minlength=len(cuts) + 1).astype(np.float64)
+    sums = np.bincount(codes, weights=y, minlength=len(cuts) + 1)
+    sign = 1.0 if np.cov(values, y)[0, 1] >= 0 else -1.0
+
+    # each block holds its target sum, row count and the index of its last prebin
+    blocks = []
+    for i in range(len(counts)):
+        if counts[i] == 0:
+            continue
+        blocks.append([sums[i], counts[i], i])
+        while (
+            len(blocks) > 1
+            and sign * blocks[-2][0] / blocks[-2][1]
+            >= sign * blocks[-1][0] / blocks[-1][1]
+        ):
+            total, count, last = blocks.pop()
+            blocks[-1][0] += total
+            blocks[-1][1] += count
+            blocks[-1][2] = last
+    while len(blocks) > n_bins:
+        means = np.array([total / count for total, count, _ in blocks])
+        i = int(np.argmin(np.diff(means) * sign))
+        total, count, last = blocks.pop(i + 1)
+        blocks[i][0] += total
+        blocks[i][1] += count
+        blocks[i][2] = last
+    return cuts[[last for _, _, last in blocks[:-1]]]
+
+
+class Binner:
+    def __init__(
+        self,
+        columns: Union[str, list],
+        n_bins: int = 10,
+        strategy: str = "quantile",
+        sample_size: Optional[int] = 100_000,
+        random_state: Optional[int] = None,
+    ):
+        """Bins numeric columns into integer codes from edges fitted once and stored,
+        so the same edges are applied to training and scoring rows. Edges come from a
+        sorted sample of each column, or can be set directly, such as from a streaming
+        quantile sketch. Codes run from 0, with -1 for missing values; values outside
+        the fitted range fall in the first or last bin.
+        Args:
+            columns (str or list): numeric columns to bin
+            n_bins (int, optional): most bins per column. Defaults to 10.
+            strategy (str, optional): "quantile" for equal-frequency, "uniform" for
+                equal-width, or "monotone" for target means that rise or fall across
+                the bins. Defaults to "quantile".
+            sample_size (int, optional): rows sampled per column to fit edges. Defaults
+                to 100_000. None uses every row.
+            random_state (int, optional): seed for the sample. Defaults to None.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown binning strategy: {strategy}")
+        self.columns = [columns] if isinstance(columns, str) else list(columns)
+        self.n_bins = n_bins
+        self.strategy = strategy
+        self.sample_size = sample_size
+        self.random_state = random_state
+        self.edges = {}
+
+    def fit_array(self, X: np.ndarray, y: Optional[np.ndarray] = None) -> "Binner":
+        """Fit edges from an (n, len(columns)) array, cheap enough to run per CV fold
+        Args:
+            X (np.ndarray): values of the columns, in order
+            y (np.ndarray, optional): target values, needed for "monotone"
+        """
+        if self.strategy == "monotone" and y is None:
+            raise ValueError("monotone binning needs target values")
+        rng = np.random.default_rng(self.random_state)
+        for i, column in enumerate(self.columns):
+            values = np.asarray(X[:, i], dtype=np.float64)
+            if self.strategy == "monotone":
+                target = np.asarray(y, dtype=np.float64)
+                present = ~np.isnan(values)
+                values, target = values[present], target[present]
+                if self.sample_size and len(values) > self.sample_size:
+                    rows = rng.choice(len(values), self.sample_size, replace=False)
+                    values, target = values[rows], target[rows]
+                self.edges[column] = monotone_edges(values, target, self.n_bins)
+            elif self.strategy == "uniform":
+                self.edges[column] = uniform_edges(
+                    values[~np.isnan(values)], self.n_bins
+                )
+            else:
+                self.edges[column] = quantile_edges(
+                    _sample(values, self.sample_size, rng), self.n_bins
+                )
+        return self
+
+    def fit(self, df: pd.DataFrame, y=None) -> "Binner":
+        return self.fit_array(df[self.columns].to_numpy(dtype=np.float64), y)
+
+    def set_edges(self, column: str, edges) -> "Binner":
+        """Use given inner cut points for a column, such as sketched quantiles"""
+        if column not in self.columns:
+            self.columns.append(column)
+        self.edges[column] = np.unique(np.asarray(edges, dtype=np.float64))
+        return self
+
+    def transform_array(self, X: np.ndarray) -> np.ndarray:
+        """int32 bin codes for an (n, len(columns)) array of the columns' values"""
+        X = np.asarray(X, dtype=np.float64)
+        codes = np.empty(X.shape, dtype=np.int32)
+        for i, column in enumerate(self.columns):
+            codes[:, i] = np.searchsorted(self.edges[column], X[:, i], side="left")
+        codes[np.isnan(X)] = -1
+        return codes
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Bin codes as {column}_binned columns"""
+        codes = self.transform_array(df[self.columns].to_numpy(dtype=np.float64))
+        return pd.DataFrame(
+            codes,
+            index=df.index,
+            columns=[f"{column}_binned" for column in self.columns],
+        )
+
+    def fit_transform(self, df: pd.DataFrame, y=None) -> pd.DataFrame:
+        return self.fit(df, y).transform(df)
+
+    def to_dict(self) -> dict:
+        return {
+            "columns": self.columns,
+            "n_bins": self.n_bins,
+            "strategy": self.strategy,
+            "sample_size": self.sample_size,
+            "random_state": self.random_state,
+            "edges": {column: edges.tolist() for column, edges in self.edges.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "Binner":
+        edges = state.pop("edges")
+        binner = cls(**state)
+        binner.edges = {
+            column: np.asarray(values, dtype=np.float64)
+            for column, values in edges.items()
+        }
+        return binner
+
+    def save(self, path: str) -> None:
+        """Save the fitted edges as json. Edges round trip exactly, as json keeps
+        every float64 digit."""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "Binner":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
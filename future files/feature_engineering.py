@@ -4,7 +4,14 @@ import itertools
 
 from sklearn.linear_model import LinearRegression
 from sklearn.model_selection import train_test_split, cross_validate, validation_curve, cross_val_score, GridSearchCV, KFold, RepeatedKFold
-from sklearn.preprocessing import StandardScaler, PolynomialFeatures
+from sklearn.preprocessing import StandardScaler
+
+from interaction_screening import InteractionScreener
+from feature_pipeline import FeaturePipeline
+from target_encoder import TargetEncoder
+from one_hot_encoder import OneHotEncoder
+from binning import Binner
+from polynomial_features import PolynomialGenerator
 
 class FeatureEngineer():
 
@@ -33,143 +40,89 @@ class FeatureEngineer():
             df.rename(columns={field : new_name}, inplace=True)
         return df
 
-    # this function is by Max Halford at https://maxhalford.github.io/blog/target-encoding/
-    def _calc_smooth_mean(self, df, by, on, m, target_df):
-        '''Function returns a weighted mean value for the each member of a column.
-        Arguments:
-        df: The df being used to calculate the means
-        by: the column being target encoded
-        on: the thing to be encoded; almost always the learning target in this circumstance
-        m: weight before moving toward global mean; usually a min # samples
-        target_df: the target df for the mean encoding. Could be same as df or different.'''
-        # Compute the global mean
-        mean = df[on].mean() 
-
-        # Compute the number of values and the mean of each group
-        agg = df.groupby(by)[on].agg(['count', 'mean'])  
-        counts = agg['count']
-        means = agg['mean']
-
-        # Compute the "smoothed" means
-        smooth = (counts * means + m * mean) / (counts + m)
-
-        # Replace each value by the according smoothed mean
-        return round(target_df[by].map(smooth), 0) 
-
-    def target_encoding(self, x_train, x_test, encoding_target):
-        # Adding target encoding, which we will opt to try instead of one-hot with a few models
-
-        # get size of training data
-        num_of_samples = x_train.shape[0]
-
-        # determining minimum number of samples for encoding_target to use their
-        # own mean rather than expanding into the full data set mean 
-        encoding_samples = num_of_samples/x_train[encoding_target].unique().shape[0]
-
-        # create smooth additive encoded variables for encoding target
-        x_train[f"{encoding_target}_smooth"] = self._calc_smooth_mean(x_train, encoding_target, self.target, encoding_samples, x_train)
-        x_test[f"{encoding_target}_smooth"] = self._calc_smooth_mean(x_train, encoding_target, self.target, encoding_samples, x_test)
-
-        return x_train, x_test
-
-    def make_category_bins(self, df, categoricals):
+    def target_encoding(self, x_train, x_test, encoding_target, n_splits=5, random_state=None):
+        '''takes train and test dataframes holding the target, and a column or list of columns to encode
+        returns copies with a smoothed target mean {column}_smooth column for each, out of fold for the train rows
+        '''
+        encoder = TargetEncoder(encoding_target, n_splits=n_splits, random_state=random_state)
+        train_encoded = encoder.fit_transform(x_train, x_train[self.target])
+        test_encoded = encoder.transform(x_test)
 
-        bin_threshold = df.shape[0]*.10
+        return pd.concat([x_train, train_encoded], axis=1), pd.concat([x_test, test_encoded], axis=1)
 
-        for category in categoricals:
-            if len(df[category].nunique() > bin_threshold):
-                df[f"{category}_binned"] = pd.qcut(df[category], q=bin_threshold, labels=np.array(range(1,bin_threshold+1)))
-        
+    def make_category_bins(self, df, categoricals, n_bins=10, strategy="quantile", binner=None):
+        '''takes a dataframe and a list of numeric columns, and adds a {column}_binned code column for each
+        one with more than n_bins distinct values. Pass a binner from fit_binner to reuse its edges on new rows
+        returns the dataframe
+        '''
+        if binner is None:
+            binner = self.fit_binner(df, categoricals, n_bins=n_bins, strategy=strategy)
+        binned = binner.transform(df)
+        for column in binned.columns:
+            df[column] = binned[column]
         return df
-    
-    def one_hot_categories(self, df, categoricals):
 
-        df_cats_train = pd.get_dummies(df[categoricals], prefix=categoricals, drop_first=True)
-        
-        return df_cats_train
+    def fit_binner(self, df, categoricals, n_bins=10, strategy="quantile", random_state=None):
+        '''takes a dataframe and a list of numeric columns
+        returns a Binner fitted on the columns with more than n_bins distinct values, "monotone" binning
+        against the target
+        '''
+        columns = [category for category in categoricals if df[category].nunique() > n_bins]
+        binner = Binner(columns, n_bins=n_bins, strategy=strategy, random_state=random_state)
+        return binner.fit(df, df[self.target] if strategy == "monotone" else None)
+    
+    def one_hot_categories(self, df, categoricals, sparse=True):
+        '''takes a dataframe and a list of categorical columns
+        returns get_dummies style indicator columns with the first category dropped, as pandas sparse
+        columns unless sparse is False. Use fit_one_hot to encode train and test sets as CSR matrices
+        '''
+        encoder = OneHotEncoder(categoricals, drop_first=True)
+        if sparse:
+            return encoder.fit(df).transform_frame(df)
+        return pd.DataFrame(encoder.fit(df).transform(df, bool).toarray(), index=df.index, columns=encoder.feature_names())
+
+    def fit_one_hot(self, df, categoricals, drop_first=True):
+        '''takes a dataframe and a list of categorical columns
+        returns a fitted OneHotEncoder, whose transform gives a scipy CSR matrix for LinearEngine or StackingTool.
+        Categories not seen here encode as all zeros
+        '''
+        return OneHotEncoder(categoricals, drop_first=drop_first).fit(df)
 
-    def test_feature_combinations(target_values, variables):
+    def test_feature_combinations(self, target_values, variables, degree=2, include_powers=False, n_jobs=None, random_state=None):
     
         """Function takes in target price and a dataframe of independent variables, and 
         tests model improvement for each combination of variables
         ARGUMENTS:
         Y of target values
         X-dataframe of continuous features
+        degree-highest number of features combined in one interaction
+        include_powers-also test features multiplied by themselves
+        n_jobs-number of worker processes to spread the combinations across
+        random_state-seed for the train/test split
         Returns dataframe of score improvements over base score for each interaction combination"""
 
-        randomstate = np.random()
-    
-        # select our estimator and our cross validation plan
-        regression = LinearRegression()
-        cv = RepeatedKFold(n_splits=5, n_repeats=2, random_state=1)
-    
-        # prepare our scoring dataframe
-        scoring_df = pd.DataFrame()
-    
-        # prepare our lists to store our features and scores as we iterate
-        scores = []
-        feature1 = []
-        feature2 = []
-    
-        # Get a list of all of our features, and remove our target variable 'price' from the list
-        features = list(variables.columns)
-
-        # make a list of all of our possible feature combinations
-        feature_combos = itertools.combinations(features, 2)
-        feature_combos = list(feature_combos)
-    
-        # set our y-value as our target variable
-        y = target_values
-    
-        # prepare our x-value with our independent variables. We do an initial split here in order to run a 
-        # linear regression to get a base r^2 on our basic model without interactions
-        X = variables
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=randomstate)
-        base_score = round(np.mean(cross_val_score(regression, X_train, y_train, scoring='r2', cv=cv)), 4)   
-        print("Model base score is ",base_score)
-    
-        # now we run the regression on each feature combo
-        for feature in feature_combos:
-            feat1, feat2 = feature[0], feature[1]
-        
-            # create the test interaction on our data set
-            variables['test_interaction'] = variables[feat1] * variables[feat2]
-            # create a new X which includes the test interaction and drops our target value
-            X = variables
-            # make a new split so that our x-splits include the test interaction
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=randomstate)
-        
-            # Run a linear regression with cross-val just like our base model, and append the score to our scores list
-            new_score = round(np.mean(cross_val_score(regression, X_train, y_train, scoring='r2', cv=cv)), 4)
-            scores.append(new_score)
-            # put feature 1 on a list
-            feature1.append(feat1)
-            # put feature 2 on a list
-            feature2.append(feat2)
-            print(feat1, feat2, new_score)
-    
-        # load all of our lists into the scoring dataframe
-        scoring_df['feature1'] = feature1
-        scoring_df['feature2'] = feature2
-        scoring_df['scores'] = scores
-        scoring_df['improvement'] = scoring_df['scores'] - base_score
-        variables.drop('test_interaction', axis=1, inplace=True)
+        screener = InteractionScreener(degree=degree, include_powers=include_powers, n_jobs=n_jobs, random_state=random_state)
 
         # showing our improvement scores for our interactions
-
-        scoring_df.sort_values('improvement', ascending=False)
+        return screener.screen(target_values, variables)
     
+    def fit_pipeline(self, df, steps, log_target=False):
+        '''takes a dataframe holding features and the target, and a list of feature_pipeline steps
+        returns a fitted FeaturePipeline that can be saved and used to score new rows
+        '''
+        pipeline = FeaturePipeline(steps, log_target=log_target)
+        return pipeline.fit(df.drop(columns=self.target), df[self.target])
+
     def add_polynomial(self, df, field, degree):
         '''takes a dataframe, a target column, and number of polynomial features
-        returns a small dataframe of polynomial features
+        returns a small dataframe of the column's powers, named field, field^2 ..., on df's index
         '''
-        values = df[field]
-        poly_array = np.array(values)
-        poly_array = poly_array.reshape(-1,1)
-        poly_fit = PolynomialFeatures(degree=degree, include_bias=False)
-        fit_features = poly_fit.fit_transform(poly_array)
-        poly_df = pd.DataFrame(fit_features)
-        return poly_df
+        return PolynomialGenerator(field, degree=degree, interactions=False).transform(df)
 
-    
-    
+    def polynomial_features(self, df, columns, degree=2, interactions=True, select=None):
+        '''takes a dataframe and a list of continuous columns
+        returns one float32 block of named powers up to degree and pairwise a*b products, on df's index.
+        select keeps only the given names, or a boolean mask over all of them
+        '''
+        generator = PolynomialGenerator(columns, degree=degree, interactions=interactions, select=select)
+        return generator.transform(df)
@@ -0,0 +1,471 @@
+import json
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from binning import Binner
+from target_encoder import TargetEncoder
+
+
+class ColumnBuffer:
+    """Named column access over one preallocated float64 work array"""
+
+    def __init__(self, work: np.ndarray, slots: dict):
+        self.work = work
+        self.slots = slots
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.work[:, self.slots[name]]
+
+    def __setitem__(self, name: str, values: np.ndarray) -> None:
+        self.work[:, self.slots[name]] = values
+
+    def set_many(self, names: list, values: np.ndarray) -> None:
+        self.work[:, [self.slots[name] for name in names]] = values
+
+
+class ColumnDict(dict):
+    """Column arrays held in a dict while a pipeline is being fitted"""
+
+    def set_many(self, names: list, values: np.ndarray) -> None:
+        for i, name in enumerate(names):
+            self[name] = values[:, i]
+
+
+class PipelineStep:
+    """A fitted transform over named float columns. Steps keep every learned
+    parameter as plain numbers or arrays so the pipeline can be saved and loaded."""
+
+    def fit(self, columns, y: Optional[np.ndarray]) -> None:
+        pass
+
+    def fit_apply(self, columns, y: Optional[np.ndarray]) -> None:
+        """Fit, then write the step's columns for the training rows. Steps whose
+        training values differ from apply, such as out-of-fold encodings, override
+        this."""
+        self.fit(columns, y)
+        self.apply(columns)
+
+    def outputs(self) -> list:
+        """Columns the step adds"""
+        return []
+
+    def removes(self) -> list:
+        """Columns the step takes out of the output"""
+        return []
+
+    def apply(self, columns) -> None:
+        pass
+
+    def get_state(self) -> dict:
+        return dict(self.__dict__)
+
+    def set_state(self, state: dict) -> None:
+        self.__dict__.update(state)
+
+
+class LogTransform(PipelineStep):
+    def __init__(self, columns: Optional[list] = None):
+        self.columns = columns or []
+
+    def apply(self, columns) -> None:
+        for name in self.columns:
+            columns[name] = np.log(columns[name])
+
+
+class Binarize(PipelineStep):
+    def __init__(self, field: Optional[str] = None, new_name: Optional[str] = None):
+        self.field = field
+        self.new_name = new_name
+
+    def outputs(self) -> list:
+        return [self.new_name] if self.new_name else []
+
+    def removes(self) -> list:
+        return [self.field] if self.new_name else []
+
+    def apply(self, columns) -> None:
+        columns[self.new_name or self.field] = columns[self.field] > 0
+
+
+class TargetEncode(PipelineStep):
+    def __init__(
+        self,
+        columns: Optional[list] = None,
+        min_samples: Optional[float] = None,
+        n_splits: int = 5,
+        random_state: Optional[int] = None,
+    ):
+        """Smoothed target mean per category, added as a {column}_smooth column, from
+        target_encoder.TargetEncoder. Training rows are encoded out of fold while the
+        pipeline is fitted, so no row sees its own target; transform uses means over
+        all training rows. Unseen categories get the global mean.
+        Args:
+            columns (list): categorical columns to encode
+            min_samples (float, optional): weight of the global mean. Defaults to rows
+                per category, as in FeatureEngineer.target_encoding.
+            n_splits (int, optional): folds for the training encodings. Defaults to 5.
+            random_state (int, optional): seed for the fold shuffle. Defaults to None.
+        """
+        self.columns = columns or []
+        self.min_samples = min_samples
+        self.n_splits = n_splits
+        self.random_state = random_state
+        self.categories = {}
+        self.means = {}
+        self.global_mean = 0.0
+
+    def _encoder(self, columns, y: np.ndarray) -> tuple:
+        """Fitted TargetEncoder and the out-of-fold encodings of the training rows"""
+        encoder = TargetEncoder(
+            self.columns, self.n_splits, self.min_samples, self.random_state
+        )
+        frame = pd.DataFrame({name: columns[name] for name in self.columns})
+        return encoder, encoder.fit_transform(frame, y)
+
+    def _learn(self, encoder: TargetEncoder, y: np.ndarray) -> None:
+        """Keep the encoder's full-data means as sorted category and mean arrays"""
+        self.global_mean = float(np.mean(y))
+        for name in self.columns:
+            categories = np.sort(encoder.categories[name].to_numpy(dtype=np.float64))
+            self.categories[name] = categories
+            self.means[name] = (
+                encoder.transform(pd.DataFrame({name: categories}))[f"{name}_smooth"]
+                .to_numpy()
+                .copy()
+            )
+
+    def fit(self, columns, y: np.ndarray) -> None:
+        self._learn(self._encoder(columns, y)[0], y)
+
+    def fit_apply(self, columns, y: np.ndarray) -> None:
+        encoder, encoded = self._encoder(columns, y)
+        self._learn(encoder, y)
+        for name in self.columns:
+            columns[f"{name}_smooth"] = encoded[f"{name}_smooth"].to_numpy()
+
+    def outputs(self) -> list:
+        return [f"{name}_smooth" for name in self.columns]
+
+    def apply(self, columns) -> None:
+        for name in self.columns:
+            values = columns[name]
+            categories = self.categories[name]
+            if not len(categories):
+                columns[f"{name}_smooth"] = np.full(len(values), self.global_mean)
+                continue
+            codes = np.minimum(np.searchsorted(categories, values), len(categories) - 1)
+            seen = categories[codes] == values
+            columns[f"{name}_smooth"] = np.where(
+                seen, self.means[name][codes], self.global_mean
+            )
+
+
+class OneHot(PipelineStep):
+    def __init__(self, columns: Optional[list] = None, drop_first: bool = True):
+        """Indicator columns for each learned category, replacing the column. Unseen
+        categories encode as all zeros.
+        Args:
+            columns (list): categorical columns
+            drop_first (bool, optional): drop the first category. Defaults to True.
+        """
+        self.columns = columns or []
+        self.drop_first = drop_first
+        self.categories = {}
+
+    def fit(self, columns, y: Optional[np.ndarray]) -> None:
+        for name in self.columns:
+            categories = np.unique(columns[name])
+            self.categories[name] = categories[1:] if self.drop_first else categories
+
+    def _names(self, name: str) -> list:
+        return [
+            f"{name}_{int(value) if float(value).is_integer() else value}"
+            for value in self.categories[name]
+        ]
+
+    def outputs(self) -> list:
+        return [output for name in self.columns for output in self._names(name)]
+
+    def removes(self) -> list:
+        return list(self.columns)
+
+    def apply(self, columns) -> None:
+        for name in self.columns:
+            indicators = columns[name][:, None] == self.categories[name][None, :]
+            columns.set_many(self._names(name), indicators)
+
+
+class Bin(PipelineStep):
+    def __init__(
+        self,
+        columns: Optional[list] = None,
+        n_bins: int = 10,
+        strategy: str = "quantile",
+        sample_size: Optional[int] = 100_000,
+        random_state: Optional[int] = None,
+    ):
+        """Bin codes added as {column}_binned columns, from edges learned at fit as
+        binning.Binner learns them. Missing values get -1.
+        Args:
+            columns (list): numeric columns to bin
+            n_bins (int, optional): most bins per column. Defaults to 10.
+            strategy (str, optional): "quantile", "uniform" or "monotone". Defaults
+                to "quantile".
+            sample_size (int, optional): rows sampled to fit edges. Defaults to 100_000.
+            random_state (int, optional): seed for the sample. Defaults to None.
+        """
+        self.columns = columns or []
+        self.n_bins = n_bins
+        self.strategy = strategy
+        self.sample_size = sample_size
+        self.random_state = random_state
+        self.edges = {}
+
+    def fit(self, columns, y: Optional[np.ndarray]) -> None:
+        binner = Binner(
+            self.columns,
+            self.n_bins,
+            self.strategy,
+            self.sample_size,
+            self.random_state,
+        )
+        X = np.column_stack([columns[name] for name in self.columns])
+        self.edges = binner.fit_array(X, y).edges
+
+    def outputs(self) -> list:
+        return [f"{name}_binned" for name in self.columns]
+
+    def apply(self, columns) -> None:
+        for name in self.columns:
+            values = columns[name]
+            codes = np.searchsorted(self.edges[name], values, side="left")
+            columns[f"{name}_binned"] = np.where(np.isnan(values), -1, codes)
+
+
+class Polynomial(PipelineStep):
+    def __init__(self, field: Optional[str] = None, degree: int = 2):
+        self.field = field
+        self.degree = degree
+
+    def outputs(self) -> list:
+        return [f"{self.field}^{power}" for power in range(2, self.degree + 1)]
+
+    def apply(self, columns) -> None:
+        base = columns[self.field]
+        power = base
+        for name in self.outputs():
+            power = power * base
+            columns[name] = power
+
+
+class StandardScale(PipelineStep):
+    def __init__(self, columns: Optional[list] = None):
+        """Standardize columns to zero mean and unit variance
+        Args:
+            columns (list, optional): columns to scale. Defaults to every column in the
+                output when the step is fitted.
+        """
+        self.columns = columns
+        self.mean = None
+        self.scale = None
+
+    def fit(self, columns, y: Optional[np.ndarray]) -> None:
+        if self.columns is None:
+            self.columns = list(columns.visible)
+        values = np.column_stack([columns[name] for name in self.columns])
+        self.mean = values.mean(axis=0)
+        scale = values.std(axis=0)
+        self.scale = np.where(scale == 0, 1.0, scale)
+
+    def apply(self, columns) -> None:
+        for i, name in enumerate(self.columns):
+            columns[name] = (columns[name] - self.mean[i]) / self.scale[i]
+
+
+class Drop(PipelineStep):
+    def __init__(self, columns: Optional[list] = None):
+        self.columns = columns or []
+
+    def removes(self) -> list:
+        return list(self.columns)
+
+
+STEPS = {
+    step.__name__: step
+    for step in (
+        LogTransform,
+        Binarize,
+        TargetEncode,
+        OneHot,
+        Bin,
+        Polynomial,
+        StandardScale,
+        Drop,
+    )
+}
+
+
+class FeaturePipeline:
+    def __init__(self, steps: list, log_target: bool = False):
+        """Ordered feature transforms fitted once and then applied to float arrays
+        without building DataFrames. fit plans a fixed column layout, so transforming
+        fills one preallocated work array in place and takes the output columns.
+        Args:
+            steps (list): PipelineSteps in order
+            log_target (bool, optional): model the log of the target. Defaults to False.
+        """
+        self.steps = steps
+        self.log_target = log_target
+        self.input_columns = []
+        self.output_columns = []
+        self.slots = {}
+        self._row_work = None
+
+    def fit(self, df: pd.DataFrame, y=None) -> "FeaturePipeline":
+        """Learn every step's parameters and plan the column layout
+        Args:
+            df (pd.DataFrame): input features
+            y (optional): target values, needed for target encoding
+        """
+        self._fit(df, y)
+        return self
+
+    def fit_transform(self, df: pd.DataFrame, y=None) -> pd.DataFrame:
+        """Fit and return the training features as the steps wrote them while
+        fitting, with out-of-fold target encodings rather than the in-sample means
+        transform would use"""
+        columns = self._fit(df, y)
+        return pd.DataFrame(
+            {
+                name: np.asarray(columns[name], dtype=np.float64)
+                for name in self.output_columns
+            },
+            index=df.index,
+        )
+
+    def _fit(self, df: pd.DataFrame, y=None) -> "ColumnDict":
+        self.input_columns = list(df.columns)
+        y = (
+            None
+            if y is None
+            else self.transform_target(np.asarray(y, dtype=np.float64))
+        )
+        columns = ColumnDict(
+            (name, df[name].to_numpy(dtype=np.float64)) for name in self.input_columns
+        )
+        visible = list(self.input_columns)
+        self.slots = {name: i for i, name in enumerate(self.input_columns)}
+        for step in self.steps:
+            columns.visible = visible
+            step.fit_apply(columns, y)
+            for name in step.outputs():
+                self.slots.setdefault(name, len(self.slots))
+                visible.append(name)
+            visible = [name for name in visible if name not in step.removes()]
+        self.output_columns = visible
+        self._output_slots = np.array([self.slots[name] for name in visible])
+        self._row_work = np.empty((1, len(self.slots)))
+        return columns
+
+    def transform_array(
+        self, X: np.ndarray, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Transform rows of input_columns values
+        Args:
+            X (np.ndarray): (n, len(input_columns)) input values
+            out (np.ndarray, optional): work array of shape (n, len(slots)) to reuse
+        Returns:
+            np.ndarray: contiguous (n, len(output_columns)) float64 features
+        """
+        X = np.atleast_2d(X)
+        work = out if out is not None else np.empty((len(X), len(self.slots)))
+        work[:, : len(self.input_columns)] = X
+        columns = ColumnBuffer(work, self.slots)
+        for step in self.steps:
+            step.apply(columns)
+        return work.take(self._output_slots, axis=1)
+
+    def transform_row(self, values) -> np.ndarray:
+        """Transform a single row, reusing the pipeline's own work array
+        Args:
+            values: one row of input_columns values, or a dict keyed by column
+        Returns:
+            np.ndarray: output feature vector
+        """
+        if isinstance(values, dict):
+            values = [values[name] for name in self.input_columns]
+        return self.transform_array(
+            np.asarray(values, dtype=np.float64), self._row_work
+        )[0]
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        X = df[self.input_columns].to_numpy(dtype=np.float64)
+        return pd.DataFrame(
+            self.transform_array(X), columns=self.output_columns, index=df.index
+        )
+
+    def transform_target(self, y: np.ndarray) -> np.ndarray:
+        return np.log(y) if self.log_target else y
+
+    def inverse_target(self, predictions: np.ndarray) -> np.ndarray:
+        return np.exp(predictions) if self.log_target else predictions
+
+    def save(self, path: str) -> None:
+        """Save the fitted pipeline as a .npz holding its arrays and a json layout"""
+        arrays = {}
+        steps = []
+        for i, step in enumerate(self.steps):
+            state = {}
+            for key, value in step.get_state().items():
+                if isinstance(value, np.ndarray):
+                    arrays[f"{i}.{key}"] = value
+                    state[key] = {"array": f"{i}.{key}"}
+                elif isinstance(value, dict) and any(
+                    isinstance(item, np.ndarray) for item in value.values()
+                ):
+                    for name, item in value.items():
+                        arrays[f"{i}.{key}.{name}"] = item
+                    state[key] = {
+                        "arrays": {name: f"{i}.{key}.{name}" for name in value}
+                    }
+                else:
+                    state[key] = value
+            steps.append({"step": type(step).__name__, "state": state})
+        meta = {
+            "steps": steps,
+            "log_target": self.log_target,
+            "input_columns": self.input_columns,
+            "output_columns": self.output_columns,
+            "slots": self.slots,
+        }
+        np.savez(path, __meta__=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "FeaturePipeline":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["__meta__"]))
+            steps = []
+            for entry in meta["steps"]:
+                step = object.__new__(STEPS[entry["step"]])
+                state = {}
+                for key, value in entry["state"].items():
+                    if isinstance(value, dict) and "array" in value:
+                        value = data[value["array"]]
+                    elif isinstance(value, dict) and "arrays" in value:
+                        value = {
+                            name: data[ref] for name, ref in value["arrays"].items()
+                        }
+                    state[key] = value
+                step.set_state(state)
+                steps.append(step)
+        pipeline = cls(steps, log_target=meta["log_target"])
+        pipeline.input_columns = meta["input_columns"]
+        pipeline.output_columns = meta["output_columns"]
+        pipeline.slots = meta["slots"]
+        pipeline._output_slots = np.array(
+            [pipeline.slots[name] for name in pipeline.output_columns]
+        )
+        pipeline._row_work = np.empty((1, len(pipeline.slots)))
+        return pipeline
@@ -0,0 +1,183 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import solve_triangular
+from sklearn.model_selection import RepeatedKFold, train_test_split
+
+# data shared with pool workers through the initializer, so each task only
+# pickles its list of candidate column indices
+_worker_data = {}
+
+
+def _init_worker(X, y, folds):
+    # a trailing ones column lets shorter terms be padded to a common width
+    padded = np.column_stack([X, np.ones(len(X))])
+    _worker_data.update(X=X, padded=padded, y=y, folds=folds, fits={})
+
+
+def _fold_fit(fold: int):
+    """QR factorization and base least-squares fit for one fold, cached per worker"""
+    fits = _worker_data["fits"]
+    if fold not in fits:
+        X, y = _worker_data["X"], _worker_data["y"]
+        train, test = _worker_data["folds"][fold]
+        X_train = np.column_stack([np.ones(len(train)), X[train]])
+        X_test = np.column_stack([np.ones(len(test)), X[test]])
+        Q, R = np.linalg.qr(X_train)
+        coef = solve_triangular(R, Q.T @ y[train])
+        residual = y[train] - X_train @ coef
+        test_pred = X_test @ coef
+        fits[fold] = (Q, R, X_test, residual, test_pred)
+    return fits[fold]
+
+
+def _r2(y_true: np.ndarray, y_pred: np.ndarray) -> np.ndarray:
+    """r2 of each column of y_pred against y_true"""
+    ss_res = ((y_pred - y_true[:, None]) ** 2).sum(axis=0)
+    ss_tot = ((y_true - y_true.mean()) ** 2).sum()
+    return 1 - ss_res / ss_tot
+
+
+def _score_candidates(candidates: np.ndarray) -> np.ndarray:
+    """Mean cross-validated r2 of the base model plus each candidate column, where each
+    candidate is the product of the listed feature indices. The base fit is updated
+    with one extra column per candidate through the fold's QR factorization instead
+    of refitting the regression."""
+    y, folds = _worker_data["y"], _worker_data["folds"]
+    Z = np.prod(_worker_data["padded"][:, candidates], axis=2)
+    scores = np.zeros(len(candidates))
+    for fold, (train, test) in enumerate(folds):
+        Q, R, X_test, residual, test_pred = _fold_fit(fold)
+        Z_train = Z[train]
+        QtZ = Q.T @ Z_train
+        Z_resid = Z_train - Q @ QtZ
+        ss = (Z_resid**2).sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            beta = np.where(ss > 1e-12 * len(train), (Z_resid.T @ residual) / ss, 0.0)
+        # the new column's coefficient shifts the base coefficients by -W * beta
+        W = solve_triangular(R, QtZ)
+        pred = test_pred[:, None] + (Z[test] - X_test @ W) * beta
+        scores += _r2(y[test], pred)
+    return scores / len(folds)
+
+
+class InteractionScreener:
+    def __init__(
+        self,
+        degree: int = 2,
+        include_powers: bool = False,
+        n_splits: int = 5,
+        n_repeats: int = 2,
+        test_size: float = 0.2,
+        random_state: Optional[int] = None,
+        n_jobs: Optional[int] = None,
+        chunk_size: int = 128,
+    ):
+        """Scores interaction terms by the cross-validated r2 they add to a linear
+        regression on the base features. Every fold's base regression is fitted once
+        and each candidate is scored in closed form from it, in chunks spread across
+        a process pool.
+        Args:
+            degree (int, optional): highest number of features in a term. Defaults to 2.
+            include_powers (bool, optional): also score terms that repeat a feature,
+                such as x*x. Defaults to False.
+            n_splits (int, optional): folds per repeat. Defaults to 5.
+            n_repeats (int, optional): cross validation repeats. Defaults to 2.
+            test_size (float, optional): held out before cross validating. Defaults to 0.2.
+            random_state (int, optional): seed for the train/test split. Defaults to None.
+            n_jobs (int, optional): worker processes. None or 1 runs in this process.
+            chunk_size (int, optional): candidates scored per task. Defaults to 128.
+        """
+        self.degree = degree
+        self.include_powers = include_powers
+        self.n_splits = n_splits
+        self.n_repeats = n_repeats
+        self.test_size = test_size
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+
+    def candidates(self, n_features: int) -> list:
+        """Feature index tuples for every term from two features up to degree"""
+        combine = (
+            itertools.combinations_with_replacement
+            if self.include_powers
+            else itertools.combinations
+        )
+        return [
+            term
+            for size in range(2, self.degree + 1)
+            for term in combine(range(n_features), size)
+        ]
+
+    def screen(self, target_values, variables: pd.DataFrame) -> pd.DataFrame:
+        """Score every candidate term. variables is not modified.
+        Args:
+            target_values: target values
+            variables (pd.DataFrame): continuous features
+        Returns:
+            pd.DataFrame: one row per term with its features, score and improvement
+                over the base score, best improvement first
+        """
+        features = list(variables.columns)
+        X = variables.to_numpy(dtype=np.float64)
+        y = np.asarray(target_values, dtype=np.float64)
+
+        train, _ = train_test_split(
+            np.arange(len(X)), test_size=self.test_size, random_state=self.random_state
+        )
+        X, y = X[train], y[train]
+        cv = RepeatedKFold(
+            n_splits=self.n_splits, n_repeats=self.n_repeats, random_state=1
+        )
+        folds = list(cv.split(X))
+
+        terms = self.candidates(len(features))
+        chunks = []
+        for start in range(0, len(terms), self.chunk_size):
+            chunk = terms[start : start + self.chunk_size]
+            # pad shorter terms with the workers' trailing ones column
+            width = max(len(term) for term in chunk)
+            chunks.append(
+                np.array(
+                    [term + (len(features),) * (width - len(term)) for term in chunk]
+                )
+            )
+
+        _init_worker(X, y, folds)
+        try:
+            base_score = float(
+                np.mean(
+                    [
+                        _r2(y[test], _fold_fit(fold)[4][:, None])[0]
+                        for fold, (_, test) in enumerate(folds)
+                    ]
+                )
+            )
+            print("Model base score is ", round(base_score, 4))
+            if self.n_jobs is None or self.n_jobs == 1:
+                scores = [_score_candidates(chunk) for chunk in chunks]
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=self.n_jobs,
+                    initializer=_init_worker,
+                    initargs=(X, y, folds),
+                ) as pool:
+                    scores = list(pool.map(_score_candidates, chunks))
+        finally:
+            _worker_data.clear()
+        scores = np.concatenate(scores) if scores else np.empty(0)
+
+        scoring_df = pd.DataFrame(
+            [
+                [features[i] for i in term] + [None] * (self.degree - len(term))
+                for term in terms
+            ],
+            columns=[f"feature{i + 1}" for i in range(self.degree)],
+        )
+        scoring_df["scores"] = scores
+        scoring_df["improvement"] = scoring_df["scores"] - base_score
+        return scoring_df.sort_values("improvement", ascending=False, ignore_index=True)
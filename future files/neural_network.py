@@ -0,0 +1,303 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+
+
+def stream_batches(X, y, rows, batch_size, x_buffers, y_buffers, scale, prefetch=False):
+    """Yield standardized float32 mini-batches gathered from X and y at rows, written
+    into preallocated buffers instead of new arrays. Only full batches are yielded.
+    Args:
+        X: (n, p) features, an array or memmap, read without copying it
+        y: (n,) target values
+        rows (np.ndarray): row order for this pass
+        batch_size (int): rows per batch
+        x_buffers (list): two (gather, batch) buffer pairs for the features
+        y_buffers (list): two (gather, batch) buffer pairs for the target
+        scale (tuple): x_mean, x_scale, y_mean, y_scale
+        prefetch (bool, optional): fill the next batch on a thread while the current
+            one is used. Defaults to False.
+    """
+    x_mean, x_scale, y_mean, y_scale = scale
+
+    def fill(start: int, slot: int) -> int:
+        index = rows[start : start + batch_size]
+        gather, batch = x_buffers[slot]
+        np.take(X, index, axis=0, out=gather)
+        np.subtract(gather, x_mean, out=batch, casting="unsafe")
+        batch *= x_scale
+        gather, batch = y_buffers[slot]
+        np.take(y, index, axis=0, out=gather)
+        np.subtract(gather, y_mean, out=batch[:, 0], casting="unsafe")
+        batch *= y_scale
+        return slot
+
+    starts = range(0, len(rows) - batch_size + 1, batch_size)
+    if not prefetch:
+        for start in starts:
+            yield x_buffers[fill(start, 0)][1], y_buffers[0][1]
+        return
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending = None
+        for i, start in enumerate(starts):
+            if pending is None:
+                pending = pool.submit(fill, start, i % 2)
+            slot = pending.result()
+            if start + batch_size <= len(rows) - batch_size:
+                pending = pool.submit(fill, start + batch_size, (i + 1) % 2)
+            else:
+                pending = None
+            yield x_buffers[slot][1], y_buffers[slot][1]
+
+
+class MLPRegressor(BaseEstimator, RegressorMixin):
+    def __init__(
+        self,
+        hidden: tuple = (64, 32),
+        learning_rate: float = 1e-3,
+        batch_size: int = 256,
+        epochs: int = 100,
+        l2: float = 0.0,
+        validation_fraction: float = 0.1,
+        patience: int = 10,
+        checkpoint: Optional[str] = None,
+        prefetch: bool = False,
+        random_state: Optional[int] = None,
+        verbose: bool = False,
+    ):
+        """Multilayer perceptron regressor on ReLU layers, trained with Adam in float32.
+        Activations, gradients and optimizer state are preallocated once per fit, so
+        the training loop runs without per-batch allocations. It follows the sklearn
+        estimator interface, so it can be searched with BaseModel.search.
+        Args:
+            hidden (tuple, optional): hidden layer widths. Defaults to (64, 32).
+            learning_rate (float, optional): Adam step size. Defaults to 1e-3.
+            batch_size (int, optional): rows per mini-batch. Defaults to 256.
+            epochs (int, optional): most passes over the data. Defaults to 100.
+            l2 (float, optional): weight decay. Defaults to 0.0.
+            validation_fraction (float, optional): rows held out for early stopping.
+                Defaults to 0.1.
+            patience (int, optional): epochs without improvement before stopping.
+                Defaults to 10.
+            checkpoint (str, optional): .npz path saved on each improvement. Defaults to None.
+            prefetch (bool, optional): gather batches on a thread. Defaults to False.
+            random_state (int, optional): seed for weights and shuffling. Defaults to None.
+            verbose (bool, optional): print losses per epoch. Defaults to False.
+        """
+        self.hidden = hidden
+        self.learning_rate = learning_rate
+        self.batch_size = batch_size
+        self.epochs = epochs
+        self.l2 = l2
+        self.validation_fraction = validation_fraction
+        self.patience = patience
+        self.checkpoint = checkpoint
+        self.prefetch = prefetch
+        self.random_state = random_state
+        self.verbose = verbose
+
+    def _allocate(self, batch_size: int) -> None:
+        """Activation buffers for batches of up to batch_size rows"""
+        widths = [W.shape[1] for W in self.weights_]
+        self._z = [np.empty((batch_size, width), np.float32) for width in widths]
+        self._a = [np.empty((batch_size, width), np.float32) for width in widths[:-1]]
+
+    def _forward(self, X: np.ndarray) -> np.ndarray:
+        """Forward pass into the activation buffers, returning the output rows"""
+        m = len(X)
+        inputs = X
+        for i, (W, b) in enumerate(zip(self.weights_, self.biases_)):
+            z = self._z[i][:m]
+            np.matmul(inputs, W, out=z)
+            z += b
+            if i < len(self._a):
+                inputs = self._a[i][:m]
+                np.maximum(z, 0, out=inputs)
+        return self._z[-1][:m]
+
+    def _predict_scaled(self, X, rows: np.ndarray) -> np.ndarray:
+        """Standardized predictions for X at rows, a batch at a time"""
+        chunk = len(self._z[0])
+        out = np.empty(len(rows), np.float32)
+        gather = np.empty((chunk, X.shape[1]), X.dtype)
+        batch = np.empty((chunk, X.shape[1]), np.float32)
+        for start in range(0, len(rows), chunk):
+            index = rows[start : start + chunk]
+            m = len(index)
+            np.take(X, index, axis=0, out=gather[:m])
+            np.subtract(gather[:m], self.x_mean_, out=batch[:m], casting="unsafe")
+            batch[:m] *= self.x_scale_
+            out[start : start + m] = self._forward(batch[:m])[:, 0]
+        return out
+
+    def fit(self, X, y) -> "MLPRegressor":
+        """Train on X and y, keeping the weights with the best validation loss
+        Args:
+            X: (n, p) features, an array or memmap
+            y: (n,) target values
+        """
+        X = np.asarray(X)
+        if X.dtype.kind != "f":
+            X = X.astype(np.float64)
+        y = np.asarray(y, dtype=X.dtype)
+        rng = np.random.default_rng(self.random_state)
+        rows = rng.permutation(len(X))
+        n_valid = int(len(rows) * self.validation_fraction)
+        valid, train = rows[:n_valid], rows[n_valid:]
+        batch_size = min(self.batch_size, len(train))
+
+        # standardization from the training rows, summed in chunks rather than
+        # copying them out of X
+        total = np.zeros(X.shape[1])
+        squares = np.zeros(X.shape[1])
+        ordered = np.sort(train)
+        for start in range(0, len(ordered), 65536):
+            part = X[ordered[start : start + 65536]].astype(np.float64)
+            total += part.sum(axis=0)
+            squares += (part * part).sum(axis=0)
+        mean = total / len(train)
+        scale = np.sqrt(np.maximum(squares / len(train) - mean * mean, 0))
+        self.x_mean_ = mean.astype(np.float32)
+        self.x_scale_ = (1 / np.where(scale == 0, 1, scale)).astype(np.float32)
+        self.y_mean_ = np.float32(y[train].mean())
+        self.y_scale_ = np.float32(1 / (y[train].std() or 1))
+
+        widths = [X.shape[1], *self.hidden, 1]
+        self.weights_ = [
+            (rng.standard_normal((fan_in, fan_out)) * np.sqrt(2 / fan_in)).astype(
+                np.float32
+            )
+            for fan_in, fan_out in zip(widths[:-1], widths[1:])
+        ]
+        self.biases_ = [np.zeros(fan_out, np.float32) for fan_out in widths[1:]]
+        params = self.weights_ + self.biases_
+        grads = [np.empty_like(p) for p in params]
+        moments = [np.zeros_like(p) for p in params]
+        velocities = [np.zeros_like(p) for p in params]
+        scratch = [np.empty_like(p) for p in params]
+        best = [p.copy() for p in params]
+        self._allocate(batch_size)
+        deltas = [np.empty_like(z) for z in self._z]
+        masks = [np.empty(a.shape, bool) for a in self._a]
+        x_buffers = [
+            (
+                np.empty((batch_size, X.shape[1]), X.dtype),
+                np.empty((batch_size, X.shape[1]), np.float32),
+            )
+            for _ in range(2)
+        ]
+        y_buffers = [
+            (np.empty(batch_size, y.dtype), np.empty((batch_size, 1), np.float32))
+            for _ in range(2)
+        ]
+        scale = (self.x_mean_, self.x_scale_, self.y_mean_, self.y_scale_)
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        layers = len(self.weights_)
+
+        self.best_loss_ = np.inf
+        self.loss_curve_ = []
+        step = 0
+        waited = 0
+        for epoch in range(self.epochs):
+            rng.shuffle(train)
+            losses = 0.0
+            batches = stream_batches(
+                X, y, train, batch_size, x_buffers, y_buffers, scale, self.prefetch
+            )
+            for n_batches, (xb, yb) in enumerate(batches, 1):
+                out = self._forward(xb)
+                delta = deltas[-1]
+                np.subtract(out, yb, out=delta)
+                losses += float(np.vdot(delta, delta)) / batch_size
+                delta *= 1 / batch_size
+                for i in range(layers - 1, -1, -1):
+                    inputs = xb if i == 0 else self._a[i - 1]
+                    np.matmul(inputs.T, deltas[i], out=grads[i])
+                    np.sum(deltas[i], axis=0, out=grads[layers + i])
+                    if i:
+                        np.matmul(deltas[i], self.weights_[i].T, out=deltas[i - 1])
+                        np.greater(self._z[i - 1], 0, out=masks[i - 1])
+                        np.multiply(deltas[i - 1], masks[i - 1], out=deltas[i - 1])
+                if self.l2:
+                    for i in range(layers):
+                        np.multiply(self.weights_[i], self.l2, out=scratch[i])
+                        grads[i] += scratch[i]
+                step += 1
+                step_size = (
+                    self.learning_rate * np.sqrt(1 - beta2**step) / (1 - beta1**step)
+                )
+                for p, g, m, v, s in zip(params, grads, moments, velocities, scratch):
+                    m *= beta1
+                    np.multiply(g, 1 - beta1, out=s)
+                    m += s
+                    v *= beta2
+                    np.multiply(g, g, out=s)
+                    s *= 1 - beta2
+                    v += s
+                    np.sqrt(v, out=s)
+                    s += eps
+                    np.divide(m, s, out=s)
+                    s *= step_size
+                    p -= s
+            train_loss = losses / max(n_batches, 1)
+
+            if n_valid:
+                residual = (
+                    self._predict_scaled(X, valid)
+                    - (y[valid] - self.y_mean_) * self.y_scale_
+                )
+                valid_loss = float(np.mean(residual**2))
+            else:
+                valid_loss = train_loss
+            self.loss_curve_.append((train_loss, valid_loss))
+            if self.verbose:
+                print(
+                    f"epoch {epoch}: train {train_loss:.4f}, validation {valid_loss:.4f}"
+                )
+            if valid_loss < self.best_loss_:
+                self.best_loss_ = valid_loss
+                for saved, p in zip(best, params):
+                    np.copyto(saved, p)
+                waited = 0
+                if self.checkpoint:
+                    self.save(self.checkpoint)
+            else:
+                waited += 1
+                if waited >= self.patience:
+                    break
+
+        for saved, p in zip(best, params):
+            np.copyto(p, saved)
+        self.n_epochs_ = epoch + 1
+        return self
+
+    def predict(self, X) -> np.ndarray:
+        X = np.asarray(X)
+        if X.dtype.kind != "f":
+            X = X.astype(np.float64)
+        self._allocate(self.batch_size)
+        scaled = self._predict_scaled(X, np.arange(len(X)))
+        return scaled.astype(np.float64) / self.y_scale_ + self.y_mean_
+
+    def save(self, path: str) -> None:
+        """Save weights and standardization as .npz"""
+        arrays = {f"W{i}": W for i, W in enumerate(self.weights_)}
+        arrays.update({f"b{i}": b for i, b in enumerate(self.biases_)})
+        np.savez(
+            path,
+            x_mean=self.x_mean_,
+            x_scale=self.x_scale_,
+            y=np.array([self.y_mean_, self.y_scale_]),
+            **arrays,
+        )
+
+    def load(self, path: str) -> "MLPRegressor":
+        """Load weights and standardization saved by save or a checkpoint"""
+        with np.load(path) as data:
+            layers = len([key for key in data.files if key.startswith("W")])
+            self.weights_ = [data[f"W{i}"] for i in range(layers)]
+            self.biases_ = [data[f"b{i}"] for i in range(layers)]
+            self.x_mean_, self.x_scale_ = data["x_mean"], data["x_scale"]
+            self.y_mean_, self.y_scale_ = (np.float32(value) for value in data["y"])
+        return self
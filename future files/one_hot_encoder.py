@@ -0,0 +1,100 @@
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+class OneHotEncoder:
+    def __init__(
+        self,
+        columns: Union[str, list],
+        drop_first: bool = True,
+        dtype=np.float64,
+    ):
+        """Sparse one-hot encoding. Each column's categories are learned once at fit,
+        and rows are encoded as int32 codes into a CSR matrix holding one stored value
+        per row and column, never a dense indicator frame. Missing and unseen
+        categories, and the dropped first category, encode as all zeros.
+        Args:
+            columns (str or list): categorical columns to encode
+            drop_first (bool, optional): drop each column's first category, as
+                pd.get_dummies does. Defaults to True.
+            dtype (optional): value type of the matrix. Defaults to np.float64.
+        """
+        self.columns = [columns] if isinstance(columns, str) else list(columns)
+        self.drop_first = drop_first
+        self.dtype = dtype
+        self.categories = {}
+        self.offsets = {}
+
+    def fit(self, df: pd.DataFrame) -> "OneHotEncoder":
+        offset = 0
+        for column in self.columns:
+            _, categories = pd.factorize(df[column], sort=True)
+            # categorical columns give their observed categories in category order
+            self.categories[column] = pd.Index(np.asarray(categories))
+            self.offsets[column] = offset
+            offset += len(categories) - int(self.drop_first)
+        self.n_features = offset
+        return self
+
+    def _codes(self, series: pd.Series, column: str) -> np.ndarray:
+        """int32 positions of the values among the fitted categories, -1 if unseen"""
+        categories = self.categories[column]
+        if isinstance(
+            series.dtype, pd.CategoricalDtype
+        ) and series.cat.categories.equals(categories):
+            # category-coded columns already hold the codes
+            return series.cat.codes.to_numpy().astype(np.int32)
+        return categories.get_indexer(series).astype(np.int32)
+
+    def transform(self, df: pd.DataFrame, dtype=None) -> sparse.csr_matrix:
+        """Encode rows as an (n_rows, n_features) CSR matrix of dtype, defaulting to
+        the encoder's"""
+        n = len(df)
+        indices = np.empty((n, len(self.columns)), dtype=np.int32)
+        for i, column in enumerate(self.columns):
+            codes = self._codes(df[column], column)
+            indices[:, i] = codes + self.offsets[column] - int(self.drop_first)
+            indices[codes < int(self.drop_first), i] = -1
+        stored = indices >= 0
+        indptr = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(stored.sum(axis=1), out=indptr[1:])
+        # row-major order keeps each row's indices sorted, as the offsets increase
+        indices = indices[stored]
+        data = np.ones(len(indices), dtype=dtype or self.dtype)
+        return sparse.csr_matrix(
+            (data, indices, indptr), shape=(n, self.n_features), copy=False
+        )
+
+    def fit_transform(self, df: pd.DataFrame) -> sparse.csr_matrix:
+        return self.fit(df).transform(df)
+
+    def feature_names(self) -> list:
+        """Column names in matrix order, {column}_{category} as pd.get_dummies names them"""
+        start = int(self.drop_first)
+        return [
+            f"{column}_{category}"
+            for column in self.columns
+            for category in self.categories[column][start:]
+        ]
+
+    def transform_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Encode rows as a DataFrame of uint8 pandas sparse columns. Integer values
+        keep 0 as the fill value, where float sparse columns fill with NaN."""
+        return pd.DataFrame.sparse.from_spmatrix(
+            self.transform(df, np.uint8), index=df.index, columns=self.feature_names()
+        )
+
+
+def hstack_features(*blocks) -> sparse.csr_matrix:
+    """Join dense feature arrays or frames and sparse encodings column-wise into one
+    CSR matrix, without densifying the sparse blocks"""
+    return sparse.hstack(
+        [
+            block if sparse.issparse(block) else np.asarray(block, dtype=np.float64)
+            for block in blocks
+        ],
+        format="csr",
+    )
@@ -0,0 +1,317 @@
+import contextlib
+import hashlib
+import html
+import io
+import json
+import os
+import re
+import traceback
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from visualization_tools import VisualizationTool
+
+FORMATS = ("png", "svg")
+MANIFEST = "manifest.json"
+
+# frames and tool attached once per worker by the pool initializer, so each task only
+# pickles a variant name and a plot number
+_worker_data = {}
+
+
+def eda_plots(
+    target: str,
+    fields: Optional[list] = None,
+    categoricals: Optional[list] = None,
+    continuous: Optional[list] = None,
+    polynomial_fields: Optional[list] = None,
+    date_field: Optional[str] = None,
+) -> list:
+    """The EDA plot set as (name, method, kwargs) entries for PlotReport
+    Args:
+        target (str): target column
+        fields (list, optional): columns given a distribution and probability plot.
+            Defaults to the target.
+        categoricals (list, optional): columns boxplotted as categories
+        continuous (list, optional): columns boxplotted and scattered against the target
+        polynomial_fields (list, optional): columns given a linearity check
+        date_field (str, optional): date column for the time series plot
+    """
+    plots = [("basic_hist", "basic_hist", {})]
+    for field in fields or [target]:
+        plots.append((f"hist_norm_prob_{field}", "hist_norm_prob", {"field": field}))
+    plots.append(("correlation_heat_map", "correlation_heat_map", {}))
+    for field in polynomial_fields or []:
+        plots.append(
+            (f"check_polynomial_{field}", "check_polynomial", {"field": field})
+        )
+    if categoricals:
+        plots.append(
+            (
+                "visualize_categoricals",
+                "visualize_categoricals",
+                {"categoricals": categoricals},
+            )
+        )
+    if continuous:
+        plots.append(
+            ("visualize_continuous", "visualize_continuous", {"continuous": continuous})
+        )
+        plots.append(
+            ("visualize_scatters", "visualize_scatters", {"continuous": continuous})
+        )
+    if date_field:
+        plots.append(
+            ("time_series_plot", "time_series_plot", {"date_field": date_field})
+        )
+    return plots
+
+
+def plot_columns(method: str, kwargs: dict, target: str) -> Optional[list]:
+    """Columns a VisualizationTool plot reads, or None when it reads the whole frame"""
+    if method == "hist_norm_prob":
+        return [kwargs["field"]]
+    if method in ("check_polynomial", "plot_polynomials"):
+        return [kwargs["field"], target]
+    if method == "time_series_plot":
+        return [kwargs["date_field"], target]
+    if method == "visualize_categoricals":
+        return list(kwargs["categoricals"]) + [target]
+    if method in ("visualize_continuous", "visualize_scatters"):
+        return list(kwargs["continuous"]) + [target]
+    if method == "scatter":
+        return [kwargs["x"], kwargs["y"]] + (
+            [kwargs["color"]] if kwargs["color"] else []
+        )
+    return None
+
+
+def plot_fingerprint(
+    df: pd.DataFrame, method: str, kwargs: dict, settings: dict
+) -> str:
+    """Digest of the rows a plot reads, the plot and its arguments, and the tool and
+    output settings. A plot whose digest is unchanged would draw the same figures."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(method.encode())
+    digest.update(json.dumps([kwargs, settings], sort_keys=True, default=str).encode())
+    columns = plot_columns(method, kwargs, settings["target"])
+    if columns is not None:
+        # a missing column is left to fail in the plot, where the error is recorded
+        columns = [name for name in dict.fromkeys(columns) if name in df.columns]
+    frame = df if columns is None else df[columns]
+    digest.update(repr(list(zip(frame.columns, map(str, frame.dtypes)))).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _file_name(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", name)
+
+
+def _init_worker(frames: dict, tool: VisualizationTool, plots: list) -> None:
+    """Draw on the non-interactive Agg backend, so plt.show() does not block"""
+    plt.switch_backend("agg")
+    _worker_data.update(frames=frames, tool=tool, plots=plots)
+
+
+def _render_plot(task: tuple) -> tuple:
+    """Call one plot method and save every figure it opened, returning the files and
+    anything it printed, or the error it raised"""
+    variant, plot, directory, formats, dpi = task
+    name, method, kwargs = _worker_data["plots"][plot]
+    df = _worker_data["frames"][variant]
+    plt.close("all")
+    text = io.StringIO()
+    files, error = [], None
+    try:
+        with contextlib.redirect_stdout(text), warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            getattr(_worker_data["tool"], method)(df, **kwargs)
+            for i, number in enumerate(plt.get_fignums()):
+                figure = plt.figure(number)
+                stem = _file_name(name) if i == 0 else f"{_file_name(name)}_{i + 1}"
+                for format in formats:
+                    path = os.path.join(directory, f"{stem}.{format}")
+                    figure.savefig(path, format=format, dpi=dpi, bbox_inches="tight")
+                    files.append(os.path.basename(path))
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        plt.close("all")
+    return variant, plot, files, text.getvalue(), error
+
+
+class PlotReport:
+    def __init__(
+        self,
+        tool: VisualizationTool,
+        plots: list,
+        formats: tuple = ("png",),
+        dpi: int = 100,
+        n_jobs: Optional[int] = None,
+    ):
+        """Renders a plot set headlessly to image files with an HTML index, one plot per
+        task across a process pool. Each plot's fingerprint of the columns it reads and
+        its settings is kept in a manifest, so a rerun only redraws plots whose inputs
+        changed.
+        Args:
+            tool (VisualizationTool): tool whose methods draw the plots
+            plots (list): (name, method, kwargs) entries, such as from eda_plots
+            formats (tuple, optional): "png" and/or "svg". Defaults to ("png",).
+            dpi (int, optional): resolution of png files. Defaults to 100.
+            n_jobs (int, optional): worker processes. Defaults to None, rendering in
+                this process.
+        """
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown image formats: {sorted(unknown)}")
+        self.tool = tool
+        self.plots = list(plots)
+        self.formats = tuple(formats)
+        self.dpi = dpi
+        self.n_jobs = n_jobs
+
+    def _settings(self) -> dict:
+        return {
+            "target": self.tool.target,
+            "max_rows": self.tool.max_rows,
+            "max_boxes": self.tool.max_boxes,
+            "random_state": self.tool.random_state,
+            "formats": self.formats,
+            "dpi": self.dpi,
+        }
+
+    def render(self, df: pd.DataFrame, output_dir: str) -> dict:
+        """Render the plot set for one frame into output_dir
+        Returns:
+            dict: plot name to its manifest entry of fingerprint, files, text and error
+        """
+        return self.render_many({"": df}, output_dir)[""]
+
+    def render_many(self, frames: dict, output_dir: str) -> dict:
+        """Render the plot set for several frames, such as each county or cleaning
+        variant, into a subdirectory per frame, with every stale plot of every frame
+        sharing one pool
+        Args:
+            frames (dict): variant name to frame. An empty name renders into output_dir.
+            output_dir (str): report directory, holding the manifest and index.html
+        Returns:
+            dict: variant name to plot name to its manifest entry
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        manifest_path = os.path.join(output_dir, MANIFEST)
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        settings = self._settings()
+
+        tasks, fingerprints = [], {}
+        for variant, df in frames.items():
+            directory = os.path.join(output_dir, _file_name(variant))
+            os.makedirs(directory, exist_ok=True)
+            entries = manifest.setdefault(variant, {})
+            for plot, (name, method, kwargs) in enumerate(self.plots):
+                key = plot_fingerprint(df, method, kwargs, settings)
+                fingerprints[variant, plot] = key
+                entry = entries.get(name, {})
+                if entry.get("fingerprint") == key and all(
+                    os.path.exists(os.path.join(directory, file))
+                    for file in entry["files"]
+                ):
+                    continue
+                tasks.append((variant, plot, directory, self.formats, self.dpi))
+
+        pooled = self.n_jobs is not None and self.n_jobs != 1
+        if not tasks:
+            results = []
+        elif pooled:
+            with ProcessPoolExecutor(
+                max_workers=self.n_jobs,
+                initializer=_init_worker,
+                initargs=(frames, self.tool, self.plots),
+            ) as pool:
+                results = list(pool.map(_render_plot, tasks))
+        else:
+            backend = plt.get_backend()
+            try:
+                _init_worker(frames, self.tool, self.plots)
+                results = [_render_plot(task) for task in tasks]
+            finally:
+                _worker_data.clear()
+                plt.switch_backend(backend)
+
+        for variant, plot, files, text, error in results:
+            name = self.plots[plot][0]
+            manifest[variant][name] = {
+                # failed plots keep no fingerprint, so the next run retries them
+                "fingerprint": None if error else fingerprints[variant, plot],
+                "files": files,
+                "text": text,
+                "error": error,
+            }
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=1)
+        self._write_index(manifest, frames, output_dir)
+        failed = [
+            f"{variant}/{self.plots[plot][0]}" if variant else self.plots[plot][0]
+            for variant, plot, _, _, error in results
+            if error
+        ]
+        print(
+            f"Rendered {len(results) - len(failed)} of {len(fingerprints)} plots to "
+            f"{output_dir}, {len(fingerprints) - len(results)} unchanged"
+        )
+        if failed:
+            print(f"{len(failed)} plots failed, see index.html: {', '.join(failed)}")
+        return {variant: manifest[variant] for variant in frames}
+
+    def _write_index(self, manifest: dict, frames: dict, output_dir: str) -> None:
+        """index.html per variant directory, and a top index linking the variants"""
+        for variant in frames:
+            directory = _file_name(variant)
+            sections = []
+            for name, _, _ in self.plots:
+                entry = manifest[variant].get(name, {})
+                parts = [f"<h2>{html.escape(name)}</h2>"]
+                for file in entry.get("files", []):
+                    if file.endswith(f".{self.formats[0]}"):
+                        source = html.escape(file)
+                        parts.append(f'<a href="{source}"><img src="{source}"></a>')
+                if entry.get("text"):
+                    parts.append(f"<pre>{html.escape(entry['text'])}</pre>")
+                if entry.get("error"):
+                    parts.append(
+                        f'<pre class="error">{html.escape(entry["error"])}</pre>'
+                    )
+                sections.append("\n".join(parts))
+            title = html.escape(variant or "Report")
+            _write_page(
+                os.path.join(output_dir, directory, "index.html"), title, sections
+            )
+        if list(frames) != [""]:
+            links = [
+                f'<li><a href="{html.escape(_file_name(variant))}/index.html">'
+                f"{html.escape(variant)}</a></li>"
+                for variant in manifest
+                if variant
+            ]
+            _write_page(
+                os.path.join(output_dir, "index.html"),
+                "Report",
+                ["<ul>\n" + "\n".join(links) + "\n</ul>"],
+            )
+
+
+def _write_page(path: str, title: str, sections: list) -> None:
+    page = (
+        f'<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"><title>{title}</title>'
+        "<style>img{max-width:100%}.error{color:#a00}</style></head>\n"
+        f"<body>\n<h1>{title}</h1>\n" + "\n".join(sections) + "\n</body>\n</html>\n"
+    )
+    with open(path, "w") as f:
+        f.write(page)
@@ -0,0 +1,143 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from binning import quantile_edges
+
+
+def stratified_sample(
+    df: pd.DataFrame,
+    by: Optional[str] = None,
+    max_rows: int = 50_000,
+    random_state: Optional[int] = None,
+) -> pd.DataFrame:
+    """At most max_rows rows drawn without replacement, each stratum of by keeping its
+    share of the rows, and every stratum keeping at least one row
+    Args:
+        df (pd.DataFrame): rows to sample
+        by (str, optional): column to stratify on. Defaults to a plain random sample.
+        max_rows (int, optional): row cap. Defaults to 50_000.
+        random_state (int, optional): seed. Defaults to None.
+    """
+    if len(df) <= max_rows:
+        return df
+    rng = np.random.default_rng(random_state)
+    if by is None:
+        return df.take(np.sort(rng.choice(len(df), max_rows, replace=False)))
+    codes, _ = pd.factorize(df[by], use_na_sentinel=False)
+    counts = np.bincount(codes)
+    quotas = np.maximum(np.floor(counts * max_rows / len(df)), 1).astype(np.int64)
+    # a random order within each stratum, keeping the first quota rows of each
+    order = np.lexsort((rng.random(len(df)), codes))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.arange(len(df)) - starts[codes[order]]
+    return df.take(np.sort(order[rank < quotas[codes[order]]]))
+
+
+def histogram2d(
+    x,
+    y,
+    bins: int = 200,
+    weights=None,
+    clip: Optional[float] = None,
+) -> tuple:
+    """Counts, or the mean of weights, over a grid of x and y cells, for drawing with
+    pcolormesh in place of a scatter of every row
+    Args:
+        x: x values
+        y: y values
+        bins (int, optional): cells along each axis. Defaults to 200.
+        weights (optional): values to average per cell, such as a hue column.
+            Defaults to counting rows.
+        clip (float, optional): tail fraction of each axis left out of the grid range,
+            so a few extreme rows do not squash the rest. Defaults to None.
+    Returns:
+        tuple: (bins, bins) grid with NaN for empty cells, x edges, y edges
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    present = ~(np.isnan(x) | np.isnan(y))
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)
+        present &= ~np.isnan(weights)
+        weights = weights[present]
+    x, y = x[present], y[present]
+    if clip:
+        ranges = [tuple(np.quantile(values, [clip, 1 - clip])) for values in (x, y)]
+    else:
+        ranges = [(values.min(), values.max()) for values in (x, y)]
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins, ranges)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if weights is None:
+            grid = np.where(counts > 0, counts, np.nan)
+        else:
+            sums = np.histogram2d(x, y, [x_edges, y_edges], weights=weights)[0]
+            grid = sums / counts
+    return grid.T, x_edges, y_edges
+
+
+def box_summaries(
+    df: pd.DataFrame,
+    column: str,
+    target: str,
+    max_boxes: Optional[int] = None,
+    whis: float = 1.5,
+) -> list:
+    """Box plot statistics of target for each value of column, computed by grouping
+    rather than handing every row to the plot, in the form Axes.bxp draws. Columns
+    with more than max_boxes values are grouped into quantile bins labelled by their
+    upper edge, so only pass max_boxes for continuous columns.
+    Args:
+        df (pd.DataFrame): rows holding column and target
+        column (str): grouping column
+        target (str): values summarized in each box
+        max_boxes (int, optional): most boxes before binning. Defaults to no limit.
+        whis (float, optional): whisker reach in IQRs, as in matplotlib. Defaults to 1.5.
+    Returns:
+        list: one dict of label, med, q1, q3, whislo and whishi per box, in value order
+    """
+    keys = df[column]
+    if (
+        max_boxes
+        and pd.api.types.is_numeric_dtype(keys.dtype)
+        and keys.nunique() > max_boxes
+    ):
+        values = keys.to_numpy(dtype=np.float64)
+        edges = quantile_edges(values[~np.isnan(values)], max_boxes)
+        codes = np.where(
+            np.isnan(values), -1, np.searchsorted(edges, values, side="left")
+        )
+        labels = [f"{edge:g}" for edge in np.append(edges, np.nanmax(values))]
+    else:
+        codes, labels = pd.factorize(keys, sort=True)
+    target_values = df[target].to_numpy(dtype=np.float64)
+    quartiles = (
+        pd.Series(target_values)
+        .groupby(codes)
+        .quantile([0.25, 0.5, 0.75])
+        .unstack()
+        .drop(index=-1, errors="ignore")
+    )
+    q1, median, q3 = (quartiles[q].to_numpy() for q in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    # whiskers end at the furthest values inside whis IQRs of the quartiles
+    present = codes >= 0
+    lows = np.full(len(labels), np.nan)
+    highs = np.full(len(labels), np.nan)
+    lows[quartiles.index], highs[quartiles.index] = q1 - whis * iqr, q3 + whis * iqr
+    rows = codes[present]
+    values = target_values[present]
+    inside = (values >= lows[rows]) & (values <= highs[rows])
+    reach = pd.Series(values[inside]).groupby(rows[inside]).agg(["min", "max"])
+    return [
+        {
+            "label": labels[code],
+            "med": median[i],
+            "q1": q1[i],
+            "q3": q3[i],
+            "whislo": reach.loc[code, "min"],
+            "whishi": reach.loc[code, "max"],
+        }
+        for i, code in enumerate(quartiles.index)
+    ]
@@ -0,0 +1,144 @@
+import itertools
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import qr, solve_triangular
+
+
+class PolynomialGenerator:
+    def __init__(
+        self,
+        columns: Union[str, list],
+        degree: int = 2,
+        interactions: bool = True,
+        include_linear: bool = True,
+        select=None,
+        dtype=np.float32,
+    ):
+        """Named powers and pairwise products of columns, written into one preallocated
+        block. Each power is the previous power times the column, so x^3 costs one
+        multiply after x^2, and no intermediate frames are built.
+        Args:
+            columns (str or list): numeric columns to expand
+            degree (int, optional): highest power of each column. Defaults to 2.
+            interactions (bool, optional): add the product of every pair of columns,
+                named "a*b". Defaults to True.
+            include_linear (bool, optional): include the columns themselves. Defaults
+                to True.
+            select (optional): names to emit, or a boolean mask over names(). Powers
+                left out are still stepped through when a higher one is kept.
+                Defaults to every name.
+            dtype (optional): block value type. Defaults to np.float32.
+        """
+        self.columns = [columns] if isinstance(columns, str) else list(columns)
+        self.degree = degree
+        self.interactions = interactions
+        self.include_linear = include_linear
+        self.dtype = dtype
+        names = self.names(all_names=True)
+        if select is None:
+            self.keep = np.ones(len(names), dtype=bool)
+        elif np.asarray(select).dtype == bool:
+            self.keep = np.asarray(select, dtype=bool)
+        else:
+            self.keep = np.isin(names, list(select))
+        self._slots = np.cumsum(self.keep) - 1
+
+    def _plan(self) -> list:
+        """(name, kind, i, j) for every output in order: ("power", column i, power j)
+        or ("product", column i, column j)"""
+        plan = []
+        first = 1 if self.include_linear else 2
+        for i, column in enumerate(self.columns):
+            for power in range(first, self.degree + 1):
+                name = column if power == 1 else f"{column}^{power}"
+                plan.append((name, "power", i, power))
+        if self.interactions:
+            for i, j in itertools.combinations(range(len(self.columns)), 2):
+                name = f"{self.columns[i]}*{self.columns[j]}"
+                plan.append((name, "product", i, j))
+        return plan
+
+    def names(self, all_names: bool = False) -> list:
+        """Output column names, or every name before selection"""
+        names = [name for name, _, _, _ in self._plan()]
+        if all_names:
+            return names
+        return [name for name, keep in zip(names, self.keep) if keep]
+
+    def transform_array(self, X, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Expand an (n, len(columns)) array into an (n, len(names())) block. The block
+        is column-major, so each output column is written contiguously.
+        Args:
+            X: values of the columns, in order
+            out (np.ndarray, optional): block to fill, reused between calls
+        """
+        X = np.asarray(X, dtype=self.dtype)
+        n = len(X)
+        if out is None:
+            out = np.empty((n, int(self.keep.sum())), dtype=self.dtype, order="F")
+        plan = self._plan()
+        slots = {
+            (kind, i, j): self._slots[k]
+            for k, (_, kind, i, j) in enumerate(plan)
+            if self.keep[k]
+        }
+        # powers that are not emitted are stepped through in one scratch column
+        scratch = np.empty(n, dtype=self.dtype)
+        for i in range(len(self.columns)):
+            kept = [j for kind, c, j in slots if kind == "power" and c == i]
+            previous = X[:, i]
+            for power in range(1, max(kept, default=0) + 1):
+                slot = slots.get(("power", i, power))
+                if power == 1:
+                    if slot is not None:
+                        out[:, slot] = previous
+                    continue
+                target = scratch if slot is None else out[:, slot]
+                np.multiply(previous, X[:, i], out=target)
+                previous = target
+        for (kind, i, j), slot in slots.items():
+            if kind == "product":
+                np.multiply(X[:, i], X[:, j], out=out[:, slot])
+        return out
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Named expansion of df's columns, on df's index"""
+        block = self.transform_array(df[self.columns].to_numpy(dtype=self.dtype))
+        return pd.DataFrame(block, index=df.index, columns=self.names(), copy=False)
+
+
+def vandermonde(x: np.ndarray, degree: int) -> np.ndarray:
+    """(n, degree + 1) matrix of 1, x, x^2 ... each column the previous times x"""
+    V = np.empty((len(x), degree + 1))
+    V[:, 0] = 1.0
+    for power in range(1, degree + 1):
+        np.multiply(V[:, power - 1], x, out=V[:, power])
+    return V
+
+
+def polynomial_fits(x, y, degree: int = 3) -> tuple:
+    """Least squares polynomial fits of every degree from 1 to degree, from one QR
+    factorization of the Vandermonde matrix. The fit of degree k uses the first k + 1
+    columns, so its predictions are the running sum of the leading columns of Q
+    weighted by Q^T y. x is standardized first to keep the powers well conditioned.
+    Args:
+        x: values of the single feature
+        y: target values
+        degree (int, optional): highest degree. Defaults to 3.
+    Returns:
+        tuple: (degree, n) predictions, and each degree's coefficients on the
+            standardized x, lowest power first
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    scale = x.std() or 1.0
+    Q, R = qr(vandermonde((x - x.mean()) / scale, degree), mode="economic")
+    weights = Q.T @ y
+    predictions = np.cumsum(Q * weights, axis=1).T[1:]
+    coefs = [
+        solve_triangular(R[: k + 1, : k + 1], weights[: k + 1])
+        for k in range(1, degree + 1)
+    ]
+    return predictions, coefs
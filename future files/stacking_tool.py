@@ -1,4 +1,241 @@
-class StackingTool():
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 
-    def __init__(self):
-        pass
\ No newline at end of file
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import clone
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.metrics import r2_score
+from sklearn.model_selection import KFold
+
+try:
+    from xgboost import XGBRegressor
+except ImportError:
+    XGBRegressor = None
+
+# data shared with pool workers through the initializer, so each task only
+# pickles its estimator and fold number
+_worker_data = {}
+
+
+def _init_worker(X, y, folds):
+    _worker_data.update(X=X, y=y, folds=folds)
+
+
+def _fit_task(task: tuple) -> tuple:
+    """Fit an estimator on one fold's train rows and predict its test rows, or fit
+    on every row when fold is None"""
+    name, estimator, fold = task
+    X, y = _worker_data["X"], _worker_data["y"]
+    model = clone(estimator)
+    if fold is None:
+        return name, fold, model.fit(X, y)
+    train, test = _worker_data["folds"][fold]
+    model.fit(X[train], y[train])
+    return name, fold, model.predict(X[test])
+
+
+def _features(X):
+    """Contiguous float64 features, or CSR for sparse input"""
+    if sparse.issparse(X):
+        return sparse.csr_matrix(X, dtype=np.float64)
+    return np.ascontiguousarray(X, dtype=np.float64)
+
+
+def default_learners(random_state: Optional[int] = None) -> dict:
+    """Linear, ridge and, when xgboost is installed, gradient boosted base learners"""
+    learners = {"linear": LinearRegression(), "ridge": Ridge(alpha=1.0)}
+    if XGBRegressor is not None:
+        learners["xgboost"] = XGBRegressor(
+            n_estimators=300, max_depth=5, learning_rate=0.05, random_state=random_state
+        )
+    return learners
+
+
+class StackingTool:
+    def __init__(
+        self,
+        base_learners: Optional[dict] = None,
+        meta_learner=None,
+        n_splits: int = 5,
+        random_state: Optional[int] = None,
+        n_jobs: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+    ):
+        """Stacked regression ensemble. Base learners are fitted across folds in a
+        process pool to build an out-of-fold prediction matrix, which trains the meta
+        learner. Each learner's out-of-fold column is cached on disk by data, folds and
+        estimator, so adding a learner only trains that learner.
+        Args:
+            base_learners (dict, optional): name to unfitted estimator. Defaults to
+                default_learners().
+            meta_learner (optional): unfitted estimator for the out-of-fold matrix.
+                Defaults to LinearRegression(positive=True).
+            n_splits (int, optional): folds. Defaults to 5.
+            random_state (int, optional): seed for the folds. Defaults to None.
+            n_jobs (int, optional): worker processes. None or 1 runs in this process.
+            cache_dir (str, optional): where out-of-fold columns are saved. Defaults to
+                memory only.
+        """
+        self.base_learners = dict(
+            default_learners(random_state) if base_learners is None else base_learners
+        )
+        self.meta_learner = meta_learner or LinearRegression(positive=True)
+        self.n_splits = n_splits
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.cache_dir = cache_dir
+        self.fitted = {}
+        self.oof_columns = {}
+        self.X = None
+        self.y = None
+
+    def _key(self, name: str) -> str:
+        estimator = self.base_learners[name]
+        sha1 = hashlib.sha1(self._data_key.encode())
+        # every parameter, defaults included, since repr leaves defaults out and
+        # truncates long values
+        sha1.update(f"{type(estimator).__module__}.{type(estimator).__name__}".encode())
+        sha1.update(
+            json.dumps(
+                estimator.get_params(deep=True), sort_keys=True, default=repr
+            ).encode()
+        )
+        return f"{name}-{sha1.hexdigest()[:16]}"
+
+    def _cache_path(self, name: str) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, f"{self._key(name)}.npy")
+
+    def _train(self, names: list) -> None:
+        """Fit the named learners on every fold and on all rows, reading out-of-fold
+        columns from the cache where possible"""
+        tasks = []
+        for name in names:
+            path = self._cache_path(name)
+            if path and os.path.exists(path):
+                self.oof_columns[name] = np.load(path)
+            else:
+                tasks += [
+                    (name, self.base_learners[name], fold)
+                    for fold in range(len(self.folds))
+                ]
+            tasks.append((name, self.base_learners[name], None))
+
+        if self.n_jobs is None or self.n_jobs == 1:
+            _init_worker(self.X, self.y, self.folds)
+            try:
+                results = [_fit_task(task) for task in tasks]
+            finally:
+                _worker_data.clear()
+        else:
+            with ProcessPoolExecutor(
+                max_workers=self.n_jobs,
+                initializer=_init_worker,
+                initargs=(self.X, self.y, self.folds),
+            ) as pool:
+                results = list(pool.map(_fit_task, tasks))
+
+        new = {}
+        for name, fold, result in results:
+            if fold is None:
+                self.fitted[name] = result
+                continue
+            column = new.setdefault(name, np.empty(len(self.y)))
+            column[self.folds[fold][1]] = result
+        for name, column in new.items():
+            self.oof_columns[name] = column
+            path = self._cache_path(name)
+            if path:
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    np.save(path, column)
+                except OSError:
+                    # an unwritable cache directory keeps columns in memory only
+                    self.cache_dir = None
+
+    @property
+    def oof(self) -> np.ndarray:
+        """Contiguous (rows, learners) out-of-fold prediction matrix"""
+        return np.column_stack([self.oof_columns[name] for name in self.base_learners])
+
+    def fit(self, X, y) -> "StackingTool":
+        """Fit the base learners and the meta learner
+        Args:
+            X: features, a DataFrame, array or scipy sparse matrix such as a
+                one-hot encoding, which is kept sparse
+            y: target values
+        """
+        self.X = _features(X)
+        self.y = np.ascontiguousarray(y, dtype=np.float64)
+        if sparse.issparse(self.X):
+            sha1 = hashlib.sha1(self.X.data)
+            sha1.update(self.X.indices)
+            sha1.update(self.X.indptr)
+            self._data_key = sha1.hexdigest()
+        else:
+            self._data_key = hashlib.sha1(self.X.data).hexdigest()
+        self._data_key += hashlib.sha1(self.y.data).hexdigest()
+        self._data_key += f"{self.n_splits}-{self.random_state}"
+        cv = KFold(self.n_splits, shuffle=True, random_state=self.random_state)
+        self.folds = list(cv.split(self.y))
+        self.fitted = {}
+        self.oof_columns = {}
+        self._train(list(self.base_learners))
+        self._fit_meta()
+        return self
+
+    def _fit_meta(self) -> None:
+        self.meta = clone(self.meta_learner).fit(self.oof, self.y)
+
+    def add_learner(self, name: str, estimator) -> None:
+        """Add a base learner, training only it and refitting the meta learner"""
+        self.base_learners[name] = estimator
+        if self.X is not None:
+            self._train([name])
+            self._fit_meta()
+
+    def remove_learner(self, name: str) -> None:
+        """Drop a base learner and refit the meta learner"""
+        del self.base_learners[name]
+        self.fitted.pop(name, None)
+        self.oof_columns.pop(name, None)
+        if self.X is not None:
+            self._fit_meta()
+
+    def base_predictions(self, X) -> np.ndarray:
+        """Predictions of every base learner as one (rows, learners) matrix. Linear
+        learners are batched into a single matrix product."""
+        X = _features(X)
+        predictions = np.empty((X.shape[0], len(self.base_learners)))
+        linear = [
+            i
+            for i, name in enumerate(self.base_learners)
+            if hasattr(self.fitted[name], "coef_")
+            and np.ndim(self.fitted[name].coef_) == 1
+        ]
+        if linear:
+            names = list(self.base_learners)
+            weights = np.column_stack([self.fitted[names[i]].coef_ for i in linear])
+            intercepts = np.array([self.fitted[names[i]].intercept_ for i in linear])
+            predictions[:, linear] = X @ weights + intercepts
+        for i, name in enumerate(self.base_learners):
+            if i not in linear:
+                predictions[:, i] = self.fitted[name].predict(X)
+        return predictions
+
+    def predict(self, X) -> np.ndarray:
+        return self.meta.predict(self.base_predictions(X))
+
+    def score(self, X, y) -> pd.Series:
+        """r2 of the ensemble and of each base learner from one prediction pass"""
+        base = self.base_predictions(X)
+        scores = {"ensemble": r2_score(y, self.meta.predict(base))}
+        for i, name in enumerate(self.base_learners):
+            scores[name] = r2_score(y, base[:, i])
+        return pd.Series(scores)
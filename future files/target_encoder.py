@@ -0,0 +1,125 @@
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import KFold
+
+
+class TargetEncoder:
+    def __init__(
+        self,
+        columns: Union[str, list],
+        n_splits: int = 5,
+        min_samples: Optional[float] = None,
+        random_state: Optional[int] = None,
+    ):
+        """Smoothed target mean encoding, following Max Halford's
+        https://maxhalford.github.io/blog/target-encoding/. Training rows are encoded
+        out of fold so no row sees its own target. Each column is factorized once into
+        integer codes with per-category count and sum arrays, which are reused for every
+        later split and test set; encoding is an np.take of smoothed means by code.
+        Args:
+            columns (str or list): columns to encode, each added as {column}_smooth
+            n_splits (int, optional): folds for out-of-fold encoding. Defaults to 5.
+            min_samples (float, optional): weight of the global mean. Defaults to training
+                rows per category.
+            random_state (int, optional): seed for the fold shuffle. Defaults to None.
+        """
+        self.columns = [columns] if isinstance(columns, str) else list(columns)
+        self.n_splits = n_splits
+        self.min_samples = min_samples
+        self.random_state = random_state
+        self.categories = {}
+        self.codes = {}
+        self.y = None
+
+    def fit(self, df: pd.DataFrame, y) -> "TargetEncoder":
+        """Factorize each column and cache its codes for the rows of df
+        Args:
+            df (pd.DataFrame): training rows holding the encoding columns
+            y: target values for the rows of df
+        """
+        self.y = np.asarray(y, dtype=np.float64)
+        for column in self.columns:
+            codes, categories = pd.factorize(df[column])
+            # missing values share an extra last code that always gets the global mean
+            self.codes[column] = np.where(codes < 0, len(categories), codes)
+            self.categories[column] = pd.Index(categories)
+        return self
+
+    def _statistics(self, column: str, rows: np.ndarray) -> tuple:
+        """Per-category counts and target sums over the given fitted rows"""
+        codes = self.codes[column][rows]
+        size = len(self.categories[column]) + 1
+        counts = np.bincount(codes, minlength=size)
+        sums = np.bincount(codes, weights=self.y[rows], minlength=size)
+        return counts, sums
+
+    def _smoothed(self, counts: np.ndarray, sums: np.ndarray) -> np.ndarray:
+        total = counts.sum()
+        mean = sums.sum() / total
+        m = self.min_samples or total / max(np.count_nonzero(counts[:-1]), 1)
+        smooth = (sums + m * mean) / (counts + m)
+        smooth[-1] = mean
+        return smooth
+
+    def _encode_rows(self, rows: np.ndarray) -> dict:
+        """Out-of-fold encodings for the given fitted rows, using only those rows"""
+        folds = KFold(self.n_splits, shuffle=True, random_state=self.random_state)
+        encoded = {}
+        for column in self.columns:
+            counts, sums = self._statistics(column, rows)
+            values = np.empty(len(rows))
+            for _, held_out in folds.split(rows):
+                # statistics without the held out rows are the totals minus theirs
+                fold_counts, fold_sums = self._statistics(column, rows[held_out])
+                smooth = self._smoothed(counts - fold_counts, sums - fold_sums)
+                values[held_out] = np.take(smooth, self.codes[column][rows[held_out]])
+            encoded[column] = values
+        return encoded
+
+    def _frame(self, encoded: dict, index: pd.Index) -> pd.DataFrame:
+        return pd.DataFrame(
+            {f"{column}_smooth": values for column, values in encoded.items()},
+            index=index,
+        )
+
+    def fit_transform(self, df: pd.DataFrame, y) -> pd.DataFrame:
+        """Fit on df and return its out-of-fold encodings"""
+        self.fit(df, y)
+        return self._frame(self._encode_rows(np.arange(len(df))), df.index)
+
+    def transform(
+        self, df: pd.DataFrame, rows: Optional[np.ndarray] = None
+    ) -> pd.DataFrame:
+        """Encode new rows with smoothed means from the fitted rows. Unseen categories
+        get the global mean.
+        Args:
+            df (pd.DataFrame): rows to encode
+            rows (np.ndarray, optional): positions of the fitted rows to take statistics
+                from. Defaults to all of them.
+        """
+        rows = np.arange(len(self.y)) if rows is None else rows
+        encoded = {}
+        for column in self.columns:
+            smooth = self._smoothed(*self._statistics(column, rows))
+            codes = self.categories[column].get_indexer(df[column])
+            # unseen categories come back as -1, which takes the global mean at the end
+            encoded[column] = np.take(smooth, codes)
+        return self._frame(encoded, df.index)
+
+    def split_transform(self, train: np.ndarray, test: np.ndarray) -> tuple:
+        """Encode a train/test split of the fitted rows from the cached codes, without
+        regrouping: out-of-fold encodings for train and train-only means for test
+        Args:
+            train (np.ndarray): positions of the training rows
+            test (np.ndarray): positions of the test rows
+        Returns:
+            tuple: train and test encodings as arrays keyed by column
+        """
+        train_encoded = self._encode_rows(np.asarray(train))
+        test_encoded = {}
+        for column in self.columns:
+            smooth = self._smoothed(*self._statistics(column, np.asarray(train)))
+            test_encoded[column] = np.take(smooth, self.codes[column][test])
+        return train_encoded, test_encoded
@@ -7,23 +7,55 @@ import scipy.stats as stats
 from scipy.stats import norm
 from statsmodels.tsa.stattools import adfuller
 
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler, PolynomialFeatures
+from polynomial_features import polynomial_fits
+from plot_summaries import box_summaries, histogram2d, stratified_sample
 
 
 class VisualizationTool():
 
-    def __init__(self, target):
+    def __init__(self, target, max_rows=100_000, max_boxes=30, random_state=None):
+        '''max_rows - above this many rows the scatter and boxplot helpers switch to large data mode:
+        2D histograms in place of scatters, boxes from grouped quantiles in place of melted frames,
+        and stratified samples capped at max_rows. None always plots every row
+        max_boxes - most boxes per continuous column in large data mode, beyond which values are quantile binned
+        random_state - seed for the samples
+        '''
         self.target = target
-        pass
+        self.max_rows = max_rows
+        self.max_boxes = max_boxes
+        self.random_state = random_state
+
+    def _large(self, df):
+        return self.max_rows is not None and len(df) > self.max_rows
+
+    def _plot_grid(self, df, x, ax, cmap="magma_r"):
+        # draw target against x as a 2D histogram of counts, in time independent of the row count
+        grid, x_edges, y_edges = histogram2d(df[x], df[self.target], clip=0.001)
+        mesh = ax.pcolormesh(x_edges, y_edges, grid, cmap=cmap, norm="log")
+        plt.colorbar(mesh, ax=ax, label="rows")
+
+    def _box_grid(self, df, columns, max_boxes=None):
+        # draw boxplots of the target per column value from grouped quantiles, two to a row
+        rows = (len(columns) + 1) // 2
+        fig, axes = plt.subplots(nrows=rows, ncols=2, figsize=(15, 5 * rows), squeeze=False)
+        for ax, column in zip(axes.flatten(), columns):
+            boxes = box_summaries(df, column, self.target, max_boxes=max_boxes)
+            ax.bxp(boxes, showfliers=False)
+            ax.set_title(f"variable = {column}")
+            ax.tick_params(axis="x", rotation=90)
+        for ax in axes.flatten()[len(columns):]:
+            ax.set_visible(False)
+        fig.tight_layout()
 
     def basic_hist(self, df):
         df.hist(figsize=(18,15), bins='auto')
     
     def hist_norm_prob(self, df, field:str):
-        sns.distplot(df[field], fit=norm)
+        # the density estimate and probability plot touch every value, so large data is plotted from a sample
+        sample = stratified_sample(df, max_rows=self.max_rows, random_state=self.random_state) if self._large(df) else df
+        sns.distplot(sample[field], fit=norm)
         fig = plt.figure()
-        res = stats.probplot(df[field], plot=plt)
+        res = stats.probplot(sample[field], plot=plt)
         print("Skewness: %f" % df[field].skew())
         print("Kurtosis: %f" % df[field].kurt())
     
@@ -32,30 +64,52 @@ class VisualizationTool():
 
         plt.figure(figsize=(25,25))
 
+        if self._large(df) and color and not pd.api.types.is_numeric_dtype(df[color]):
+            # large data with a categorical color: a sample keeping every category's share
+            df = stratified_sample(df, by=color, max_rows=self.max_rows, random_state=self.random_state)
+        elif self._large(df):
+            # large data: draw the mean of the color column over a 2D histogram grid
+            grid, x_edges, y_edges = histogram2d(df[x], df[y], weights=df[color] if color else None)
+            mesh = plt.pcolormesh(x_edges, y_edges, grid, cmap="magma_r")
+            plt.colorbar(mesh, label=color or "rows")
+            plt.xlabel(x)
+            plt.ylabel(y)
+            return
+
         sns.scatterplot(data=df, x=x, y=y, hue=color, palette="magma_r");
 
-    def time_series_plot(self, df, date_field):
+    def time_series_plot(self, df, date_field, cache=None, window=10):
+        '''Daily mean of the target with its rolling mean and standard deviation, then
+        a Dickey-Fuller test. A model's time_series cache can be passed in place of
+        regrouping df, and df may then be None.'''
 
-        time_series_df = df.copy()
+        if cache is not None:
+            # the cache holds daily means with rolling statistics ready to read
+            rolling = cache.rolling('D', [window])
+            self.grouped_time_series_df = rolling[['mean']].rename(columns={'mean': self.target})
+            roll_mean = rolling[f'rolling_mean_{window}']
+            roll_std = rolling[f'rolling_std_{window}']
+        else:
+            time_series_df = df.copy()
 
-        # make a new df with just the date and price
-        time_series_df = time_series_df[[date_field, self.target]]
+            # make a new df with just the date and price
+            time_series_df = time_series_df[[date_field, self.target]]
 
-        # convert our date field to a proper datetime
-        time_series_df[date_field] = pd.to_datetime(time_series_df[date_field])
+            # convert our date field to a proper datetime
+            time_series_df[date_field] = pd.to_datetime(time_series_df[date_field])
 
-        # set the date as our index
-        time_series_df.set_index(date_field, inplace=True)
+            # set the date as our index
+            time_series_df.set_index(date_field, inplace=True)
 
-        # group our data by day
-        self.grouped_time_series_df = time_series_df.groupby(pd.Grouper(freq='D')).mean()
+            # group our data by day
+            self.grouped_time_series_df = time_series_df.groupby(pd.Grouper(freq='D')).mean()
 
-        # backfill any empty days by getting previous day's mean
-        self.grouped_time_series_df.bfill(inplace=True)
+            # backfill any empty days by getting the next day's mean
+            self.grouped_time_series_df.bfill(inplace=True)
 
-        # find the rolling mean and rolling standard deviation
-        roll_mean = self.grouped_time_series_df.rolling(window=10, center=False).mean()
-        roll_std = self.grouped_time_series_df.rolling(window=10, center=False).std()
+            # find the rolling mean and rolling standard deviation
+            roll_mean = self.grouped_time_series_df.rolling(window=window, center=False).mean()
+            roll_std = self.grouped_time_series_df.rolling(window=window, center=False).std()
 
         # plot the figure with rolling mean and standard deviation
         fig = plt.figure(figsize=(12,7))
@@ -66,30 +120,35 @@ class VisualizationTool():
         plt.title('Rolling Mean & Standard Deviation')
         plt.show(block=False)
 
-        self.dickey_fuller()
+        self.dickey_fuller(cache)
 
-    def dickey_fuller(self):
-        dftest = adfuller(self.grouped_time_series_df)
+    def dickey_fuller(self, cache=None):
 
-        # Extract and display test results in a user friendly manner
-        dfoutput = pd.Series(dftest[0:4], index=['Test Statistic', 'p-value', '#Lags Used', 'Number of Observations Used'])
-        for key,value in dftest[4].items():
-            dfoutput['Critical Value (%s)'%key] = value
+        if cache is not None:
+            # the cache keeps its test result until rows are added or removed
+            dfoutput = cache.adf('D')
+        else:
+            dftest = adfuller(self.grouped_time_series_df)
+
+            # Extract and display test results in a user friendly manner
+            dfoutput = pd.Series(dftest[0:4], index=['Test Statistic', 'p-value', '#Lags Used', 'Number of Observations Used'])
+            for key,value in dftest[4].items():
+                dfoutput['Critical Value (%s)'%key] = value
 
         print ('Results of Dickey-Fuller test: \n')
         print(dfoutput)
 
-    def correlation_heat_map(self, df):
+    def correlation_heat_map(self, df, corr=None):
 
         # look for multicollinearity of features
         fig, ax = plt.subplots(figsize=(20, 20))
 
-        # get the correlations for our train data
-        correlated_data = df.corr()
+        # get the correlations for our train data, unless the model already has them
+        correlated_data = df.corr(numeric_only=True) if corr is None else corr
 
         # we want our heatmap to not show the upper triangle, which is redundant data
         # get a mask for the upper diagonal
-        correlated_data_mask = np.triu(np.ones_like(correlated_data, dtype=np.bool))
+        correlated_data_mask = np.triu(np.ones_like(correlated_data, dtype=bool))
 
         # adjust mask and df to hide center diagonal
         correlated_data_mask = correlated_data_mask[1:, :-1]
@@ -118,6 +177,10 @@ class VisualizationTool():
 
     def visualize_categoricals(self, df, categoricals):
 
+        if self._large(df):
+            self._box_grid(df, categoricals)
+            return
+
         # make our categorical data frame to work with
         df_categoricals = df[categoricals]
 
@@ -135,13 +198,17 @@ class VisualizationTool():
 
         #visualization categories
         f = pd.melt(df_categoricals, id_vars=[self.target], value_vars=categoricals)
-        g = sns.FacetGrid(f, col="variable",  col_wrap=2, sharex=False, sharey=False, size=5)
+        g = sns.FacetGrid(f, col="variable",  col_wrap=2, sharex=False, sharey=False, height=5)
         g = g.map(boxplot, "value", self.target)
 
         df_categoricals.drop(self.target, axis=1, inplace=True)
 
     def visualize_continuous(self, df, continuous):
 
+        if self._large(df):
+            self._box_grid(df, continuous, self.max_boxes)
+            return
+
         # make our continuous frame to work with
         x_continuous = df[continuous]
         x_continuous[self.target] = df[self.target]
@@ -151,7 +218,7 @@ class VisualizationTool():
             x=plt.xticks(rotation=90)
 
         f = pd.melt(x_continuous, id_vars=[self.target], value_vars=continuous)
-        g = sns.FacetGrid(f, col="variable",  col_wrap=2, sharex=False, sharey=False, size=5)
+        g = sns.FacetGrid(f, col="variable",  col_wrap=2, sharex=False, sharey=False, height=5)
         g = g.map(boxplot, "value", self.target)
 
     def visualize_scatters(self, df, continuous):
@@ -159,16 +226,21 @@ class VisualizationTool():
         x_continuous = df[continuous]
         x_continuous[self.target] = df[self.target]
 
-        # plot our larger continuous as scatter plots vs price
-        large_cont = ['sqft_living', 'sqft_living15', 'sqft_lot', 'sqft_basement', 'zip_smooth', 'year_smooth', 'month_smooth', 'lat_long']
-
-        fig, axes = plt.subplots(nrows=4, ncols=2, figsize=(15,25), sharey=True)
+        # plot our continuous columns as scatter plots vs price, two to a row
+        rows = (len(continuous) + 1) // 2
+        fig, axes = plt.subplots(nrows=rows, ncols=2, figsize=(15, 6 * rows), sharey=True, squeeze=False)
 
-        for ax, column in zip(axes.flatten(), large_cont):
-            ax.scatter(x_continuous[column], x_continuous[self.target], label=column, alpha=.1)
+        for ax, column in zip(axes.flatten(), continuous):
+            if self._large(df):
+                self._plot_grid(df, column, ax)
+            else:
+                ax.scatter(x_continuous[column], x_continuous[self.target], label=column, alpha=.1)
             ax.set_title(f'{self.target} vs {column}')
             ax.set_xlabel(column)
-            ax.set_ylabel('{self.target}')
+            ax.set_ylabel(f'{self.target}')
+
+        for ax in axes.flatten()[len(continuous):]:
+            ax.set_visible(False)
 
         fig.tight_layout()
 
@@ -180,36 +252,14 @@ class VisualizationTool():
         y axis variable values
         x-axis label
         visualization title'''
-        x = y.index
-    
-        # express numbers as arrays and reshape
+        x = np.array(y.index)
         y = np.array(y)
-        x = np.array(x)
-        x = x.reshape(-1, 1)
-    
+
         # plot figure
         plt.figure(figsize=(16, 8))
 
-        # standard linear regression
-        linreg = LinearRegression()
-        linreg.fit(x, y)
-
-        # 2nd degree polynomial regression
-        poly2 = PolynomialFeatures(degree=2)
-        x_poly2 = poly2.fit_transform(x)
-        poly_reg2 = LinearRegression()
-        poly_reg2.fit(x_poly2, y)
-
-        # third degree polynomial regression 
-        poly3 = PolynomialFeatures(degree=3)
-        x_poly3 = poly3.fit_transform(x)
-        poly_reg3 = LinearRegression()
-        poly_reg3.fit(x_poly3, y)
-
-        # predict on x values
-        pred = linreg.predict(x)
-        pred2 = poly_reg2.predict(x_poly2)
-        pred3 = poly_reg3.predict(x_poly3)
+        # linear, 2nd and 3rd degree polynomial fits from one least squares solve
+        (pred, pred2, pred3), _ = polynomial_fits(x, y, degree=3)
 
         # plot regression lines
         plt.scatter(x, y)
@@ -223,4 +273,18 @@ class VisualizationTool():
 
     def plot_polynomials(self, df, field):
         y = df.groupby(field)[self.target].mean()
-        self._plot_polys(y, "Year Sold", "Year Sold Mean")
\ No newline at end of file
+        self._plot_polys(y, "Year Sold", "Year Sold Mean")
+
+    def report(self, frames, output_dir, plots, formats=('png',), dpi=100, n_jobs=None):
+        '''Render plots headlessly to image files with an HTML index in output_dir, skipping plots
+        whose inputs are unchanged since the last run. See plot_report.PlotReport
+        frames - a data frame, or a dict of variant name to data frame rendered into subdirectories
+        plots - (name, method, kwargs) entries, such as from plot_report.eda_plots
+        n_jobs - worker processes, None to render in this process
+        '''
+        from plot_report import PlotReport
+
+        report = PlotReport(self, plots, formats=formats, dpi=dpi, n_jobs=n_jobs)
+        if isinstance(frames, pd.DataFrame):
+            return report.render(frames, output_dir)
+        return report.render_many(frames, output_dir)
@@ -0,0 +1,146 @@
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class CorrelationEngine:
+    def __init__(self):
+        """Pearson correlations kept as pairwise sufficient statistics (counts, sums,
+        sums of squares and cross-products over rows where both columns are present),
+        so removing rows, adding rows, adding columns and dropping columns update the
+        matrix without a full pass over the data. Missing values are handled pairwise,
+        the same way as DataFrame.corr.
+        """
+        self.reset()
+
+    def reset(self) -> None:
+        self.columns = []
+        self.shift = np.empty(0)
+        self.n_rows = 0
+        self.count = None
+        self.sums = None
+        self.squares = None
+        self.cross = None
+
+    @property
+    def fitted(self) -> bool:
+        return self.count is not None
+
+    def _prepare(
+        self, df: pd.DataFrame, columns: list, shift: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Shifted values with missing entries zeroed, and the float presence mask"""
+        values = df[columns].to_numpy(dtype=np.float64) - shift
+        present = ~np.isnan(values)
+        values[~present] = 0.0
+        return values, present.astype(np.float64)
+
+    def _block(
+        self, a: np.ndarray, pa: np.ndarray, b: np.ndarray, pb: np.ndarray
+    ) -> tuple:
+        """Statistics of the columns of a against the columns of b"""
+        return pa.T @ pb, a.T @ pb, (a * a).T @ pb, a.T @ b
+
+    def fit(self, df: pd.DataFrame) -> "CorrelationEngine":
+        """Compute the statistics for every numeric column of df
+        Args:
+            df (pd.DataFrame): data to correlate
+        """
+        self.columns = list(df.select_dtypes(include=["number", "bool"]).columns)
+        # shifting by the column means keeps the raw sums well conditioned
+        self.shift = np.nan_to_num(df[self.columns].mean().to_numpy(dtype=np.float64))
+        self.n_rows = len(df)
+        values, present = self._prepare(df, self.columns, self.shift)
+        self.count, self.sums, self.squares, self.cross = self._block(
+            values, present, values, present
+        )
+        return self
+
+    def _update_rows(self, rows: pd.DataFrame, sign: int) -> None:
+        values, present = self._prepare(rows, self.columns, self.shift)
+        for stat, delta in zip(
+            ("count", "sums", "squares", "cross"),
+            self._block(values, present, values, present),
+        ):
+            setattr(self, stat, getattr(self, stat) + sign * delta)
+        self.n_rows += sign * len(rows)
+
+    def add_rows(self, rows: pd.DataFrame) -> None:
+        """Add the contribution of new rows"""
+        self._update_rows(rows, 1)
+
+    def remove_rows(self, rows: pd.DataFrame) -> None:
+        """Subtract the contribution of removed rows"""
+        self._update_rows(rows, -1)
+
+    def add_column(self, df: pd.DataFrame, name: str) -> None:
+        """Add a column, reading it and the tracked columns from df once
+        Args:
+            df (pd.DataFrame): current data, holding the tracked columns and name
+            name (str): column to add
+        """
+        shift = np.nan_to_num(np.float64(df[name].mean()))
+        old, p_old = self._prepare(df, self.columns, self.shift)
+        new, p_new = self._prepare(df, [name], np.array([shift]))
+        old_new = self._block(old, p_old, new, p_new)
+        new_old = self._block(new, p_new, old, p_old)
+        new_new = self._block(new, p_new, new, p_new)
+        for stat, on, no, nn in zip(
+            ("count", "sums", "squares", "cross"), old_new, new_old, new_new
+        ):
+            setattr(self, stat, np.block([[getattr(self, stat), on], [no, nn]]))
+        self.columns.append(name)
+        self.shift = np.append(self.shift, shift)
+
+    def drop_column(self, name: str) -> None:
+        """Drop a column from the statistics"""
+        i = self.columns.index(name)
+        for stat in ("count", "sums", "squares", "cross"):
+            matrix = getattr(self, stat)
+            setattr(self, stat, np.delete(np.delete(matrix, i, axis=0), i, axis=1))
+        self.columns.pop(i)
+        self.shift = np.delete(self.shift, i)
+
+    def matrix(self) -> pd.DataFrame:
+        """Correlation matrix of the tracked columns"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            count = np.where(self.count > 1, self.count, np.nan)
+            covariance = self.cross - self.sums * self.sums.T / count
+            variance = self.squares - self.sums**2 / count
+            corr = covariance / np.sqrt(variance * variance.T)
+        corr = np.clip(corr, -1.0, 1.0)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+def correlated_pairs(
+    corr: pd.DataFrame,
+    lower: Optional[float] = None,
+    upper: Optional[float] = None,
+    k: Optional[int] = None,
+) -> pd.DataFrame:
+    """return feature pairs by absolute correlation, read from the upper triangle of
+    a correlation matrix so each pair appears once
+    Arguments:
+    corr - correlation matrix
+    lower - only pairs above this absolute correlation
+    upper - only pairs below this absolute correlation
+    k - only the k most correlated pairs
+    """
+    values = corr.to_numpy()
+    rows, cols = np.triu_indices(len(values), 1)
+    pair_corr = np.abs(values[rows, cols])
+    keep = ~np.isnan(pair_corr)
+    if lower is not None:
+        keep &= pair_corr > lower
+    if upper is not None:
+        keep &= pair_corr < upper
+    selected = np.flatnonzero(keep)
+    if k is not None and k < len(selected):
+        selected = selected[np.argpartition(-pair_corr[selected], k - 1)[:k]]
+    selected = selected[np.argsort(-pair_corr[selected], kind="stable")]
+    pairs = pd.MultiIndex.from_arrays(
+        [corr.index[rows[selected]], corr.columns[cols[selected]]],
+        names=["feature1", "feature2"],
+    )
+    return pd.DataFrame({"correlation": pair_corr[selected]}, index=pairs)
@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from module6.module6_mapped_table import MappedTable
+
+# Compact dtypes for the King County housing columns. "category" columns are
+# parsed with their natural dtype and then converted, and "datetime" columns are
+# parsed with DATE_FORMAT.
+KING_COUNTY_SCHEMA = {
+    "id": "int64",
+    "date": "datetime",
+    "price": "float32",
+    "bedrooms": "int16",
+    "bathrooms": "float32",
+    "sqft_living": "int32",
+    "sqft_lot": "int32",
+    "floors": "float32",
+    "waterfront": "int8",
+    "view": "int8",
+    "condition": "int8",
+    "grade": "int8",
+    "sqft_above": "int32",
+    "sqft_basement": "int32",
+    "yr_built": "int16",
+    "yr_renovated": "int16",
+    "zipcode": "category",
+    "lat": "float64",
+    "long": "float64",
+    "sqft_living15": "int32",
+    "sqft_lot15": "int32",
+}
+
+DATE_FORMAT = "%Y%m%dT%H%M%S"
+CACHE_SUFFIX = ".cache"
+CACHE_VERSION = 1
+
+
+class DataLoader:
+    def __init__(self, schema: Optional[dict] = None, cache: bool = True):
+        """Loads csv files with an explicit schema and keeps a binary cache of the
+        parsed columns next to the csv, one .npy file per column
+        Args:
+            schema (dict, optional): column name to dtype. Use "category" or "datetime"
+                for parsed columns. Columns not in the schema are inferred. Defaults to
+                None, applying KING_COUNTY_SCHEMA to files with the King County columns
+                and inferring every column of other files.
+            cache (bool, optional): read and write the binary cache. Defaults to True.
+        """
+        self.schema = schema
+        self.cache = cache
+
+    def load(self, filename: str) -> pd.DataFrame:
+        """Load file from the binary cache if it is current, otherwise parse the csv
+        and refresh the cache
+        Args:
+            filename (str): filename in csv format
+        Returns:
+            pd.DataFrame: typed df loaded from file
+        """
+        if not self.cache:
+            return self.read_csv(filename)
+
+        cache_dir = self.cache_path(filename)
+        key = self._file_key(filename)
+        meta = self._read_meta(cache_dir)
+        if self._is_current(filename, meta, key):
+            try:
+                return self._read_cache(cache_dir, meta)
+            except (OSError, ValueError, KeyError):
+                pass
+
+        df = self.read_csv(filename)
+        key["sha1"] = self._file_hash(filename)
+        try:
+            self._write_cache(df, cache_dir, key)
+        except OSError:
+            # read-only data directories still load, just without a cache
+            pass
+        return df
+
+    def load_mapped(self, filename: str) -> MappedTable:
+        """Memory-map the binary cache for filename, building it first if needed
+        Args:
+            filename (str): filename in csv format
+        Returns:
+            MappedTable: read-only view over the cached columns
+        """
+        if not self.cache:
+            raise ValueError("memory-mapped loading needs the binary cache enabled")
+        cache_dir = self.cache_path(filename)
+        if not self._is_current(
+            filename, self._read_meta(cache_dir), self._file_key(filename)
+        ):
+            df = self.read_csv(filename)
+            key = self._file_key(filename)
+            key["sha1"] = self._file_hash(filename)
+            try:
+                self._write_cache(df, cache_dir, key)
+            except OSError:
+                # read-only data directories map a cache built in a temp directory
+                cache_dir = os.path.join(
+                    tempfile.mkdtemp(prefix="mapped-"), os.path.basename(cache_dir)
+                )
+                self._write_cache(df, cache_dir, key)
+        return MappedTable(cache_dir)
+
+    def read_csv(self, filename: str) -> pd.DataFrame:
+        """Parse the csv applying the schema dtypes
+        Args:
+            filename (str): filename in csv format
+        Returns:
+            pd.DataFrame: typed df
+        """
+        schema, read_dtypes = self._csv_dtypes(filename)
+        df = pd.read_csv(filename, dtype=read_dtypes, on_bad_lines="skip")
+        for col, dtype in schema.items():
+            if dtype == "datetime":
+                df[col] = pd.to_datetime(df[col], format=DATE_FORMAT)
+            elif dtype == "category":
+                df[col] = df[col].astype("category")
+        return df
+
+    def iter_csv(
+        self, filename: str, chunksize: int = 100_000
+    ) -> Iterator[pd.DataFrame]:
+        """Parse the csv in chunks applying the schema dtypes, for data too large
+        to load at once. Category columns keep their parsed values, since each chunk
+        would otherwise get its own categories.
+        Args:
+            filename (str): filename in csv format
+            chunksize (int, optional): rows per chunk. Defaults to 100_000.
+        Yields:
+            pd.DataFrame: typed chunk
+        """
+        schema, read_dtypes = self._csv_dtypes(filename)
+        with pd.read_csv(
+            filename, dtype=read_dtypes, on_bad_lines="skip", chunksize=chunksize
+        ) as reader:
+            for chunk in reader:
+                for col, dtype in schema.items():
+                    if dtype == "datetime":
+                        chunk[col] = pd.to_datetime(chunk[col], format=DATE_FORMAT)
+                yield chunk
+
+    def schema_for(self, filename: str) -> dict:
+        """The schema applied to filename: the loader's own, or KING_COUNTY_SCHEMA
+        when none was given and the file has the King County columns"""
+        if self.schema is not None:
+            return self.schema
+        columns = pd.read_csv(filename, nrows=0).columns
+        return KING_COUNTY_SCHEMA if set(KING_COUNTY_SCHEMA) <= set(columns) else {}
+
+    def _csv_dtypes(self, filename: str) -> Tuple[dict, dict]:
+        """Schema entries for the columns in the file, and the dtypes to pass to
+        read_csv for them. Dates are read as strings and categories inferred, then
+        both are converted after parsing."""
+        columns = pd.read_csv(filename, nrows=0).columns
+        schema = {
+            col: dtype
+            for col, dtype in self.schema_for(filename).items()
+            if col in columns
+        }
+        read_dtypes = {
+            col: (str if dtype == "datetime" else dtype)
+            for col, dtype in schema.items()
+            if dtype != "category"
+        }
+        return schema, read_dtypes
+
+    def cache_path(self, filename: str) -> str:
+        """Directory holding the binary cache for filename"""
+        return f"{filename}{CACHE_SUFFIX}"
+
+    def _schema_hash(self, filename: str) -> str:
+        return hashlib.sha1(
+            json.dumps(self.schema_for(filename), sort_keys=True).encode()
+        ).hexdigest()
+
+    def _file_key(self, filename: str) -> dict:
+        stat = os.stat(filename)
+        return {
+            "version": CACHE_VERSION,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "schema": self._schema_hash(filename),
+        }
+
+    def _file_hash(self, filename: str) -> str:
+        sha1 = hashlib.sha1()
+        with open(filename, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha1.update(block)
+        return sha1.hexdigest()
+
+    def _read_meta(self, cache_dir: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(cache_dir, "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _is_current(self, filename: str, meta: Optional[dict], key: dict) -> bool:
+        """Cache is current when size, schema and mtime match. A changed mtime with
+        the same size falls back to comparing the content hash, so copied or touched
+        files keep their cache."""
+        if meta is None:
+            return False
+        if any(
+            meta["key"].get(field) != key[field]
+            for field in ("version", "size", "schema")
+        ):
+            return False
+        if meta["key"]["mtime_ns"] == key["mtime_ns"]:
+            return True
+        return meta["key"]["sha1"] == self._file_hash(filename)
+
+    def _write_cache(self, df: pd.DataFrame, cache_dir: str, key: dict) -> None:
+        parent = os.path.dirname(os.path.abspath(cache_dir))
+        tmp_dir = tempfile.mkdtemp(prefix=".cache-", dir=parent)
+        try:
+            columns = []
+            for i, col in enumerate(df.columns):
+                series = df[col]
+                entry = {"name": col, "file": f"col_{i}.npy"}
+                if pd.api.types.is_datetime64_dtype(series.dtype):
+                    values = series.to_numpy()
+                    entry.update(kind="datetime")
+                elif pd.api.types.is_numeric_dtype(series.dtype):
+                    values = series.to_numpy()
+                    entry.update(kind="numeric")
+                else:
+                    # categoricals and strings are stored as int32 codes
+                    categorical = pd.Categorical(series)
+                    values = categorical.codes.astype(np.int32)
+                    categories = np.asarray(categorical.categories)
+                    if categories.dtype == object:
+                        categories = categories.astype(str)
+                    np.save(os.path.join(tmp_dir, f"cat_{i}.npy"), categories)
+                    kind = (
+                        "category"
+                        if isinstance(series.dtype, pd.CategoricalDtype)
+                        else "object"
+                    )
+                    entry.update(kind=kind, categories=f"cat_{i}.npy")
+                np.save(os.path.join(tmp_dir, entry["file"]), values)
+                columns.append(entry)
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump({"key": key, "rows": len(df), "columns": columns}, f)
+            if os.path.isdir(cache_dir):
+                shutil.rmtree(cache_dir)
+            os.replace(tmp_dir, cache_dir)
+        finally:
+            if os.path.isdir(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _read_cache(self, cache_dir: str, meta: dict) -> pd.DataFrame:
+        data = {}
+        for entry in meta["columns"]:
+            values = np.load(os.path.join(cache_dir, entry["file"]), allow_pickle=False)
+            if entry["kind"] in ("category", "object"):
+                categories = np.load(
+                    os.path.join(cache_dir, entry["categories"]), allow_pickle=False
+                )
+                values = pd.Categorical.from_codes(values, categories)
+                if entry["kind"] == "object":
+                    values = values.astype(object)
+            data[entry["name"]] = values
+        return pd.DataFrame(data, copy=False)
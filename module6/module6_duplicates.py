@@ -0,0 +1,154 @@
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+KEEP_POLICIES = ("first", "last", "latest")
+
+
+def row_keys(df: pd.DataFrame, subset: Optional[list] = None) -> np.ndarray:
+    """uint64 hash of each row's values in the subset columns, or in every column.
+    Rows with equal values get equal keys, and different rows collide with
+    probability around 2**-64 per pair.
+    """
+    columns = df if subset is None else df[list(subset)]
+    return pd.util.hash_pandas_object(columns, index=False).to_numpy()
+
+
+def order_values(series: pd.Series) -> np.ndarray:
+    """Sort values for a date or numeric column, int64 nanoseconds for dates. Missing
+    values sort first."""
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return series.to_numpy(dtype=np.float64, na_value=-np.inf)
+    if not pd.api.types.is_datetime64_any_dtype(series.dtype):
+        series = pd.to_datetime(series)
+    return series.to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+def _winners(keys: np.ndarray, rows: np.ndarray, keep: str, order=None) -> np.ndarray:
+    """Positions in keys of the row kept for each distinct key: the lowest row for
+    "first", the highest for "last", and for "latest" the row with the highest order
+    value, ties going to the highest row
+    """
+    if keep == "first":
+        sort = np.lexsort((rows, keys))
+        head = np.ones(len(sort), dtype=bool)
+        head[1:] = keys[sort[1:]] != keys[sort[:-1]]
+        return sort[head]
+    if keep == "latest":
+        sort = np.lexsort((rows, order, keys))
+    else:
+        sort = np.lexsort((rows, keys))
+    tail = np.ones(len(sort), dtype=bool)
+    tail[:-1] = keys[sort[1:]] != keys[sort[:-1]]
+    return sort[tail]
+
+
+def duplicate_positions(
+    keys: np.ndarray, keep: str = "first", order: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Sorted positions of the duplicate rows a keep policy removes
+    Args:
+        keys (np.ndarray): row keys from row_keys
+        keep (str, optional): "first", "last" or "latest". Defaults to "first".
+        order (np.ndarray, optional): order values for "latest". Defaults to None.
+    Returns:
+        np.ndarray: positions of the removed rows
+    """
+    if keep not in KEEP_POLICIES:
+        raise ValueError(f"Unknown keep policy: {keep}")
+    if keep == "latest" and order is None:
+        raise ValueError('keep="latest" needs order values')
+    kept = np.zeros(len(keys), dtype=bool)
+    kept[_winners(keys, np.arange(len(keys)), keep, order)] = True
+    return np.flatnonzero(~kept)
+
+
+class DuplicateIndex:
+    def __init__(
+        self,
+        subset: Optional[list] = None,
+        keep: str = "first",
+        order_by: Optional[str] = "date",
+    ):
+        """Duplicate detection over data read in chunks, possibly from several files.
+        Holds only the key, row number and order value of the row currently kept for
+        each distinct key, plus the row numbers removed so far, so duplicates that
+        span chunks are found without concatenating them. Rows are numbered in the
+        order they are passed to update.
+        Args:
+            subset (list, optional): key columns. Defaults to every column.
+            keep (str, optional): "first", "last" or "latest". Defaults to "first".
+            order_by (str, optional): date column ordering rows for "latest".
+                Defaults to "date".
+        """
+        if keep not in KEEP_POLICIES:
+            raise ValueError(f"Unknown keep policy: {keep}")
+        self.subset = subset
+        self.keep = keep
+        self.order_by = order_by
+        self.rows = 0
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.kept = np.empty(0, dtype=np.int64)
+        self.order = np.empty(0, dtype=np.int64)
+        self._removed = []
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        keys = np.concatenate([self.keys, row_keys(chunk, self.subset)])
+        rows = np.concatenate(
+            [self.kept, np.arange(self.rows, self.rows + len(chunk), dtype=np.int64)]
+        )
+        order = None
+        if self.keep == "latest":
+            values = order_values(chunk[self.order_by])
+            order = np.concatenate([self.order.astype(values.dtype), values])
+        winners = _winners(keys, rows, self.keep, order)
+        lost = np.ones(len(keys), dtype=bool)
+        lost[winners] = False
+        self._removed.append(rows[lost])
+        self.keys, self.kept = keys[winners], rows[winners]
+        if order is not None:
+            self.order = order[winners]
+        self.rows += len(chunk)
+
+    @property
+    def removed(self) -> np.ndarray:
+        """Sorted row numbers of every duplicate removed so far"""
+        if len(self._removed) != 1:
+            self._removed = [np.concatenate([np.empty(0, np.int64), *self._removed])]
+        return np.sort(self._removed[0])
+
+    @property
+    def distinct(self) -> int:
+        return len(self.keys)
+
+
+def find_duplicates(
+    sources: Iterable,
+    subset: Optional[list] = None,
+    keep: str = "first",
+    order_by: Optional[str] = "date",
+) -> list:
+    """Duplicate rows across several sources, such as monthly extracts, each an
+    iterable of chunks like DataLoader.iter_csv, without holding them all at once
+    Args:
+        sources (Iterable): one iterable of DataFrame chunks per source
+        subset (list, optional): key columns. Defaults to every column.
+        keep (str, optional): "first", "last" or "latest". Sources count as being
+            in order for "first" and "last". Defaults to "first".
+        order_by (str, optional): date column for "latest". Defaults to "date".
+    Returns:
+        list: for each source, the row positions within it to remove
+    """
+    index = DuplicateIndex(subset, keep, order_by)
+    bounds = [0]
+    for chunks in sources:
+        for chunk in chunks:
+            index.update(chunk)
+        bounds.append(index.rows)
+    removed = index.removed
+    cuts = np.searchsorted(removed, bounds)
+    return [
+        removed[start:stop] - offset
+        for start, stop, offset in zip(cuts[:-1], cuts[1:], bounds[:-1])
+    ]
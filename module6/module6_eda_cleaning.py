@@ -1,6 +1,10 @@
 import pandas as pd
 import numpy as np
-from typing import Literal, Optional
+from typing import Optional, Tuple
+
+from module6.module6_correlation import correlated_pairs
+from module6.module6_duplicates import duplicate_positions, order_values, row_keys
+from module6.module6_streaming_stats import StreamingStatistics
 
 
 class EDACleaning:
@@ -19,6 +23,14 @@ class EDACleaning:
         print(f"Describe: {df.describe()}\n")
         print(f"isna sum: {df.isna().sum()}\n")
 
+    def print_streaming_statistics(self, stats: StreamingStatistics) -> None:
+        """Print basic statistics gathered in one pass over chunked data"""
+        print(stats.head)
+        print(f"DF shape: {(stats.rows, len(stats.dtypes))}\n")
+        print(f"Data types: {stats.dtypes}\n")
+        print(f"Describe: {stats.describe()}\n")
+        print(f"isna sum: {stats.isna()}\n")
+
     def print_sorted(
         self,
         df: pd.DataFrame,
@@ -38,35 +50,121 @@ class EDACleaning:
         find_outliers = self.df.groupby(field)[self.target].describe()
         find_outliers.sort_values("mean", ascending=False).head(20)
 
-    def drop_dupes(self, df: pd.DataFrame, subset: list = None) -> pd.DataFrame:
-        if subset:
-            df.drop_duplicates(subset, keep="last", inplace=True)
-        else:
-            df.drop_duplicates(inplace=True)
-        return df
+    def drop_dupes(
+        self,
+        df: pd.DataFrame,
+        subset: list = None,
+        keep: Optional[str] = None,
+        order_by: Optional[str] = "date",
+    ) -> pd.DataFrame:
+        """return df without its duplicate rows, leaving df itself unchanged"""
+        kept = np.ones(len(df), dtype=bool)
+        kept[self.duplicate_positions(df, subset, keep, order_by)] = False
+        return df[kept]
+
+    def duplicate_positions(
+        self,
+        df: pd.DataFrame,
+        subset: Optional[list] = None,
+        keep: Optional[str] = None,
+        order_by: Optional[str] = "date",
+    ) -> np.ndarray:
+        """return the positions of the duplicate rows, found by hashing the key
+        columns of each row into a uint64 key
+        Arguments:
+        df - dataframe to be evaluated
+        subset - key columns, defaulting to every column
+        keep - "first", "last" or "latest" by order_by. Defaults to "last" with a
+            subset and "first" without one
+        order_by - date column deciding the latest row
+        """
+        if keep is None:
+            keep = "last" if subset else "first"
+        order = order_values(df[order_by]) if keep == "latest" else None
+        return duplicate_positions(row_keys(df, subset or None), keep, order)
 
     def remove_outliers(
-        self, df: pd.DataFrame, fields: list, method: str, range: float
+        self,
+        df: pd.DataFrame,
+        fields: list,
+        method: str,
+        range: float,
+        mode: str = "sequential",
+        bounds: Optional[dict] = None,
     ) -> pd.DataFrame:
-        if method == "iqr":
-            for field in fields:
-                lower_range, upper_range = self._calculate_iqr(df[field], range)
-                df = df.drop(
-                    df[(df[field] > upper_range) | (df[field] < lower_range)].index
-                )
-        return df
+        return df[self.outlier_mask(df, fields, method, range, mode, bounds)]
 
-    def _calculate_iqr(self, column: pd.Series, range: float) -> Literal(float, float):
-        """return the lower range and upper range for the data based on IQR
+    def outlier_mask(
+        self,
+        df: pd.DataFrame,
+        fields: list,
+        method: str = "iqr",
+        range: float = 1.5,
+        mode: str = "sequential",
+        bounds: Optional[dict] = None,
+    ) -> np.ndarray:
+        """return a boolean mask of the rows that are not outliers in any of the fields
+        Arguments:
+        df - dataframe to be evaluated
+        fields - columns to be evaluated
+        method - "iqr", "zscore", "mad" or "quantile"
+        range - iqr multiple, number of standard deviations, number of scaled MADs,
+            or the tail fraction cut from each end for "quantile", which must be at
+            least 0 and below 0.5
+        mode - "simultaneous" computes every field's bounds on the full data in one
+            pass. "sequential" computes each field's bounds on the rows kept by the
+            fields before it, in field order
+        bounds - precomputed (lower range, upper range) per field, such as the
+            sketched StreamingStatistics.outlier_bounds. Overrides method and mode
+        """
+        values = df[fields].to_numpy(dtype=np.float64)
+        if bounds is not None:
+            lower_range, upper_range = np.array([bounds[field] for field in fields]).T
+            return ~((values > upper_range) | (values < lower_range)).any(axis=1)
+        if method == "quantile" and not 0 <= range < 0.5:
+            raise ValueError(
+                f"quantile outlier range is the tail fraction cut from each end and "
+                f"must be in [0, 0.5), got {range}"
+            )
+        if mode == "simultaneous":
+            lower_range, upper_range = self._calculate_bounds(values, method, range)
+            return ~((values > upper_range) | (values < lower_range)).any(axis=1)
+        if mode == "sequential":
+            mask = np.ones(len(values), dtype=bool)
+            for i in np.arange(values.shape[1]):
+                column = values[:, i]
+                lower_range, upper_range = self._calculate_bounds(
+                    column[mask], method, range
+                )
+                mask &= ~((column > upper_range) | (column < lower_range))
+            return mask
+        raise ValueError(f"Unknown outlier mode: {mode}")
+
+    def _calculate_bounds(
+        self, values: np.ndarray, method: str, range: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """return the lower range and upper range for each column of values
         Arguments:
-        column - column to be evaluated
-        iqr_level - iqr range to be evaluated
+        values - array of one or more columns to be evaluated
+        method - outlier method
+        range - range to be evaluated
         """
-        Q1, Q3 = np.percentile(column, [25, 75])
-        iqr = Q3 - Q1
-        lower_range = Q1 - (range * iqr)
-        upper_range = Q3 + (range * iqr)
-        return lower_range, upper_range
+        if method == "iqr":
+            Q1, Q3 = np.nanquantile(values, [0.25, 0.75], axis=0)
+            iqr = Q3 - Q1
+            return Q1 - (range * iqr), Q3 + (range * iqr)
+        if method == "zscore":
+            mean = np.nanmean(values, axis=0)
+            std = np.nanstd(values, axis=0, ddof=1)
+            return mean - (range * std), mean + (range * std)
+        if method == "mad":
+            # 1.4826 scales the MAD to the standard deviation for normal data
+            median = np.nanmedian(values, axis=0)
+            mad = 1.4826 * np.nanmedian(np.abs(values - median), axis=0)
+            return median - (range * mad), median + (range * mad)
+        if method == "quantile":
+            return tuple(np.nanquantile(values, [range, 1 - range], axis=0))
+        raise ValueError(f"Unknown outlier method: {method}")
 
     def drop_feature(self, df, field):
         # drop multicollinear features and unneeded features
@@ -75,46 +173,27 @@ class EDACleaning:
     def print_corr(self, df: pd.DataFrame):
         df.corr()
 
-    def show_correlated_pairs(self, df: pd.DataFrame):
-        # Get our list of highly correlated feature pairs with following steps:
-
-        # save correlation matrix as a new data frame
-        # converts all values to absolute value
-        # stacks the row:column pairs into a multindex
-        # reset the index to set the multindex to seperate columns
-        # sort values. 0 is the column automatically generated by the stacking
-        df_correlations = (
-            df.corr().abs().stack().reset_index().sort_values(0, ascending=False)
-        )
-
-        # zip the variable name columns in a new column named "pairs"
-        df_correlations["pairs"] = list(
-            zip(df_correlations.level_0, df_correlations.level_1)
-        )
-
-        # set index to pairs
-        df_correlations.set_index(["pairs"], inplace=True)
-
-        # rename our results column to correlation
-        df_correlations.rename(columns={0: "correlation"}, inplace=True)
-
-        # Drop 1:1 correlations to get rid of self pairs
-        df_correlations.drop(
-            df_correlations[df_correlations["correlation"] == 1.000000].index,
-            inplace=True,
-        )
-
-        # view pairs above 70% correlation and below 95% correlation (engineered features will correlate with each other above 95%)
-        df_correlations[
-            (df_correlations["correlation"] > 0.75)
-            & (df_correlations["correlation"] < 0.95)
-        ]
-
-    def show_target_correlation(self, df):
-        # Check out our variables correlationg with price
-        df_correlations = (
-            df.corr().abs().stack().reset_index().sort_values(0, ascending=False)
-        )
-        df_correlations.loc[df_correlations["level_0"] == self.target].sort_values(
-            0, ascending=False
-        )
+    def show_correlated_pairs(
+        self,
+        df: pd.DataFrame,
+        corr: Optional[pd.DataFrame] = None,
+        lower: Optional[float] = 0.75,
+        upper: Optional[float] = 0.95,
+        k: Optional[int] = None,
+    ) -> pd.DataFrame:
+        # Get our list of highly correlated feature pairs, each pair once from the
+        # upper triangle of the correlation matrix, most correlated first
+
+        # view pairs above 75% correlation and below 95% correlation (engineered features will correlate with each other above 95%)
+        if corr is None:
+            corr = df.corr(numeric_only=True)
+        return correlated_pairs(corr, lower=lower, upper=upper, k=k)
+
+    def show_target_correlation(
+        self, df: pd.DataFrame, corr: Optional[pd.DataFrame] = None
+    ) -> pd.Series:
+        # Check out our variables correlating with the target
+        if corr is None:
+            corr = df.corr(numeric_only=True)
+        target_corr = corr[self.target].drop(self.target).abs()
+        return target_corr.sort_values(ascending=False)
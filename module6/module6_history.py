@@ -0,0 +1,190 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+class Delta(ABC):
+    """One reversible change to the model data, storing only what the change removed"""
+
+    def __init__(self, action: str):
+        self.action = action
+
+    @property
+    @abstractmethod
+    def nbytes(self) -> int:
+        pass
+
+    @abstractmethod
+    def undo(self, data):
+        pass
+
+    @abstractmethod
+    def redo(self, data):
+        pass
+
+
+class RowsRemoved(Delta):
+    def __init__(self, action: str, before: pd.DataFrame, kept: np.ndarray):
+        """Rows dropped by a filter, kept as the removed rows and their positions
+        Args:
+            action (str): name of the task
+            before (pd.DataFrame): df before the filter
+            kept (np.ndarray): positions of the rows the filter kept
+        """
+        super().__init__(action)
+        mask = np.ones(len(before), dtype=bool)
+        mask[kept] = False
+        self.positions = np.flatnonzero(mask)
+        self.rows = before.take(self.positions)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.rows.memory_usage(deep=True).sum()) + self.positions.nbytes
+
+    def undo(self, df: pd.DataFrame) -> pd.DataFrame:
+        kept = np.ones(len(df) + len(self.positions), dtype=bool)
+        kept[self.positions] = False
+        order = np.argsort(
+            np.concatenate([np.flatnonzero(kept), self.positions]), kind="stable"
+        )
+        return pd.concat([df, self.rows]).take(order)
+
+    def redo(self, df: pd.DataFrame) -> pd.DataFrame:
+        kept = np.ones(len(df), dtype=bool)
+        kept[self.positions] = False
+        return df[kept]
+
+
+class ColumnDropped(Delta):
+    def __init__(self, action: str, before: pd.DataFrame, field: str):
+        """A dropped column and where it sat
+        Args:
+            action (str): name of the task
+            before (pd.DataFrame): df before the column was dropped
+            field (str): dropped column
+        """
+        super().__init__(action)
+        self.field = field
+        self.position = before.columns.get_loc(field)
+        self.values = before[field]
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.values.memory_usage(deep=True))
+
+    def undo(self, df: pd.DataFrame) -> pd.DataFrame:
+        df.insert(self.position, self.field, self.values)
+        return df
+
+    def redo(self, df: pd.DataFrame) -> pd.DataFrame:
+        df.drop([self.field], axis=1, inplace=True)
+        return df
+
+
+class IndexReset(Delta):
+    def __init__(self, action: str, before: pd.DataFrame):
+        """An index reset, kept as the labels it replaced
+        Args:
+            action (str): name of the task
+            before (pd.DataFrame): df before the reset
+        """
+        super().__init__(action)
+        self.index = before.index
+
+    @property
+    def nbytes(self) -> int:
+        if isinstance(self.index, pd.RangeIndex):
+            return 0
+        return int(self.index.memory_usage(deep=True))
+
+    def undo(self, df: pd.DataFrame) -> pd.DataFrame:
+        return df.set_axis(self.index, axis=0)
+
+    def redo(self, df: pd.DataFrame) -> pd.DataFrame:
+        return df.reset_index(drop=True)
+
+
+class TableChange(Delta):
+    def __init__(self, action: str, before, after):
+        """A change to a MappedTable view. Views only hold row and label arrays over
+        the shared mapping, so both sides are kept whole.
+        Args:
+            action (str): name of the task
+            before (MappedTable): view before the change
+            after (MappedTable): view after the change
+        """
+        super().__init__(action)
+        self.before = before
+        self.after = after
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            array.nbytes
+            for table in (self.before, self.after)
+            for array in (table.rows, table.labels)
+            if array is not None
+        )
+
+    def undo(self, table):
+        return self.before
+
+    def redo(self, table):
+        return self.after
+
+
+class EditHistory:
+    def __init__(self, budget: Optional[int] = 256 * 2**20):
+        """Multi-level undo/redo stack of deltas with a memory budget. The oldest
+        entries are evicted first once the stored deltas exceed the budget.
+        Args:
+            budget (int, optional): max bytes held by the undo and redo stacks.
+                None for no limit. Defaults to 256MB.
+        """
+        self.budget = budget
+        self.undo_stack = deque()
+        self.redo_stack = []
+
+    @property
+    def nbytes(self) -> int:
+        return sum(delta.nbytes for delta in self.undo_stack) + sum(
+            delta.nbytes for delta in self.redo_stack
+        )
+
+    def push(self, delta: Delta) -> None:
+        """Record a new change, clearing anything available to redo"""
+        self.redo_stack.clear()
+        self.undo_stack.append(delta)
+        if self.budget is not None:
+            total = self.nbytes
+            while self.undo_stack and total > self.budget:
+                total -= self.undo_stack.popleft().nbytes
+
+    def undo(self, data):
+        """Reverts the latest change on data
+        Returns:
+            tuple: reverted data and the undone delta
+        """
+        if not self.undo_stack:
+            raise IndexError("Nothing to undo")
+        delta = self.undo_stack.pop()
+        self.redo_stack.append(delta)
+        return delta.undo(data), delta
+
+    def redo(self, data):
+        """Re-applies the latest undone change on data
+        Returns:
+            tuple: changed data and the redone delta
+        """
+        if not self.redo_stack:
+            raise IndexError("Nothing to redo")
+        delta = self.redo_stack.pop()
+        self.undo_stack.append(delta)
+        return delta.redo(data), delta
+
+    def clear(self) -> None:
+        self.undo_stack.clear()
+        self.redo_stack.clear()
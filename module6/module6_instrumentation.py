@@ -0,0 +1,183 @@
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Optional
+
+import pandas as pd
+
+
+def _rss() -> int:
+    """Resident set size of this process in bytes, or 0 where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def _shape(model) -> tuple:
+    data = model._data()
+    if data is None:
+        return 0, 0
+    return len(data), len(data.columns)
+
+
+class Instrumentation:
+    def __init__(self, memory: bool = False, deep: Optional[list] = None):
+        """Per-step trace of BaseModel operations: wall and CPU time, rows and columns
+        before and after, RSS change, and with memory tracking the bytes allocated and
+        peak traced memory above the start of the step.
+        Args:
+            memory (bool, optional): track allocations with tracemalloc, which slows
+                every step. Defaults to False.
+            deep (list, optional): step names to also run under cProfile and a
+                tracemalloc snapshot. Defaults to None.
+        """
+        self.memory = memory
+        self.deep = set(deep or [])
+        self.events = []
+        self.profiles = {}
+        self.origin = time.perf_counter()
+        self._depth = 0
+
+    @contextmanager
+    def span(self, step: str, model):
+        rows_in, cols_in = _shape(model)
+        deep = step in self.deep
+        tracing = self.memory or deep
+        if tracing:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+            snapshot = tracemalloc.take_snapshot() if deep else None
+        profiler = cProfile.Profile() if deep else None
+        rss = _rss()
+        depth = self._depth
+        self._depth += 1
+        start, cpu = time.perf_counter(), time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+            wall, cpu = time.perf_counter() - start, time.process_time() - cpu
+            self._depth -= 1
+            event = {
+                "step": step,
+                "depth": depth,
+                "start_s": start - self.origin,
+                "wall_s": wall,
+                "cpu_s": cpu,
+                "rows_in": rows_in,
+                "cols_in": cols_in,
+                "rss_delta_bytes": _rss() - rss,
+            }
+            event["rows_out"], event["cols_out"] = _shape(model)
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                event["allocated_bytes"] = current - traced_before
+                event["peak_delta_bytes"] = peak - traced_before
+                if deep:
+                    self._save_profile(step, profiler, snapshot)
+                if started_tracing:
+                    tracemalloc.stop()
+            self.events.append(event)
+
+    def _save_profile(self, step: str, profiler, snapshot) -> None:
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(25)
+        allocations = tracemalloc.take_snapshot().compare_to(snapshot, "lineno")
+        self.profiles.setdefault(step, []).append(
+            {
+                "stats": profiler,
+                "report": stream.getvalue(),
+                "allocations": allocations[:25],
+            }
+        )
+
+    def reset(self) -> None:
+        self.events = []
+        self.profiles = {}
+        self.origin = time.perf_counter()
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per recorded step, in the order the steps finished"""
+        return pd.DataFrame(self.events)
+
+    def to_chrome_trace(self, path: str) -> None:
+        """Write the trace in Chrome trace event format, for chrome://tracing or Perfetto"""
+        events = [
+            {
+                "name": event["step"],
+                "ph": "X",
+                "ts": event["start_s"] * 1e6,
+                "dur": event["wall_s"] * 1e6,
+                "pid": os.getpid(),
+                "tid": 0,
+                "args": {
+                    key: value
+                    for key, value in event.items()
+                    if key not in ("step", "start_s", "wall_s")
+                },
+            }
+            for event in self.events
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def to_speedscope(self, path: str, name: str = "BaseModel trace") -> None:
+        """Write the trace as a speedscope evented profile"""
+        frames = sorted({event["step"] for event in self.events})
+        index = {step: i for i, step in enumerate(frames)}
+        marks = []
+        for event in self.events:
+            start = event["start_s"] * 1e3
+            end = start + event["wall_s"] * 1e3
+            # at equal times closes come first, outer spans open first and close last
+            marks.append((start, 1, event["depth"], "O", index[event["step"]]))
+            marks.append((end, 0, -event["depth"], "C", index[event["step"]]))
+        marks.sort()
+        profile = {
+            "type": "evented",
+            "name": name,
+            "unit": "milliseconds",
+            "startValue": marks[0][0] if marks else 0,
+            "endValue": marks[-1][0] if marks else 0,
+            "events": [
+                {"type": kind, "frame": frame, "at": at}
+                for at, _, _, kind, frame in marks
+            ],
+        }
+        document = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": [{"name": step} for step in frames]},
+            "profiles": [profile],
+            "name": name,
+            "exporter": "module6_instrumentation",
+        }
+        with open(path, "w") as f:
+            json.dump(document, f)
+
+
+def instrumented(method):
+    """Record calls to a BaseModel method on the model's instrumentation, when on"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        instrumentation = getattr(self, "instrumentation", None)
+        if instrumentation is None:
+            return method(self, *args, **kwargs)
+        with instrumentation.span(method.__name__, self):
+            return method(self, *args, **kwargs)
+
+    return wrapper
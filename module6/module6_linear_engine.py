@@ -0,0 +1,272 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.linalg import cho_solve, solve_triangular
+
+# a pivot below this share of its Gram diagonal marks a column as a linear
+# combination of the columns before it
+PIVOT_TOLERANCE = 1e-12
+
+
+def _cholesky_update(L: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Lower Cholesky factor of L @ L.T + outer(x, x), in O(p^2)"""
+    L = L.copy()
+    x = x.copy()
+    for k in range(len(x)):
+        r = np.hypot(L[k, k], x[k])
+        c, s = r / L[k, k], x[k] / L[k, k]
+        L[k, k] = r
+        L[k + 1 :, k] = (L[k + 1 :, k] + s * x[k + 1 :]) / c
+        x[k + 1 :] = c * x[k + 1 :] - s * L[k + 1 :, k]
+    return L
+
+
+def _independent_factor(gram: np.ndarray) -> tuple:
+    """Mask of the columns that are not linear combinations of earlier columns, and
+    the lower Cholesky factor of the Gram matrix of those columns, built a column at
+    a time and skipping columns whose pivot falls below PIVOT_TOLERANCE"""
+    p = len(gram)
+    keep = np.zeros(p, dtype=bool)
+    L = np.zeros((0, 0))
+    for k in range(p):
+        cross = gram[keep, k]
+        row = solve_triangular(L, cross, lower=True) if len(cross) else cross
+        pivot = gram[k, k] - row @ row
+        if pivot <= PIVOT_TOLERANCE * max(gram[k, k], 1.0):
+            continue
+        m = len(row)
+        bordered = np.zeros((m + 1, m + 1))
+        bordered[:m, :m] = L
+        bordered[m, :m] = row
+        bordered[m, m] = np.sqrt(pivot)
+        L = bordered
+        keep[k] = True
+    return keep, L
+
+
+def _dense(X) -> np.ndarray:
+    return np.asarray(X, dtype=np.float64)
+
+
+class LinearEngine:
+    def __init__(self, fit_intercept: bool = True):
+        """Least squares regression solved from the cached Gram matrix X^T X and X^T y.
+        Columns are centered so the intercept is not penalized and the Gram matrix is
+        well conditioned. The Cholesky factor is updated in place when a feature is
+        added or removed, and a ridge path is read from one eigendecomposition.
+        Features that are linear combinations of earlier ones, such as a total next
+        to its parts, are aliased: left out of the solve with a zero coefficient and
+        no standard error, as R reports them.
+        Sparse X, such as one-hot encodings, is kept sparse and uncentered, with the
+        centering applied to the Gram matrix and products instead.
+        Args:
+            fit_intercept (bool, optional): center X and y. Defaults to True.
+        """
+        self.fit_intercept = fit_intercept
+        self.columns = []
+
+    def fit(self, X, y, columns: Optional[list] = None) -> "LinearEngine":
+        """Cache the Gram matrix of X and solve
+        Args:
+            X: (n, p) features, a DataFrame, array or scipy sparse matrix
+            y: target values
+            columns (list, optional): feature names. Defaults to X's columns.
+        """
+        if columns is None:
+            columns = (
+                list(X.columns)
+                if isinstance(X, pd.DataFrame)
+                else list(range(np.shape(X)[1]))
+            )
+        self.sparse = sparse.issparse(X)
+        X = sparse.csr_matrix(X, dtype=np.float64) if self.sparse else _dense(X)
+        y = np.asarray(y, dtype=np.float64)
+        self.columns = list(columns)
+        self.n = len(y)
+        self.x_mean = (
+            np.asarray(X.mean(axis=0)).ravel()
+            if self.fit_intercept
+            else np.zeros(X.shape[1])
+        )
+        self.y_mean = y.mean() if self.fit_intercept else 0.0
+        self.y = y - self.y_mean
+        if self.sparse:
+            self.X = X
+            self.gram = (X.T @ X).toarray() - self.n * np.outer(
+                self.x_mean, self.x_mean
+            )
+        else:
+            self.X = X - self.x_mean
+            self.gram = self.X.T @ self.X
+        # the centered y sums to zero, so X needs no centering in this product
+        self.xty = self.X.T @ self.y
+        self.yty = self.y @ self.y
+        self._factorize()
+        return self
+
+    def _factorize(self) -> None:
+        """Cholesky factor of the Gram matrix of the independent features. Rounding
+        can leave a collinear Gram matrix numerically positive definite, so the
+        pivots are checked against PIVOT_TOLERANCE rather than trusting the
+        factorization to fail."""
+        try:
+            L = np.linalg.cholesky(self.gram)
+            full_rank = np.all(
+                np.diag(L) ** 2 > PIVOT_TOLERANCE * np.maximum(np.diag(self.gram), 1.0)
+            )
+        except np.linalg.LinAlgError:
+            full_rank = False
+        if full_rank:
+            self.keep, self.L = np.ones(len(self.gram), dtype=bool), L
+        else:
+            self.keep, self.L = _independent_factor(self.gram)
+        self._solve()
+
+    def _solve(self) -> None:
+        self.coef = np.zeros(len(self.columns))
+        self.coef[self.keep] = cho_solve((self.L, True), self.xty[self.keep])
+
+    @property
+    def aliased(self) -> list:
+        """Features left out of the solve as linear combinations of earlier ones"""
+        return [column for column, kept in zip(self.columns, self.keep) if not kept]
+
+    @property
+    def intercept(self) -> float:
+        return float(self.y_mean - self.x_mean @ self.coef)
+
+    @property
+    def rss(self) -> float:
+        # residual sum of squares from the cached products, without the residuals
+        return float(
+            max(
+                self.yty - 2 * self.coef @ self.xty + self.coef @ self.gram @ self.coef,
+                0.0,
+            )
+        )
+
+    def _centered_product(self, X, coefs: np.ndarray) -> np.ndarray:
+        """(X - x_mean) @ coefs, without centering sparse X"""
+        if sparse.issparse(X):
+            return X @ coefs - self.x_mean @ coefs
+        return (_dense(X) - self.x_mean) @ coefs
+
+    def predict(self, X) -> np.ndarray:
+        return self._centered_product(X, self.coef) + self.y_mean
+
+    def statistics(self) -> dict:
+        """r2, rmse and residual degrees of freedom of the training fit"""
+        rss = self.rss
+        return {
+            "r2": 1 - rss / self.yty,
+            "rmse": np.sqrt(rss / self.n),
+            "dof": self.n - int(self.keep.sum()) - int(self.fit_intercept),
+        }
+
+    def summary(self) -> pd.DataFrame:
+        """Coefficients with standard errors and t values. Aliased features have no
+        standard error."""
+        stats = self.statistics()
+        sigma2 = self.rss / stats["dof"]
+        inverse = cho_solve((self.L, True), np.eye(len(self.L)))
+        std_err = np.full(len(self.columns), np.nan)
+        std_err[self.keep] = np.sqrt(sigma2 * np.diag(inverse))
+        coef = self.coef
+        index = list(self.columns)
+        if self.fit_intercept:
+            mean = self.x_mean[self.keep]
+            intercept_var = sigma2 * (1 / self.n + mean @ inverse @ mean)
+            coef = np.append(self.intercept, coef)
+            std_err = np.append(np.sqrt(intercept_var), std_err)
+            index = ["intercept"] + index
+        return pd.DataFrame(
+            {"coef": coef, "std_err": std_err, "t": coef / std_err}, index=index
+        )
+
+    def add_feature(self, values, name) -> None:
+        """Add a feature column, bordering the Gram matrix and Cholesky factor
+        Args:
+            values: feature values for the fitted rows
+            name: feature name
+        """
+        x = np.asarray(values, dtype=np.float64)
+        mean = x.mean() if self.fit_intercept else 0.0
+        x = x - mean
+        cross = self.X.T @ x
+        diagonal = x @ x
+        self.gram = np.block([[self.gram, cross[:, None]], [cross[None, :], diagonal]])
+        self.xty = np.append(self.xty, x @ self.y)
+        if self.sparse:
+            self.X = sparse.hstack([self.X, x[:, None] + mean], format="csr")
+        else:
+            self.X = np.column_stack([self.X, x])
+        self.x_mean = np.append(self.x_mean, mean)
+        self.columns.append(name)
+        row = solve_triangular(self.L, cross[self.keep], lower=True)
+        pivot = diagonal - row @ row
+        if pivot <= PIVOT_TOLERANCE * max(diagonal, 1.0):
+            # the new feature is aliased, and the factor of the others stands
+            self.keep = np.append(self.keep, False)
+        else:
+            p = len(row)
+            L = np.zeros((p + 1, p + 1))
+            L[:p, :p] = self.L
+            L[p, :p] = row
+            L[p, p] = np.sqrt(pivot)
+            self.L = L
+            self.keep = np.append(self.keep, True)
+        self._solve()
+
+    def remove_feature(self, name) -> None:
+        """Remove a feature, downdating the Cholesky factor instead of refactoring"""
+        i = self.columns.index(name)
+        self.gram = np.delete(np.delete(self.gram, i, axis=0), i, axis=1)
+        self.xty = np.delete(self.xty, i)
+        if self.sparse:
+            self.X = self.X[:, np.delete(np.arange(self.X.shape[1]), i)]
+        else:
+            self.X = np.delete(self.X, i, axis=1)
+        self.x_mean = np.delete(self.x_mean, i)
+        self.columns.pop(i)
+        if not self.keep.all():
+            # an aliased feature may become independent once another is removed
+            self._factorize()
+            return
+        # dropping row and column i leaves the trailing block short by the outer
+        # product of the dropped column below the diagonal
+        L = np.delete(np.delete(self.L, i, axis=0), i, axis=1)
+        L[i:, i:] = _cholesky_update(L[i:, i:], self.L[i + 1 :, i])
+        self.L = L
+        self.keep = np.delete(self.keep, i)
+        self._solve()
+
+    def ridge_path(self, alphas, X_test=None, y_test=None) -> pd.DataFrame:
+        """Ridge fits for every alpha from one eigendecomposition of the Gram matrix
+        Args:
+            alphas: penalties to fit
+            X_test (optional): held out features to score each fit on
+            y_test (optional): held out target values
+        Returns:
+            pd.DataFrame: training r2 and rmse, and test r2 when given, per alpha, with
+                the coefficient path in attrs["coefs"]
+        """
+        alphas = np.asarray(alphas, dtype=np.float64)
+        eigenvalues, V = np.linalg.eigh(self.gram)
+        eigenvalues = np.maximum(eigenvalues, 0.0)
+        z = V.T @ self.xty
+        shrunk = z[:, None] / (eigenvalues[:, None] + alphas[None, :])
+        coefs = V @ shrunk
+        rss = self.yty - 2 * z @ shrunk + (eigenvalues[:, None] * shrunk**2).sum(axis=0)
+        rss = np.maximum(rss, 0.0)
+        path = pd.DataFrame(
+            {"alpha": alphas, "r2": 1 - rss / self.yty, "rmse": np.sqrt(rss / self.n)}
+        )
+        if X_test is not None:
+            y_test = np.asarray(y_test, dtype=np.float64)
+            predictions = self._centered_product(X_test, coefs) + self.y_mean
+            ss_res = ((predictions - y_test[:, None]) ** 2).sum(axis=0)
+            path["test_r2"] = 1 - ss_res / ((y_test - y_test.mean()) ** 2).sum()
+        path.attrs["coefs"] = pd.DataFrame(coefs, index=self.columns, columns=alphas)
+        return path
@@ -0,0 +1,153 @@
+import json
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+class MappedTable:
+    def __init__(
+        self,
+        cache_dir: str,
+        columns: Optional[list] = None,
+        rows: Optional[np.ndarray] = None,
+        labels: Optional[np.ndarray] = None,
+    ):
+        """Read-only view over a DataLoader column cache. Columns are memory-mapped
+        .npy files, so any number of processes opening the same cache share one copy
+        of the data through the page cache. Row filters only compose an index array
+        of kept positions and nothing is copied until a column is read.
+        Args:
+            cache_dir (str): cache directory written by DataLoader
+            columns (list, optional): visible columns. Defaults to all cached columns.
+            rows (np.ndarray, optional): kept base row positions. Defaults to all rows.
+            labels (np.ndarray, optional): index labels of the kept rows. Defaults to
+                labelling rows 0..n-1.
+        """
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.entries = {entry["name"]: entry for entry in self.meta["columns"]}
+        self.columns = list(columns) if columns is not None else list(self.entries)
+        self.rows = rows
+        self.labels = labels
+        self._arrays = {}
+        self._categories = {}
+
+    def __len__(self) -> int:
+        return self.meta["rows"] if self.rows is None else len(self.rows)
+
+    def __getstate__(self) -> dict:
+        # workers re-open the mapping by path instead of receiving the data
+        state = self.__dict__.copy()
+        state["_arrays"] = {}
+        state["_categories"] = {}
+        return state
+
+    def _array(self, name: str) -> np.ndarray:
+        if name not in self._arrays:
+            entry = self.entries[name]
+            self._arrays[name] = np.load(
+                os.path.join(self.cache_dir, entry["file"]),
+                mmap_mode="r",
+                allow_pickle=False,
+            )
+            if "categories" in entry:
+                self._categories[name] = np.load(
+                    os.path.join(self.cache_dir, entry["categories"]),
+                    allow_pickle=False,
+                )
+        return self._arrays[name]
+
+    @property
+    def index(self) -> pd.Index:
+        """Row labels, following the same rules as the equivalent pandas filters"""
+        if self.labels is None:
+            return pd.RangeIndex(len(self))
+        return pd.Index(self.labels)
+
+    def column(self, name: str) -> np.ndarray:
+        """Raw values for a column. A zero-copy view of the mapping when no rows have
+        been filtered, otherwise only this column is gathered.
+        Args:
+            name (str): column name
+        Returns:
+            np.ndarray: column values (category codes for categorical columns)
+        """
+        values = self._array(name)
+        if self.rows is None:
+            return values
+        return values.take(self.rows)
+
+    def series(self, name: str, positions: Optional[np.ndarray] = None) -> pd.Series:
+        """Column as a pandas Series with the table's index
+        Args:
+            name (str): column name
+            positions (np.ndarray, optional): only these positions of the current view
+        Returns:
+            pd.Series: column values
+        """
+        values = self.column(name)
+        index = self.index
+        if positions is not None:
+            values = values.take(positions)
+            index = index[positions]
+        kind = self.entries[name]["kind"]
+        if kind in ("category", "object"):
+            values = pd.Categorical.from_codes(values, self._categories[name])
+            if kind == "object":
+                values = values.astype(object)
+        return pd.Series(values, index=index, name=name, copy=False)
+
+    def frame(
+        self, columns: Optional[list] = None, positional: bool = False
+    ) -> pd.DataFrame:
+        """Materialize some or all columns as a DataFrame
+        Args:
+            columns (list, optional): columns to read. Defaults to all visible columns.
+            positional (bool, optional): label rows 0..n-1 so the result's index can be
+                fed straight back into take. Defaults to False.
+        Returns:
+            pd.DataFrame: df over the current rows
+        """
+        columns = self.columns if columns is None else columns
+        df = pd.DataFrame({name: self.series(name) for name in columns}, copy=False)
+        if positional:
+            df.index = pd.RangeIndex(len(df))
+        return df
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        """First n rows, reading only those rows from the mapping"""
+        positions = np.arange(min(n, len(self)))
+        return pd.DataFrame(
+            {name: self.series(name, positions) for name in self.columns}
+        )
+
+    def take(self, positions: np.ndarray) -> "MappedTable":
+        """New view keeping the given positions of this view, without copying data"""
+        positions = np.asarray(positions, dtype=np.int64)
+        rows = positions if self.rows is None else self.rows.take(positions)
+        labels = np.asarray(self.index).take(positions)
+        return MappedTable._view(self, rows=rows, labels=labels)
+
+    def filter(self, mask: np.ndarray) -> "MappedTable":
+        """New view keeping the rows where mask is True"""
+        return self.take(np.flatnonzero(mask))
+
+    def drop(self, columns: list) -> "MappedTable":
+        """New view without the given columns"""
+        return MappedTable._view(
+            self, columns=[name for name in self.columns if name not in columns]
+        )
+
+    def reset_index(self) -> "MappedTable":
+        """New view labelled 0..n-1"""
+        return MappedTable._view(self, labels=None)
+
+    @staticmethod
+    def _view(table: "MappedTable", **changes) -> "MappedTable":
+        view = object.__new__(MappedTable)
+        view.__dict__.update(table.__dict__)
+        view.__dict__.update(changes)
+        return view
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+MEMO_SUFFIX = ".memo"
+
+
+def _hash_array(values, digest) -> None:
+    array = np.asarray(values)
+    if array.dtype.kind in "biufcmM":
+        digest.update(array.dtype.str.encode())
+        contiguous = np.ascontiguousarray(array)
+        if array.dtype.kind in "mM":
+            # datetime buffers cannot be exported, so hash their int64 ticks
+            contiguous = contiguous.view(np.int64)
+        digest.update(contiguous.data)
+    else:
+        digest.update(pd.util.hash_array(array.astype(object)).data)
+
+
+def hash_column(series: pd.Series) -> str:
+    """Digest of a column's values and dtype, read from its numpy buffers"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(series.dtype).encode())
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        _hash_array(series.cat.codes.to_numpy(), digest)
+        _hash_array(series.cat.categories.to_numpy(), digest)
+    else:
+        _hash_array(series.to_numpy(), digest)
+    return digest.hexdigest()
+
+
+def hash_index(index: pd.Index) -> str:
+    if isinstance(index, pd.RangeIndex):
+        return f"range-{index.start}-{index.stop}-{index.step}"
+    digest = hashlib.blake2b(digest_size=16)
+    _hash_array(index.to_numpy(), digest)
+    return digest.hexdigest()
+
+
+def fingerprint(value, digest=None) -> str:
+    """Content digest of a value: DataFrames, Series and arrays by their buffers,
+    containers element by element and anything else by repr"""
+    top = digest is None
+    digest = digest or hashlib.blake2b(digest_size=16)
+    if isinstance(value, pd.DataFrame):
+        digest.update(b"frame")
+        digest.update(hash_index(value.index).encode())
+        for name in value.columns:
+            digest.update(repr(name).encode())
+            digest.update(hash_column(value[name]).encode())
+    elif isinstance(value, pd.Series):
+        digest.update(b"series" + repr(value.name).encode())
+        digest.update(hash_index(value.index).encode())
+        digest.update(hash_column(value).encode())
+    elif isinstance(value, np.ndarray):
+        digest.update(b"array" + repr(value.shape).encode())
+        _hash_array(value, digest)
+    elif isinstance(value, (list, tuple)):
+        digest.update(type(value).__name__.encode())
+        for item in value:
+            fingerprint(item, digest)
+    elif isinstance(value, dict):
+        digest.update(b"dict")
+        for key in sorted(value, key=repr):
+            digest.update(repr(key).encode())
+            fingerprint(value[key], digest)
+    else:
+        digest.update(repr(value).encode())
+    return digest.hexdigest() if top else ""
+
+
+class MemoCache:
+    def __init__(
+        self,
+        max_entries: int = 64,
+        directory: Optional[str] = None,
+        max_bytes: int = 512 * 2**20,
+    ):
+        """Results keyed by content fingerprints, in an in-memory LRU tier backed by an
+        optional on-disk tier of pickles. The disk tier is capped at max_bytes and
+        evicts the least recently used files first. If the directory cannot be
+        written, the cache carries on with the memory tier alone.
+        Args:
+            max_entries (int, optional): results kept in memory. Defaults to 64.
+            directory (str, optional): disk tier location. Defaults to memory only.
+            max_bytes (int, optional): disk tier size cap. Defaults to 512MB.
+        """
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key: str):
+        """Cached result for key, or raise KeyError"""
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return self.memory[key]
+        if self.directory and os.path.exists(self._path(key)):
+            path = self._path(key)
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)
+            self._remember(key, value)
+            self.hits += 1
+            return value
+        self.misses += 1
+        raise KeyError(key)
+
+    def _remember(self, key: str, value) -> None:
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def put(self, key: str, value) -> None:
+        self._remember(key, value)
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp = f"{self._path(key)}.tmp"
+            with open(temp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, self._path(key))
+            self._evict()
+        except OSError:
+            # read-only data directories keep working, with the memory tier only
+            self.directory = None
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def call(self, key: str, compute):
+        """Cached result for key, computing and storing it on a miss"""
+        try:
+            return self.get(key)
+        except KeyError:
+            value = compute()
+            self.put(key, value)
+            return value
+
+    def clear(self, disk: bool = False) -> None:
+        self.memory.clear()
+        if disk and self.directory and os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".pkl"):
+                    os.remove(entry.path)
@@ -1,15 +1,73 @@
+import os
 from abc import ABC, abstractmethod
 from typing import Optional
 import pandas as pd
 import numpy as np
 
-from module5.module5_eda_cleaning import EDACleaning
+from module6.module6_eda_cleaning import EDACleaning
+from module6.module6_correlation import CorrelationEngine
+from module6.module6_data_loader import DataLoader
+from module6.module6_duplicates import find_duplicates
+from module6.module6_pipeline import CleaningPipeline, PipelineStep
+from module6.module6_search import SearchRunner
+from module6.module6_splits import SPLITS_SUFFIX, SplitRegistry, quantile_strata
+from module6.module6_streaming_stats import StreamingStatistics, stream_sorted
+from module6.module6_time_series import FREQUENCIES, TimeSeriesCache
+from module6.module6_instrumentation import Instrumentation, instrumented
+from module6.module6_memo import (
+    MEMO_SUFFIX,
+    MemoCache,
+    fingerprint,
+    hash_column,
+    hash_index,
+)
+from module6.module6_history import (
+    ColumnDropped,
+    EditHistory,
+    IndexReset,
+    RowsRemoved,
+    TableChange,
+)
 
 
 class BaseModel(ABC):
-    def __init__(self, filename: str, seed: Optional[int] = None):
-        self.df = self._load_file(filename)
+    def __init__(
+        self,
+        filename: str,
+        seed: Optional[int] = None,
+        schema: Optional[dict] = None,
+        cache: Optional[bool] = True,
+        storage: Optional[str] = "memory",
+        history_budget: Optional[int] = 256 * 2**20,
+        lazy: Optional[bool] = False,
+        split_dir: Optional[str] = None,
+        memo_dir: Optional[str] = None,
+    ):
+        self.instrumentation = None
+        self.memo = MemoCache(directory=memo_dir or f"{filename}{MEMO_SUFFIX}")
+        self._synced_hashes = {}
+        self.filename = filename
+        self.lazy = lazy
+        self.pipeline = CleaningPipeline()
+        self.history = EditHistory(budget=history_budget)
+        self.correlations = CorrelationEngine()
+        self._time_series = {}
+        self.loader = DataLoader(schema=schema, cache=cache)
+        self.storage = storage
+        self.table = None
+        if storage == "mmap":
+            self.table = self.loader.load_mapped(filename)
+            self._df = None
+        elif storage == "memory":
+            self.df = self._load_file(filename)
+        else:
+            raise ValueError(f"Unknown storage mode: {storage}")
         self.target = None
+        self.seed = seed
+        self.splits = SplitRegistry(split_dir or f"{filename}{SPLITS_SUFFIX}")
+        self.train = None
+        self.test = None
+        self.fold_results = {}
         if seed:
             np.random.seed(seed)
             self.randomstate = np.random.random(1)
@@ -18,13 +76,57 @@ class BaseModel(ABC):
         self.cleaner = EDACleaning()
 
     def _load_file(self, filename: str) -> pd.DataFrame:
-        """Load file from filename and set target field
+        """Load file from filename, reading the binary cache next to it when current
         Args:
             filename (str): filename in csv format
         Returns:
             pd.DataFrame: df loaded from file
         """
-        return pd.read_csv(filename, on_bad_lines="skip")
+        return self.loader.load(filename)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """Model data. With mmap storage the frame is built from the mapped table on
+        first access after each change, zero-copy while no rows have been removed.
+        The mapped table is read-only, so a frame edited in place moves the model to
+        in-memory storage at the next change rather than losing the edits. Assigning
+        to self.df switches to in-memory storage as well."""
+        if self._df is None:
+            self._df = self.table.frame()
+            if self._synced_hashes is None:
+                self._synced_hashes = self._tracked_hashes()
+        return self._df
+
+    @df.setter
+    def df(self, df: pd.DataFrame) -> None:
+        # assigning a frame directly detaches the model from the mapped table, and
+        # recorded deltas no longer line up with the new data
+        self._df = df
+        self.table = None
+        self.history.clear()
+        self.correlations.reset()
+        self._time_series = {}
+        self._touch()
+
+    def instrument(
+        self, memory: Optional[bool] = False, deep: Optional[list] = None
+    ) -> Instrumentation:
+        """Turns on per-step tracing of the model's public operations
+        Args:
+            memory (bool, optional): track allocations with tracemalloc. Defaults to False.
+            deep (list, optional): step names to also profile with cProfile and
+                tracemalloc snapshots. Defaults to None.
+        Returns:
+            Instrumentation: the trace, also kept on the model
+        """
+        self.instrumentation = Instrumentation(memory=memory, deep=deep)
+        return self.instrumentation
+
+    def trace(self) -> pd.DataFrame:
+        """Recorded steps with their time, shape and memory costs"""
+        if self.instrumentation is None:
+            return pd.DataFrame()
+        return self.instrumentation.to_frame()
 
     def set_target(self, target: str) -> None:
         """Sets model target field
@@ -34,87 +136,758 @@ class BaseModel(ABC):
         self.target = target
         self.cleaner.set_target(target)
 
-    def _set_save(self, saved: str) -> None:
-        """Sets a save point on the dataframe before performing an alteration task
+    def _data(self):
+        """Current data, the mapped table view with mmap storage or else the df"""
+        return self.table if self.table is not None else self._df
 
-        Args:
-            saved (str): description of saved task to report if undone
-        """
-        self.saved_df = self.df.copy()
-        self.saved_action = saved
+    def _touch(self) -> None:
+        """Records the hashes of the tracked columns after a change made through the
+        model, so later in-place edits to them can be told apart"""
+        # a mapped table's frame is hashed when it is next built
+        self._synced_hashes = None if self._df is None else self._tracked_hashes()
+
+    def _tracked_hashes(self) -> dict:
+        """Hashes of the columns behind each set of running statistics the model
+        keeps in step with the data: the correlations, and each time series cache
+        by its key. Each is kept apart, so one re-recording a column it has caught up
+        with does not hide the change from another."""
+        tracked = {key: [key[0], key[1]] for key in self._time_series}
+        if self.correlations.fitted:
+            tracked["correlations"] = list(self.correlations.columns)
+        # columns dropped since are left out, so they no longer match
+        present = set(self.df.columns)
+        hashes = self._hash_columns(
+            {name for columns in tracked.values() for name in columns} & present
+        )
+        return {
+            owner: {name: hashes[name] for name in columns if name in present}
+            for owner, columns in tracked.items()
+        }
+
+    def _check_synced(self) -> None:
+        """Drops running statistics whose columns were edited in place since they
+        last followed the data, before a change is applied to them incrementally.
+        With mmap storage, statistics of frame columns that differ from the table
+        are dropped as well, and the model then keeps the edited frame in memory."""
+        if self._df is None or self._synced_hashes is None:
+            return
+        current = self._tracked_hashes()
+        references = [self._synced_hashes]
+        if self.table is not None:
+            # columns added to the frame alone have no table values, so they differ
+            columns = sorted(
+                {name for hashes in current.values() for name in hashes}
+                & set(self.table.columns)
+            )
+            frame = self.table.frame(columns)
+            table = {name: hash_column(frame[name]) for name in columns}
+            references.append(
+                {
+                    owner: {name: table.get(name) for name in hashes}
+                    for owner, hashes in current.items()
+                }
+            )
+        for owner, hashes in current.items():
+            if any(
+                {name: reference.get(owner, {}).get(name) for name in hashes} != hashes
+                for reference in references
+            ):
+                if owner == "correlations":
+                    self.correlations.reset()
+                else:
+                    del self._time_series[owner]
+        if self.table is not None and fingerprint(self._df) != fingerprint(
+            self.table.frame()
+        ):
+            self._detach_table()
+
+    def _detach_table(self) -> None:
+        """Moves an mmap model whose frame was edited in place to in-memory storage,
+        so changes are applied to the edited frame instead of rebuilding it from the
+        table. The undo history holds table views, so it is cleared."""
+        print("Frame edited in place, switching to in-memory storage to keep the edits")
+        self.table = None
+        self.history.clear()
 
+    def _hash_columns(self, columns: list) -> dict:
+        df = self.df
+        return {name: hash_column(df[name]) for name in columns}
+
+    def _restore(self, data) -> None:
+        if self.table is not None:
+            self._set_table(data)
+        else:
+            self._df = data
+            self._touch()
+
+    def _set_table(self, table) -> None:
+        """Replaces the mapped table view and drops the materialized frame"""
+        self.table = table
+        self._df = None
+        self._touch()
+
+    def _change_table(self, table, action: str, save: bool) -> None:
+        if save:
+            self.history.push(TableChange(action, self.table, table))
+        self._set_table(table)
+
+    def _positional(self, columns: Optional[list] = None) -> pd.DataFrame:
+        """Columns of the current data labelled by row position, for filters whose
+        kept index is then applied with _keep_rows"""
+        if self.table is not None:
+            return self.table.frame(columns, positional=True)
+        df = self.df if columns is None else self.df[columns]
+        return df.set_axis(pd.RangeIndex(len(df)), axis=0)
+
+    def _keep_rows(self, filtered: pd.DataFrame, action: str, save: bool) -> np.ndarray:
+        """Keeps the rows left in a filter result built from _positional, recording
+        the removed rows for undo, and returns the removed positions"""
+        kept = filtered.index.to_numpy()
+        mask = np.ones(len(self._data()), dtype=bool)
+        mask[kept] = False
+        removed = np.flatnonzero(mask)
+        self._remove_correlation_rows(kept)
+        self._remove_time_series_rows(removed)
+        if self.table is not None:
+            self._change_table(self.table.take(kept), action, save)
+            return removed
+        before = self._df
+        if save:
+            self.history.push(RowsRemoved(action, before, kept))
+        if filtered.columns.equals(before.columns):
+            self._df = filtered.set_axis(before.index.take(kept), axis=0)
+        else:
+            self._df = before.take(kept)
+        self._touch()
+        return removed
+
+    @instrumented
     def undo(self) -> None:
         """Undoes the last data frame alteration task, and reports on Undo"""
-        self.df = self.saved_df()
-        print(f"Undid last change: {self.saved_action}")
+        # an edited mmap frame clears the history here, leaving nothing to undo
+        self._check_synced()
+        if not self.history.undo_stack:
+            print("Nothing to undo")
+            return
+        data, delta = self.history.undo(self._data())
+        self._restore(data)
+        self._sync_correlations(delta, undone=True)
+        self._sync_time_series(delta, undone=True)
+        print(f"Undid last change: {delta.action}")
+
+    @instrumented
+    def redo(self) -> None:
+        """Redoes the last undone alteration task, and reports on Redo"""
+        # an edited mmap frame clears the history here, leaving nothing to redo
+        self._check_synced()
+        if not self.history.redo_stack:
+            print("Nothing to redo")
+            return
+        data, delta = self.history.redo(self._data())
+        self._restore(data)
+        self._sync_correlations(delta, undone=False)
+        self._sync_time_series(delta, undone=False)
+        print(f"Redid change: {delta.action}")
+
+    def _remove_correlation_rows(self, kept: np.ndarray) -> None:
+        """Subtracts the rows a filter is about to remove from the correlation
+        statistics, or drops the statistics when most rows are going"""
+        engine = self.correlations
+        if not engine.fitted:
+            return
+        removed = np.setdiff1d(np.arange(len(self._data())), kept, assume_unique=True)
+        columns = self.table.columns if self.table is not None else self._df.columns
+        if len(removed) > len(kept) or not set(engine.columns) <= set(columns):
+            engine.reset()
+        elif self.table is not None:
+            engine.remove_rows(self.table.take(removed).frame(engine.columns))
+        else:
+            engine.remove_rows(self._df[engine.columns].take(removed))
+
+    def _sync_correlations(self, delta, undone: bool) -> None:
+        """Applies an undone or redone delta to the correlation statistics. Column
+        changes are picked up when the matrix is next read."""
+        engine = self.correlations
+        if not engine.fitted or isinstance(delta, (ColumnDropped, IndexReset)):
+            return
+        if isinstance(delta, TableChange):
+            if delta.before.rows is not delta.after.rows:
+                engine.reset()
+        elif not set(engine.columns) <= set(delta.rows.columns):
+            engine.reset()
+        elif undone:
+            engine.add_rows(delta.rows)
+        else:
+            engine.remove_rows(delta.rows)
+
+    @instrumented
+    def time_series(
+        self,
+        date_field: Optional[str] = "date",
+        value_field: Optional[str] = None,
+        frequencies: Optional[tuple] = FREQUENCIES,
+    ) -> TimeSeriesCache:
+        """Daily, weekly and monthly means of a value over time, built once with the
+        dates parsed a single time, then kept current as row filters and undo/redo
+        add or remove rows. Rebuilt when either column is edited in place.
+        Args:
+            date_field (str, optional): date column. Defaults to "date".
+            value_field (str, optional): value column. Defaults to the target.
+            frequencies (tuple, optional): "D", "W" and/or "M". Defaults to all three.
+        Returns:
+            TimeSeriesCache: series, rolling statistics and ADF tests
+        """
+        key = (date_field, value_field or self.target, tuple(frequencies))
+        hashes = self._hash_columns([key[0], key[1]])
+        if hashes != self._synced_hashes.get(key):
+            self._time_series.pop(key, None)
+        if key not in self._time_series:
+            self._time_series[key] = TimeSeriesCache(
+                self.df[key[0]], self.df[key[1]], frequencies
+            )
+        self._synced_hashes[key] = hashes
+        return self._time_series[key]
+
+    def _remove_time_series_rows(self, removed: np.ndarray) -> None:
+        """Takes the rows at removed positions of the current data out of the time
+        series caches, before a filter applies"""
+        for (date_field, value_field, _), cache in list(self._time_series.items()):
+            columns = [date_field, value_field]
+            if not set(columns) <= set(self._data().columns):
+                del self._time_series[(date_field, value_field, _)]
+            elif self.table is not None:
+                rows = self.table.take(removed).frame(columns)
+                cache.remove(rows[date_field], rows[value_field])
+            else:
+                rows = self._df[columns].take(removed)
+                cache.remove(rows[date_field], rows[value_field])
+
+    def _sync_time_series(self, delta, undone: bool) -> None:
+        """Applies an undone or redone delta to the time series caches"""
+        if not self._time_series or isinstance(delta, (ColumnDropped, IndexReset)):
+            return
+        if isinstance(delta, TableChange):
+            if delta.before.rows is not delta.after.rows:
+                self._time_series = {}
+            return
+        for key, cache in list(self._time_series.items()):
+            date_field, value_field, _ = key
+            if not {date_field, value_field} <= set(delta.rows.columns):
+                del self._time_series[key]
+            elif undone:
+                cache.add(delta.rows[date_field], delta.rows[value_field])
+            else:
+                cache.remove(delta.rows[date_field], delta.rows[value_field])
+
+    @instrumented
+    def correlation_matrix(self) -> pd.DataFrame:
+        """Correlation matrix of the numeric columns. Kept as running statistics that
+        follow row filters, column drops and undo/redo, so only columns added or
+        edited in place since the last call need a pass over the data.
+        Returns:
+            pd.DataFrame: correlation matrix
+        """
+        df = self.df
+        numeric = list(df.select_dtypes(include=["number", "bool"]).columns)
+        hashes = self._hash_columns(numeric)
+        engine = self.correlations
+        synced = self._synced_hashes.get("correlations", {})
+        if not engine.fitted or engine.n_rows != len(df):
+            engine.fit(df)
+        else:
+            # columns whose content changed since the statistics last followed the
+            # data, such as df[name] = np.log(df[name]), are refit
+            for column in [
+                c
+                for c in engine.columns
+                if c not in numeric or synced.get(c) != hashes[c]
+            ]:
+                engine.drop_column(column)
+            for column in [c for c in numeric if c not in engine.columns]:
+                engine.add_column(df, column)
+        self._synced_hashes["correlations"] = hashes
+        return engine.matrix().loc[numeric, numeric]
+
+    def _numeric_columns(self) -> list:
+        return list(self.df.select_dtypes(include=["number", "bool"]).columns)
+
+    def _columns_fingerprint(self, columns: list) -> str:
+        """Digest of the named columns, hashed afresh on every call so in-place edits
+        to the frame change the digest"""
+        hashes = self._hash_columns(columns)
+        return fingerprint(
+            [columns, [hashes[name] for name in columns], hash_index(self.df.index)]
+        )
+
+    def _memoized(self, name: str, columns: list, compute, *args):
+        key = fingerprint([name, self._columns_fingerprint(columns), args])
+        return self.memo.call(key, compute)
+
+    def memoized(self, func, *args, columns: Optional[list] = None, **kwargs):
+        """Calls func(*args, **kwargs) through the model's memo cache, keyed by the
+        content of the arguments, so repeating a call with unchanged frames and
+        arguments returns the stored result. Use for expensive feature steps such as
+        FeatureEngineer.test_feature_combinations or target_encoding.
+        Args:
+            func: function to call. Bound methods also key on their object's attributes.
+            columns (list, optional): model columns the result depends on beyond
+                the arguments. Defaults to None.
+        """
+        owner = getattr(func, "__self__", None)
+        key = fingerprint(
+            [
+                getattr(func, "__module__", ""),
+                getattr(func, "__qualname__", repr(func)),
+                (
+                    vars(owner)
+                    if owner is not None and hasattr(owner, "__dict__")
+                    else None
+                ),
+                self._columns_fingerprint(columns) if columns else None,
+                args,
+                kwargs,
+            ]
+        )
+        return self.memo.call(key, lambda: func(*args, **kwargs))
+
+    @instrumented
+    def show_correlated_pairs(
+        self,
+        lower: Optional[float] = 0.75,
+        upper: Optional[float] = 0.95,
+        k: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """Feature pairs by absolute correlation, most correlated first
+        Args:
+            lower (float, optional): only pairs above this correlation. Defaults to 0.75.
+            upper (float, optional): only pairs below this correlation. Defaults to 0.95.
+            k (int, optional): only the k most correlated pairs. Defaults to None.
+        """
+        return self._memoized(
+            "show_correlated_pairs",
+            self._numeric_columns(),
+            lambda: self.cleaner.show_correlated_pairs(
+                self.df, corr=self.correlation_matrix(), lower=lower, upper=upper, k=k
+            ),
+            lower,
+            upper,
+            k,
+        )
+
+    @instrumented
+    def show_target_correlation(self) -> pd.Series:
+        """Absolute correlation of each numeric feature with the target"""
+        return self._memoized(
+            "show_target_correlation",
+            self._numeric_columns(),
+            lambda: self.cleaner.show_target_correlation(
+                self.df, corr=self.correlation_matrix()
+            ),
+            self.target,
+        )
+
+    @instrumented
+    def print_statistics(
+        self, streaming: Optional[bool] = False, chunksize: Optional[int] = 100_000
+    ) -> None:
+        """Print basic statistics for data
+        Args:
+            streaming (bool, optional): read the file in chunks with one-pass sketches
+                instead of using the loaded data. Defaults to False.
+            chunksize (int, optional): rows per chunk when streaming. Defaults to 100_000.
+        """
+        if streaming:
+            self.cleaner.print_streaming_statistics(
+                self.streaming_statistics(chunksize)
+            )
+        else:
+            self.cleaner.print_statistics(self.df)
 
-    def print_statistics(self) -> None:
-        """Print basic statistics for data"""
-        self.cleaner.print_statistics(self.df)
+    @instrumented
+    def streaming_statistics(
+        self, chunksize: Optional[int] = 100_000
+    ) -> StreamingStatistics:
+        """Per-column statistics from one chunked pass over the model's file, for files
+        too large to load. Kept until the file changes.
+        Args:
+            chunksize (int, optional): rows per chunk. Defaults to 100_000.
+        Returns:
+            StreamingStatistics: moments, quantile, distinct and frequent value sketches
+        """
+        key = (self.filename, os.stat(self.filename).st_mtime_ns)
+        if getattr(self, "_streaming_key", None) != key:
+            self._streaming_stats = StreamingStatistics.from_chunks(
+                self.loader.iter_csv(self.filename, chunksize)
+            )
+            self._streaming_key = key
+        return self._streaming_stats
 
+    @instrumented
     def print_sorted(
         self,
         field: Optional[str] = None,
         groupby: Optional[str] = None,
         asc: Optional[bool] = False,
+        streaming: Optional[bool] = False,
+        chunksize: Optional[int] = 100_000,
     ) -> None:
         """Prints sorted based on provided field. Will use target if no field provided.
         Args:
             field (_type_, optional): Will sort by this field. Defaults to target.
             asc (bool, optional): Sort ascending. Defaults to False.
             groupby (_type_, optional): If entered, will group by this field. Defaults to None.
+            streaming (bool, optional): read the file in chunks. Defaults to False.
+            chunksize (int, optional): rows per chunk when streaming. Defaults to 100_000.
         """
         if not field:
             field = self.target
-        self.cleaner.print_sorted(df=self.df, field=field, asc=asc, groupby=groupby)
+        if streaming:
+            chunks = self.loader.iter_csv(self.filename, chunksize)
+            print(stream_sorted(chunks, field=field, groupby=groupby, asc=asc))
+        else:
+            self.cleaner.print_sorted(df=self.df, field=field, asc=asc, groupby=groupby)
 
-    def check_value_counts(self, field: Optional[str] = None) -> None:
+    @instrumented
+    def check_value_counts(
+        self,
+        field: Optional[str] = None,
+        streaming: Optional[bool] = False,
+        chunksize: Optional[int] = 100_000,
+    ) -> None:
         """Will print value counts for field
         Args:
             field (_type_, optional): Will report on this field. Defaults to target.
+            streaming (bool, optional): use the chunked frequent value sketch. Defaults to False.
+            chunksize (int, optional): rows per chunk when streaming. Defaults to 100_000.
         """
         if not field:
             field = self.target
-        self.cleaner.check_value_counts(self.df, field)
+        if streaming:
+            print(self.streaming_statistics(chunksize).value_counts(field))
+        else:
+            self.cleaner.check_value_counts(self.df, field)
 
+    @instrumented
     def find_outliers(self, field: str) -> None:
         self.cleaner.find_outliers(field)
 
-    def drop_dupes(self, subset: Optional[list] = None, save: Optional[bool] = True):
-        """Save point, then drops duplicate dataframe rows
+    @instrumented
+    def drop_dupes(
+        self,
+        subset: Optional[list] = None,
+        save: Optional[bool] = True,
+        keep: Optional[str] = None,
+        order_by: Optional[str] = "date",
+    ) -> Optional[np.ndarray]:
+        """Save point, then drops duplicate dataframe rows, found by hashed row keys.
+        Recorded to the pipeline in lazy mode.
         Args:
             subset (list, optional): Subset on which to drop dupes. Defaults to None.
             save (boolean, optional): Toggles to save. Defaults to None.
+            keep (str, optional): "first", "last" or "latest", such as the latest sale
+                of each id. Defaults to "last" with a subset and "first" without.
+            order_by (str, optional): date column for "latest". Defaults to "date".
+        Returns:
+            np.ndarray: positions of the removed rows, or None in lazy mode
         """
-        if save:
-            self._set_save("drop_dupes")
-        self.df = self.cleaner.drop_dupes(self.df, subset)
+        kwargs = {"subset": subset}
+        if keep is not None:
+            kwargs.update(keep=keep, order_by=order_by)
+        if self.lazy:
+            self.pipeline.record("drop_dupes", **kwargs)
+            return
+        return self._run_filters([PipelineStep("drop_dupes", kwargs)], save)
 
+    @instrumented
+    def find_duplicates(
+        self,
+        filenames: Optional[list] = None,
+        subset: Optional[list] = None,
+        keep: Optional[str] = "first",
+        order_by: Optional[str] = "date",
+        chunksize: Optional[int] = 100_000,
+    ) -> dict:
+        """Duplicate rows across files read in chunks, such as monthly extracts, without
+        loading or concatenating them
+        Args:
+            filenames (list, optional): csv files in order. Defaults to the model's file.
+            subset (list, optional): key columns, such as ["id"]. Defaults to every column.
+            keep (str, optional): "first", "last" or "latest". Defaults to "first".
+            order_by (str, optional): date column for "latest". Defaults to "date".
+            chunksize (int, optional): rows per chunk. Defaults to 100_000.
+        Returns:
+            dict: filename to the row positions in it that are duplicates
+        """
+        filenames = filenames or [self.filename]
+        removed = find_duplicates(
+            (self.loader.iter_csv(filename, chunksize) for filename in filenames),
+            subset,
+            keep,
+            order_by,
+        )
+        return dict(zip(filenames, removed))
+
+    @instrumented
     def remove_outliers(
         self,
         fields: list = [],
         method: Optional[str] = "iqr",
         range: Optional[float] = 1.5,
         save: Optional[bool] = True,
+        mode: Optional[str] = "sequential",
+        bounds: Optional[dict] = None,
     ) -> None:
-        """Save point, then removes outliers, defaultings to IQR with a default IQR range of 1.5
+        """Save point, then removes outliers, defaultings to IQR with a default IQR range of 1.5.
+        Recorded to the pipeline in lazy mode.
         Args:
             fields (list): list of fields. Must be list even if one item.
-            method (str, optional): outlier removal method. Defaults to "iqr".
-            range (float, optional): IQR range. Defaults to 1.5.
+            method (str, optional): "iqr", "zscore", "mad" or "quantile". Defaults to "iqr".
+            range (float, optional): IQR range, or the method's equivalent. For
+                "quantile", the tail fraction cut from each end, such as 0.01.
+                Defaults to 1.5.
             save (boolean, optional): Toggles to save. Defaults to None.
+            mode (str, optional): "sequential" computes each field's bounds after the
+                previous fields' outliers are removed, "simultaneous" computes all
+                bounds on the same rows. Defaults to "sequential".
+            bounds (dict, optional): (lower range, upper range) per field, such as
+                streaming_statistics().outlier_bounds(fields). Overrides method and mode.
         """
+        kwargs = {
+            "fields": list(fields),
+            "method": method,
+            "range": range,
+            "mode": mode,
+        }
+        if bounds is not None:
+            kwargs["bounds"] = {field: list(bounds[field]) for field in fields}
+        if self.lazy:
+            self.pipeline.record("remove_outliers", **kwargs)
+            return
+        self._run_filters([PipelineStep("remove_outliers", kwargs)], save)
+
+    @instrumented
+    def drop_feature(self, field: str, save: Optional[bool] = True) -> None:
+        """Save point, then drops a feature from the dataframe. Recorded to the
+        pipeline in lazy mode.
+        Args:
+            field (str): feature to drop
+            save (boolean, optional): Toggles to save. Defaults to None.
+        """
+        if self.lazy:
+            self.pipeline.record("drop_feature", field=field)
+            return
+        self._drop_feature(field, save)
+
+    def _drop_feature(self, field: str, save: bool) -> None:
+        self._check_synced()
+        if self.table is not None:
+            self._change_table(self.table.drop([field]), "drop_feature", save)
+            return
         if save:
-            self._set_save("remove_outliers")
-        self.df = self.cleaner.remove_outliers(self.df, fields, method, range)
+            self.history.push(ColumnDropped("drop_feature", self._df, field))
+        self.cleaner.drop_feature(self._df, field)
+        self._touch()
 
+    @instrumented
     def reset_index(self, save: Optional[bool] = True) -> None:
-        """Save point, then resets dataframe index"""
-        print(self.df.head())
+        """Save point, then resets dataframe index. Recorded to the pipeline in lazy mode."""
+        if self.lazy:
+            self.pipeline.record("reset_index")
+            return
+        print(self._head())
+        self._reset_index(save)
+        print(self._head())
+
+    def _reset_index(self, save: bool) -> None:
+        self._check_synced()
+        if self.table is not None:
+            self._change_table(self.table.reset_index(), "reset_index", save)
+            return
         if save:
-            self._set_save("reset_index")
-        self.df.reset_index(inplace=True, drop=True)
-        print(self.df.head())
+            self.history.push(IndexReset("reset_index", self._df))
+        self._df = self._df.reset_index(drop=True)
+        self._touch()
+
+    def _head(self) -> pd.DataFrame:
+        return self.table.head() if self.table is not None else self._df.head()
+
+    def _run_filters(self, steps: list, save: bool) -> np.ndarray:
+        """Runs consecutive row filter steps on just the columns they read, then
+        applies the combined result to the data once, returning the removed
+        positions"""
+        # before the filters read the data, which is the table with mmap storage
+        self._check_synced()
+        columns = set()
+        for step in steps:
+            read = step.columns_read()
+            if read is None:
+                columns = None
+                break
+            columns |= read
+        if columns is not None:
+            current = self.table.columns if self.table is not None else self._df.columns
+            columns = [column for column in current if column in columns]
+        filtered = self._positional(columns)
+        for step in steps:
+            if step.name == "drop_dupes":
+                filtered = self.cleaner.drop_dupes(
+                    filtered,
+                    step.kwargs.get("subset"),
+                    step.kwargs.get("keep"),
+                    step.kwargs.get("order_by", "date"),
+                )
+            else:
+                filtered = self.cleaner.remove_outliers(
+                    filtered,
+                    step.kwargs["fields"],
+                    step.kwargs.get("method", "iqr"),
+                    step.kwargs.get("range", 1.5),
+                    step.kwargs.get("mode", "sequential"),
+                    step.kwargs.get("bounds"),
+                )
+        return self._keep_rows(filtered, "+".join(step.name for step in steps), save)
+
+    @instrumented
+    def collect(self, save: Optional[bool] = True) -> None:
+        """Runs the pending recorded pipeline steps as an optimized plan
+        Args:
+            save (boolean, optional): Record each executed stage for undo. Defaults to True.
+        """
+        for stage in self.pipeline.optimize(self.pipeline.pending):
+            step = stage[0]
+            if step.is_filter:
+                self._run_filters(stage, save)
+            elif step.name == "drop_feature":
+                self._drop_feature(step.kwargs["field"], save)
+            elif step.name == "reset_index":
+                self._reset_index(save)
+        self.pipeline.executed = len(self.pipeline.steps)
+
+    @instrumented
+    def replay(self, filename: str, save: Optional[bool] = True) -> None:
+        """Loads a new file into the model and runs the whole recorded pipeline on it
+        Args:
+            filename (str): filename in csv format
+            save (boolean, optional): Record each executed stage for undo. Defaults to True.
+        """
+        self.filename = filename
+        if self.storage == "mmap":
+            self._set_table(self.loader.load_mapped(filename))
+            self.history.clear()
+            self._time_series = {}
+        else:
+            self.df = self._load_file(filename)
+        self.pipeline.executed = 0
+        self.collect(save)
+
+    def _features(self, features: Optional[list] = None) -> list:
+        if features is None:
+            numeric = self.df.select_dtypes(include=["number", "bool"]).columns
+            features = [column for column in numeric if column != self.target]
+        return list(features)
+
+    def _rows(self, positions: Optional[np.ndarray], columns: list) -> np.ndarray:
+        values = self.df[columns].to_numpy(dtype=np.float64)
+        return values if positions is None else values[positions]
+
+    def _strata(self, stratify: bool, positions: Optional[np.ndarray] = None):
+        if not stratify:
+            return None
+        return quantile_strata(self._rows(positions, [self.target])[:, 0])
+
+    def folds(
+        self,
+        n_splits: Optional[int] = 5,
+        n_repeats: Optional[int] = 1,
+        stratify: Optional[bool] = False,
+    ) -> list:
+        """K-fold or repeated K-fold splits of the train rows, or of all rows before
+        split_data. Folds are kept and reused only when the model has a seed.
+        Args:
+            n_splits (int, optional): folds per repeat. Defaults to 5.
+            n_repeats (int, optional): repeats. Defaults to 1.
+            stratify (bool, optional): stratify on target quartile bins. Defaults to False.
+        Returns:
+            list: (train, test) row positions for each fold
+        """
+        rows = np.arange(len(self._data())) if self.train is None else self.train
+        return self.splits.folds(
+            rows, n_splits, n_repeats, self.seed, self._strata(stratify, self.train)
+        )
+
+    def subset(self, positions: np.ndarray) -> pd.DataFrame:
+        """Rows at positions. With mmap storage this is a view of the mapped columns
+        rather than a copy."""
+        if self.table is not None:
+            return self.table.take(positions).frame()
+        return self.df.take(positions)
+
+    def split_frames(self) -> tuple:
+        """x_train, x_test, y_train, y_test taken through the split positions"""
+        train, test = self.subset(self.train), self.subset(self.test)
+        return (
+            train.drop(columns=self.target),
+            test.drop(columns=self.target),
+            train[self.target],
+            test[self.target],
+        )
+
+    @instrumented
+    def search(
+        self,
+        estimator,
+        param_grid,
+        features: Optional[list] = None,
+        n_splits: Optional[int] = 5,
+        n_repeats: Optional[int] = 1,
+        n_jobs: Optional[int] = None,
+        halving: Optional[bool] = False,
+        eta: Optional[int] = 3,
+    ) -> pd.DataFrame:
+        """Grid search scored by cross validation on the registry folds, spread across
+        a process pool. Fold scores are kept on the model, so re-running only fits new
+        configs and folds. That needs a model seed: without one the folds are
+        reshuffled on every call and no stored score is reused.
+        Args:
+            estimator: unfitted sklearn estimator
+            param_grid: dict or list of dicts of params to search
+            features (list, optional): features to use. Defaults to every numeric column.
+            n_splits (int, optional): folds per repeat. Defaults to 5.
+            n_repeats (int, optional): repeats. Defaults to 1.
+            n_jobs (int, optional): worker processes, with -1 for every CPU. Defaults to
+                None, in this process.
+            halving (bool, optional): drop all but the best 1/eta configs as the fold
+                budget grows. Defaults to False.
+            eta (int, optional): halving rate. Defaults to 3.
+        Returns:
+            pd.DataFrame: params, mean and std score, folds scored and rank per config
+        """
+        features = self._features(features)
+        runner = SearchRunner(estimator, n_jobs, self.fold_results)
+        return runner.search(
+            self._rows(None, features),
+            self._rows(None, [self.target])[:, 0],
+            param_grid,
+            self.folds(n_splits, n_repeats),
+            halving=halving,
+            eta=eta,
+        )
+
+    @instrumented
+    def cross_validate(
+        self,
+        estimator,
+        features: Optional[list] = None,
+        n_splits: Optional[int] = 5,
+        n_repeats: Optional[int] = 1,
+        n_jobs: Optional[int] = None,
+    ) -> pd.Series:
+        """Cross validated score of an estimator on the registry folds
+        Returns:
+            pd.Series: mean and std score
+        """
+        results = self.search(estimator, {}, features, n_splits, n_repeats, n_jobs)
+        return results.loc[0, ["mean_score", "std_score"]]
 
     @abstractmethod
     def split_data(self, stratify: Optional[bool]):
@@ -0,0 +1,117 @@
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+ROW_FILTERS = ("drop_dupes", "remove_outliers")
+
+
+@dataclass
+class PipelineStep:
+    """One recorded cleaning call and its keyword arguments"""
+
+    name: str
+    kwargs: dict = field(default_factory=dict)
+
+    @property
+    def is_filter(self) -> bool:
+        return self.name in ROW_FILTERS
+
+    def columns_read(self) -> Optional[set]:
+        """Columns the step's result depends on. None means every column."""
+        if self.name == "drop_dupes":
+            subset = self.kwargs.get("subset")
+            if not subset:
+                return None
+            if self.kwargs.get("keep") == "latest":
+                return set(subset) | {self.kwargs.get("order_by", "date")}
+            return set(subset)
+        if self.name == "remove_outliers":
+            return set(self.kwargs.get("fields", []))
+        return set()
+
+
+class CleaningPipeline:
+    def __init__(self, steps: Optional[list] = None):
+        """Plan of recorded cleaning steps, run on demand by BaseModel.collect and
+        replayable on a new file with BaseModel.replay
+        Args:
+            steps (list, optional): recorded PipelineSteps. Defaults to None.
+        """
+        self.steps = steps or []
+        self.executed = 0
+
+    @property
+    def pending(self) -> list:
+        """Recorded steps that have not been collected yet"""
+        return self.steps[self.executed :]
+
+    def record(self, name: str, **kwargs) -> None:
+        self.steps.append(PipelineStep(name, kwargs))
+
+    def optimize(self, steps: list) -> list:
+        """Rewrite steps into stages that give the same result with less data movement:
+        - skip no-op and dead steps: outlier filters with no fields, repeated
+          drop_dupes with the same arguments, and index resets superseded by a
+          later reset
+        - push column drops ahead of row filters that do not read the column
+        - fuse consecutive row filters into one stage that is applied as one mask
+        Args:
+            steps (list): PipelineSteps in recorded order
+        Returns:
+            list: stages, each a list of steps. Filter stages may hold several steps.
+        """
+        last_reset = max(
+            (i for i, step in enumerate(steps) if step.name == "reset_index"),
+            default=None,
+        )
+        live = []
+        for i, step in enumerate(steps):
+            if step.name == "reset_index" and i != last_reset:
+                continue
+            if step.name == "remove_outliers" and not step.kwargs.get("fields"):
+                continue
+            if (
+                step.name == "drop_dupes"
+                and live
+                and live[-1].name == "drop_dupes"
+                and live[-1].kwargs == step.kwargs
+            ):
+                continue
+            live.append(step)
+
+        for i in range(len(live)):
+            if live[i].name != "drop_feature":
+                continue
+            field_name = live[i].kwargs["field"]
+            j = i
+            while j > 0 and live[j - 1].is_filter:
+                read = live[j - 1].columns_read()
+                if read is None or field_name in read:
+                    break
+                live[j - 1], live[j] = live[j], live[j - 1]
+                j -= 1
+
+        stages = []
+        for step in live:
+            if step.is_filter and stages and stages[-1][-1].is_filter:
+                stages[-1].append(step)
+            else:
+                stages.append([step])
+        return stages
+
+    def explain(self, steps: Optional[list] = None) -> str:
+        """Readable plan of the optimized stages for steps, defaulting to pending"""
+        stages = self.optimize(self.pending if steps is None else steps)
+        lines = []
+        for i, stage in enumerate(stages):
+            calls = " -> ".join(f"{step.name}({step.kwargs})" for step in stage)
+            label = "fused filter" if len(stage) > 1 else stage[0].name
+            lines.append(f"{i}: {label}: {calls}")
+        return "\n".join(lines)
+
+    def to_json(self) -> str:
+        return json.dumps([asdict(step) for step in self.steps])
+
+    @classmethod
+    def from_json(cls, text: str) -> "CleaningPipeline":
+        return cls([PipelineStep(**step) for step in json.loads(text)])
@@ -0,0 +1,90 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from module6.module6_instrumentation import instrumented
+from module6.module6_linear_engine import LinearEngine
+from module6.module6_model_object import BaseModel
+
+
+class RegressionModel(BaseModel):
+    def __init__(self, filename: str, seed: Optional[int] = None, **kwargs):
+        super().__init__(filename, seed, **kwargs)
+        self.engine = LinearEngine()
+
+    @instrumented
+    def split_data(
+        self, stratify: Optional[bool] = False, test_size: Optional[float] = 0.15
+    ) -> None:
+        """Split rows into train and test positions, reused from the split registry
+        for the same seed, rows and stratification. Split after cleaning, as the
+        positions refer to the current rows.
+        Args:
+            stratify (bool, optional): stratify on target quartile bins. Defaults to False.
+            test_size (float, optional): share of rows held out. Defaults to 0.15.
+        """
+        self.train, self.test = self.splits.train_test(
+            len(self._data()), test_size, self.seed, self._strata(stratify)
+        )
+
+    @instrumented
+    def basic_regression(self, features: Optional[list] = None) -> pd.DataFrame:
+        """Linear regression of the target on features, fitted on the train rows when
+        the data has been split. Reports r2 and rmse, and test r2 when split.
+        Args:
+            features (list, optional): features to use. Defaults to every numeric column.
+        Returns:
+            pd.DataFrame: coefficients with standard errors and t values
+        """
+        features = self._features(features)
+        self.engine.fit(
+            self._rows(self.train, features),
+            self._rows(self.train, [self.target])[:, 0],
+            columns=features,
+        )
+        self._report()
+        return self.engine.summary()
+
+    def _report(self) -> None:
+        stats = self.engine.statistics()
+        print(f"Train r2 {stats['r2']:.4f}, rmse {stats['rmse']:.4f}")
+        if self.engine.aliased:
+            print(f"Collinear features left out: {', '.join(self.engine.aliased)}")
+        if self.test is not None:
+            y_test = self._rows(self.test, [self.target])[:, 0]
+            predictions = self.engine.predict(
+                self._rows(self.test, self.engine.columns)
+            )
+            ss_res = ((y_test - predictions) ** 2).sum()
+            r2 = 1 - ss_res / ((y_test - y_test.mean()) ** 2).sum()
+            print(f"Test r2 {r2:.4f}, rmse {np.sqrt(ss_res / len(y_test)):.4f}")
+
+    @instrumented
+    def add_feature(self, field: str) -> None:
+        """Adds a feature to the fitted regression without refitting"""
+        self.engine.add_feature(self._rows(self.train, [field])[:, 0], field)
+        self._report()
+
+    @instrumented
+    def remove_feature(self, field: str) -> None:
+        """Removes a feature from the fitted regression without refitting"""
+        self.engine.remove_feature(field)
+        self._report()
+
+    @instrumented
+    def ridge_path(self, alphas) -> pd.DataFrame:
+        """r2 and rmse of ridge fits across alphas on the fitted features, with test
+        r2 when the data has been split
+        Args:
+            alphas: ridge penalties
+        Returns:
+            pd.DataFrame: scores per alpha, coefficients in attrs["coefs"]
+        """
+        if self.test is None:
+            return self.engine.ridge_path(alphas)
+        return self.engine.ridge_path(
+            alphas,
+            self._rows(self.test, self.engine.columns),
+            self._rows(self.test, [self.target])[:, 0],
+        )
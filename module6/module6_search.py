@@ -0,0 +1,208 @@
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.model_selection import ParameterGrid
+
+# arrays, estimator and folds attached once per worker by the pool initializer, so
+# each task only pickles a config index and a fold number
+_worker_data = {}
+
+
+def _init_worker(arrays: dict, estimator, configs: list, folds: list) -> None:
+    """Attach to the shared memory blocks named in arrays, or take the arrays as they
+    are when running in this process"""
+    views, blocks = {}, []
+    for name, spec in arrays.items():
+        if isinstance(spec, np.ndarray):
+            views[name] = spec
+            continue
+        block_name, shape, dtype = spec
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        views[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    _worker_data.update(
+        views, blocks=blocks, estimator=estimator, configs=configs, folds=folds
+    )
+
+
+def _run_fold(task: tuple) -> tuple:
+    config, fold = task
+    X, y = _worker_data["X"], _worker_data["y"]
+    train, test = _worker_data["folds"][fold]
+    model = clone(_worker_data["estimator"]).set_params(
+        **_worker_data["configs"][config]
+    )
+    start = time.perf_counter()
+    model.fit(X[train], y[train])
+    fit_time = time.perf_counter() - start
+    return config, fold, float(model.score(X[test], y[test])), fit_time
+
+
+def effective_jobs(n_jobs: Optional[int]) -> Optional[int]:
+    """Worker count for n_jobs as sklearn reads it: negative values count back from
+    the CPU count, so -1 uses every CPU and -2 all but one"""
+    if n_jobs is None or n_jobs > 0:
+        return n_jobs
+    if n_jobs == 0:
+        raise ValueError("n_jobs == 0 has no meaning, use None or 1 for no pool")
+    return max((os.cpu_count() or 1) + 1 + n_jobs, 1)
+
+
+class SearchRunner:
+    def __init__(
+        self,
+        estimator,
+        n_jobs: Optional[int] = None,
+        cache: Optional[dict] = None,
+    ):
+        """Cross validation and grid search over (config, fold) tasks in a process
+        pool. X and y are placed in shared memory once instead of being pickled per
+        task. Fold scores are cached by a fingerprint of X and y, the estimator, params
+        and fold, so repeating a search only fits configs and folds not yet scored.
+        Folds drawn without a seed differ on every call, so their scores never hit.
+        Args:
+            estimator: unfitted sklearn estimator
+            n_jobs (int, optional): worker processes, with -1 for every CPU. None or 1
+                runs in this process.
+            cache (dict, optional): fold score cache to read and fill. Defaults to a new one.
+        """
+        self.estimator = estimator
+        self.n_jobs = effective_jobs(n_jobs)
+        self.cache = {} if cache is None else cache
+
+    def _key(self, data_key: str, params: dict, fold: tuple) -> str:
+        sha1 = hashlib.sha1(data_key.encode())
+        sha1.update(repr(self.estimator).encode())
+        sha1.update(json.dumps(params, sort_keys=True, default=str).encode())
+        sha1.update(np.ascontiguousarray(fold[1], dtype=np.int64).tobytes())
+        return sha1.hexdigest()
+
+    def _rungs(self, n_folds: int, halving: bool, eta: int, min_folds: int) -> list:
+        """Fold budget of each round. Without halving every config gets every fold."""
+        if not halving:
+            return [n_folds]
+        rungs = []
+        budget = min_folds
+        while budget < n_folds:
+            rungs.append(budget)
+            budget *= eta
+        return rungs + [n_folds]
+
+    def search(
+        self,
+        X: np.ndarray,
+        y: np.ndarray,
+        param_grid,
+        folds: list,
+        halving: bool = False,
+        eta: int = 3,
+        min_folds: int = 1,
+    ) -> pd.DataFrame:
+        """Score every config of param_grid on folds
+        Args:
+            X (np.ndarray): features
+            y (np.ndarray): target values
+            param_grid: dict or list of dicts for sklearn's ParameterGrid
+            folds (list): (train, test) positions into X
+            halving (bool, optional): successive halving: score all configs on the
+                first folds and keep the best 1/eta for each larger fold budget.
+                Defaults to False.
+            eta (int, optional): halving rate. Defaults to 3.
+            min_folds (int, optional): folds in the first halving round. Defaults to 1.
+        Returns:
+            pd.DataFrame: params, mean and std score, folds scored and rank per config,
+                best first
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        y = np.ascontiguousarray(y, dtype=np.float64)
+        data_key = hashlib.sha1(X.data).hexdigest() + hashlib.sha1(y.data).hexdigest()
+        configs = list(ParameterGrid(param_grid))
+        keys = [
+            [self._key(data_key, params, fold) for fold in folds] for params in configs
+        ]
+        alive = list(range(len(configs)))
+        pooled = self.n_jobs is not None and self.n_jobs != 1
+        arrays = {"X": X, "y": y}
+        blocks = []
+        pool = None
+        try:
+            if pooled:
+                for name, values in list(arrays.items()):
+                    block = shared_memory.SharedMemory(
+                        create=True, size=max(values.nbytes, 1)
+                    )
+                    blocks.append(block)
+                    np.ndarray(values.shape, values.dtype, buffer=block.buf)[:] = values
+                    arrays[name] = (block.name, values.shape, values.dtype.str)
+            else:
+                _init_worker(arrays, self.estimator, configs, folds)
+            for budget in self._rungs(len(folds), halving, eta, min_folds):
+                tasks = [
+                    (config, fold)
+                    for config in alive
+                    for fold in range(budget)
+                    if keys[config][fold] not in self.cache
+                ]
+                if not pooled:
+                    results = map(_run_fold, tasks)
+                elif tasks:
+                    if pool is None:
+                        pool = ProcessPoolExecutor(
+                            max_workers=self.n_jobs,
+                            initializer=_init_worker,
+                            initargs=(arrays, self.estimator, configs, folds),
+                        )
+                    chunksize = max(1, len(tasks) // (4 * self.n_jobs))
+                    results = pool.map(_run_fold, tasks, chunksize=chunksize)
+                else:
+                    results = []
+                for config, fold, score, fit_time in results:
+                    self.cache[keys[config][fold]] = {
+                        "score": score,
+                        "fit_time": fit_time,
+                    }
+                if budget < len(folds):
+                    means = [
+                        np.mean(
+                            [self.cache[key]["score"] for key in keys[config][:budget]]
+                        )
+                        for config in alive
+                    ]
+                    keep = math.ceil(len(alive) / eta)
+                    alive = [alive[i] for i in np.argsort(means)[::-1][:keep]]
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            _worker_data.clear()
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        rows = []
+        for config, params in enumerate(configs):
+            scores = [
+                self.cache[key]["score"] for key in keys[config] if key in self.cache
+            ]
+            rows.append(
+                {
+                    "params": params,
+                    "mean_score": np.mean(scores),
+                    "std_score": np.std(scores),
+                    "folds": len(scores),
+                }
+            )
+        results = pd.DataFrame(rows)
+        results = results.sort_values(
+            ["folds", "mean_score"], ascending=False, ignore_index=True
+        )
+        results["rank"] = np.arange(1, len(results) + 1)
+        return results
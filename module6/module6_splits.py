@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+from sklearn.model_selection import (
+    RepeatedKFold,
+    RepeatedStratifiedKFold,
+    train_test_split,
+)
+
+SPLITS_SUFFIX = ".splits"
+
+
+def quantile_strata(values: np.ndarray, bins: int = 4) -> np.ndarray:
+    """Quantile bin labels of values, for stratifying a continuous target"""
+    edges = np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1])
+    return np.digitize(values, edges)
+
+
+class SplitRegistry:
+    def __init__(self, directory: Optional[str] = None):
+        """Train/test splits and cross validation folds kept as row position arrays,
+        generated once per seed, rows and stratification and reused afterwards. With a
+        directory they are saved as .npy files, so every run over the same data gets
+        identical folds. If the directory cannot be written, splits are kept in
+        memory only. Without a seed nothing is kept, and every call draws new rows.
+        Args:
+            directory (str, optional): where to persist splits. Defaults to memory only.
+        """
+        self.directory = directory
+        self._splits = {}
+
+    def _key(self, kind: str, params: dict, rows: np.ndarray, strata) -> str:
+        sha1 = hashlib.sha1(json.dumps([kind, params], sort_keys=True).encode())
+        sha1.update(np.ascontiguousarray(rows, dtype=np.int64).tobytes())
+        if strata is not None:
+            sha1.update(np.ascontiguousarray(strata).tobytes())
+        return f"{kind}-{sha1.hexdigest()[:16]}"
+
+    def _cached(self, key: str, make) -> np.ndarray:
+        if key in self._splits:
+            return self._splits[key]
+        path = os.path.join(self.directory, f"{key}.npy") if self.directory else None
+        assignment = None
+        if path and os.path.exists(path):
+            try:
+                assignment = np.load(path)
+            except (OSError, ValueError):
+                pass
+        if assignment is None:
+            assignment = make()
+            if path:
+                try:
+                    os.makedirs(self.directory, exist_ok=True)
+                    temp = f"{path}.tmp.npy"
+                    np.save(temp, assignment)
+                    os.replace(temp, path)
+                except OSError:
+                    # read-only data directories still split, without persisting
+                    self.directory = None
+        assignment.setflags(write=False)
+        self._splits[key] = assignment
+        return assignment
+
+    def train_test(
+        self,
+        n_rows: int,
+        test_size: float = 0.15,
+        seed: Optional[int] = None,
+        strata: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Train and test row positions
+        Args:
+            n_rows (int): rows in the data
+            test_size (float, optional): share of rows held out. Defaults to 0.15.
+            seed (int, optional): shuffle seed. Defaults to None, which is not cached.
+            strata (np.ndarray, optional): labels to stratify on. Defaults to None.
+        Returns:
+            tuple: sorted train positions, sorted test positions
+        """
+        rows = np.arange(n_rows)
+
+        def make() -> np.ndarray:
+            _, test = train_test_split(
+                rows, test_size=test_size, random_state=seed, stratify=strata
+            )
+            is_test = np.zeros(n_rows, dtype=bool)
+            is_test[test] = True
+            return is_test
+
+        if seed is None:
+            is_test = make()
+        else:
+            key = self._key(
+                "split", {"test_size": test_size, "seed": seed}, rows, strata
+            )
+            is_test = self._cached(key, make)
+        return np.flatnonzero(~is_test), np.flatnonzero(is_test)
+
+    def folds(
+        self,
+        rows: np.ndarray,
+        n_splits: int = 5,
+        n_repeats: int = 1,
+        seed: Optional[int] = None,
+        strata: Optional[np.ndarray] = None,
+    ) -> list:
+        """K-fold or repeated K-fold splits of the given rows
+        Args:
+            rows (np.ndarray): row positions to split, such as the train positions
+            n_splits (int, optional): folds per repeat. Defaults to 5.
+            n_repeats (int, optional): repeats. Defaults to 1.
+            seed (int, optional): shuffle seed. Defaults to None, which is not cached.
+            strata (np.ndarray, optional): labels of rows to stratify on. Defaults to None.
+        Returns:
+            list: (train, test) position arrays into the full data for each fold
+        """
+        rows = np.asarray(rows)
+
+        def make() -> np.ndarray:
+            # fold number of each row, one line per repeat
+            if strata is None:
+                cv = RepeatedKFold(
+                    n_splits=n_splits, n_repeats=n_repeats, random_state=seed
+                )
+            else:
+                cv = RepeatedStratifiedKFold(
+                    n_splits=n_splits, n_repeats=n_repeats, random_state=seed
+                )
+            assignment = np.empty((n_repeats, len(rows)), dtype=np.int16)
+            for i, (_, test) in enumerate(cv.split(rows, strata)):
+                assignment[i // n_splits, test] = i % n_splits
+            return assignment
+
+        if seed is None:
+            assignment = make()
+        else:
+            params = {"n_splits": n_splits, "n_repeats": n_repeats, "seed": seed}
+            assignment = self._cached(self._key("folds", params, rows, strata), make)
+        return [
+            (rows[repeat != fold], rows[repeat == fold])
+            for repeat in assignment
+            for fold in range(n_splits)
+        ]
+
+    def clear(self) -> None:
+        """Forget the splits held in memory. Persisted splits stay on disk."""
+        self._splits = {}
@@ -0,0 +1,309 @@
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class RunningMoments:
+    def __init__(self):
+        """Count, mean, variance, min, max and null count over a stream of chunks.
+        Chunks are combined with Chan's parallel form of Welford's update, so two
+        accumulators can also be merged."""
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.nulls = 0
+
+    def update(self, values: np.ndarray) -> None:
+        present = values[~np.isnan(values)]
+        self.nulls += len(values) - len(present)
+        if len(present):
+            other = RunningMoments()
+            other.count = len(present)
+            other.mean = float(present.mean())
+            other.m2 = float(((present - other.mean) ** 2).sum())
+            other.min = float(present.min())
+            other.max = float(present.max())
+            self.merge(other)
+
+    def merge(self, other: "RunningMoments") -> None:
+        count = self.count + other.count
+        if count:
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / count
+            self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.nulls += other.nulls
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else np.nan
+
+
+class QuantileSketch:
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        """KLL quantile sketch. Items are kept in levels of compactors where an item at
+        level h stands for 2**h inputs; full levels are sorted and every other item is
+        promoted. Rank error is about 1.7/k, using O(k) memory for any stream length.
+        Args:
+            k (int, optional): size of the top compactor. Defaults to 200.
+            seed (int, optional): seed for the compaction offsets. Defaults to None.
+        """
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - 1 - level
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # an odd item out stays at this level
+                keep = items[:1] if len(items) % 2 else items[:0]
+                paired = items[len(keep) :]
+                promoted = paired[self.rng.integers(2) :: 2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate(
+                    [self.levels[level + 1], promoted]
+                )
+            level += 1
+
+    def update(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    def quantile(self, q) -> np.ndarray:
+        """Approximate quantiles for q in [0, 1]"""
+        items = np.concatenate(self.levels)
+        if not len(items):
+            return np.full(np.shape(q), np.nan)
+        weights = np.concatenate(
+            [
+                np.full(len(level_items), 2.0**level)
+                for level, level_items in enumerate(self.levels)
+            ]
+        )
+        order = np.argsort(items, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        ranks = np.asarray(q) * cumulative[-1]
+        positions = np.searchsorted(cumulative, ranks, side="left")
+        return items[order][np.minimum(positions, len(items) - 1)]
+
+
+class DistinctSketch:
+    def __init__(self, precision: int = 14):
+        """HyperLogLog distinct count over hashed values, about 1.04 / sqrt(2**precision)
+        relative error using 2**precision one-byte registers.
+        Args:
+            precision (int, optional): index bits. Defaults to 14.
+        """
+        self.precision = precision
+        self.registers = np.zeros(2**precision, dtype=np.uint8)
+
+    def update(self, values) -> None:
+        hashes = pd.util.hash_array(np.asarray(values))
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        width = 64 - self.precision
+        remaining = hashes & np.uint64((1 << width) - 1)
+        # rank is the position of the first set bit in the remaining bits
+        _, exponent = np.frexp(remaining.astype(np.float64))
+        rank = np.where(remaining == 0, width + 1, width - exponent + 1).astype(
+            np.uint8
+        )
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "DistinctSketch") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self.registers.astype(np.float64))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            # linear counting is more accurate for small cardinalities
+            estimate = m * np.log(m / zeros)
+        return float(estimate)
+
+
+class TopKSketch:
+    def __init__(self, capacity: int = 1000):
+        """Misra-Gries frequent items. Exact while a column has at most capacity
+        distinct values; otherwise any value with more than n / capacity occurrences
+        is kept and its count is under by at most n / capacity.
+        Args:
+            capacity (int, optional): counters kept. Defaults to 1000.
+        """
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.int64)
+        self.total = 0
+
+    def update(self, values: pd.Series) -> None:
+        other = TopKSketch(self.capacity)
+        counts = values.value_counts(dropna=False)
+        other.counts = counts[counts > 0]
+        other.total = len(values)
+        self.merge(other)
+
+    def merge(self, other: "TopKSketch") -> None:
+        counts = self.counts.add(other.counts, fill_value=0)
+        if len(counts) > self.capacity:
+            cutoff = np.partition(counts.to_numpy(), -(self.capacity + 1))[
+                -(self.capacity + 1)
+            ]
+            counts = counts[counts > cutoff] - cutoff
+        self.counts = counts.astype(np.int64)
+        self.total += other.total
+
+    def most_common(self, n: int = 5, normalize: bool = False) -> pd.Series:
+        top = self.counts.sort_values(ascending=False).head(n)
+        return top / self.total if normalize else top
+
+
+class StreamingStatistics:
+    def __init__(self, k: int = 200, top_k: int = 1000, precision: int = 14):
+        """One-pass, mergeable per-column statistics for data read in chunks: moments
+        and quantile sketches for numeric columns, null counts, distinct counts and
+        frequent values for every column.
+        Args:
+            k (int, optional): quantile sketch size. Defaults to 200.
+            top_k (int, optional): frequent value counters per column. Defaults to 1000.
+            precision (int, optional): HyperLogLog precision. Defaults to 14.
+        """
+        self.k = k
+        self.top_k = top_k
+        self.precision = precision
+        self.rows = 0
+        self.head = None
+        self.dtypes = None
+        self.moments = {}
+        self.quantiles = {}
+        self.distinct = {}
+        self.frequent = {}
+        self.nulls = {}
+
+    @classmethod
+    def from_chunks(
+        cls, chunks: Iterable[pd.DataFrame], **kwargs
+    ) -> "StreamingStatistics":
+        stats = cls(**kwargs)
+        for chunk in chunks:
+            stats.update(chunk)
+        return stats
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if self.head is None:
+            self.head = chunk.head()
+            self.dtypes = chunk.dtypes
+        self.rows += len(chunk)
+        for column in chunk.columns:
+            series = chunk[column]
+            self.nulls[column] = self.nulls.get(column, 0) + int(series.isna().sum())
+            self.distinct.setdefault(column, DistinctSketch(self.precision)).update(
+                series.dropna()
+            )
+            self.frequent.setdefault(column, TopKSketch(self.top_k)).update(series)
+            if pd.api.types.is_numeric_dtype(series.dtype):
+                values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+                self.moments.setdefault(column, RunningMoments()).update(values)
+                self.quantiles.setdefault(column, QuantileSketch(self.k)).update(values)
+
+    def merge(self, other: "StreamingStatistics") -> None:
+        """Fold in statistics gathered from another part of the data"""
+        if self.head is None:
+            self.head, self.dtypes = other.head, other.dtypes
+        self.rows += other.rows
+        for column, nulls in other.nulls.items():
+            self.nulls[column] = self.nulls.get(column, 0) + nulls
+        for mine, theirs in (
+            (self.moments, other.moments),
+            (self.quantiles, other.quantiles),
+            (self.distinct, other.distinct),
+            (self.frequent, other.frequent),
+        ):
+            for column, sketch in theirs.items():
+                if column in mine:
+                    mine[column].merge(sketch)
+                else:
+                    mine[column] = sketch
+
+    def describe(
+        self, percentiles: Tuple[float, ...] = (0.25, 0.5, 0.75)
+    ) -> pd.DataFrame:
+        """Like DataFrame.describe for the numeric columns, with sketched percentiles"""
+        rows = {}
+        for column, moments in self.moments.items():
+            quantiles = self.quantiles[column].quantile(list(percentiles))
+            rows[column] = [moments.count, moments.mean, moments.std, moments.min]
+            rows[column] += list(quantiles) + [moments.max]
+        index = ["count", "mean", "std", "min"]
+        index += [f"{p:.0%}" for p in percentiles] + ["max"]
+        return pd.DataFrame(rows, index=index)
+
+    def isna(self) -> pd.Series:
+        return pd.Series(self.nulls)
+
+    def nunique(self) -> pd.Series:
+        """Approximate distinct non-null values per column"""
+        return pd.Series(
+            {column: round(sketch.count()) for column, sketch in self.distinct.items()}
+        )
+
+    def value_counts(self, field: str, n: int = 5, normalize: bool = True) -> pd.Series:
+        return self.frequent[field].most_common(n, normalize)
+
+    def outlier_bounds(self, fields: list, range: float = 1.5) -> dict:
+        """IQR outlier bounds per field from the quantile sketches
+        Args:
+            fields (list): numeric fields
+            range (float, optional): IQR range. Defaults to 1.5.
+        Returns:
+            dict: field to (lower range, upper range)
+        """
+        bounds = {}
+        for field in fields:
+            Q1, Q3 = self.quantiles[field].quantile([0.25, 0.75])
+            iqr = Q3 - Q1
+            bounds[field] = (float(Q1 - range * iqr), float(Q3 + range * iqr))
+        return bounds
+
+
+def stream_sorted(
+    chunks: Iterable[pd.DataFrame],
+    field: str,
+    groupby: Optional[str] = None,
+    asc: bool = False,
+    n: int = 5,
+):
+    """Chunked equivalent of EDACleaning.print_sorted: group means merged from
+    per-chunk sums and counts, or the top n rows merged across chunks"""
+    if groupby:
+        sums = None
+        for chunk in chunks:
+            part = chunk.groupby(groupby, observed=True)[field].agg(["sum", "count"])
+            sums = part if sums is None else sums.add(part, fill_value=0)
+        return (sums["sum"] / sums["count"]).sort_values(ascending=asc)
+    top = None
+    for chunk in chunks:
+        top = chunk if top is None else pd.concat([top, chunk])
+        top = top.sort_values(field, ascending=asc).head(n)
+    return top
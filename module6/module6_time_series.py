@@ -0,0 +1,219 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.stattools import adfuller
+
+from module6.module6_data_loader import DATE_FORMAT
+
+FREQUENCIES = ("D", "W", "M")
+
+
+def parse_days(dates) -> np.ndarray:
+    """int64 days since 1970-01-01 for a date column, parsing strings with DATE_FORMAT
+    when they match it. Missing dates come back as the NaT sentinel, the minimum int64;
+    mask them with missing_days."""
+    dates = pd.Series(dates)
+    if not pd.api.types.is_datetime64_any_dtype(dates.dtype):
+        try:
+            dates = pd.to_datetime(dates, format=DATE_FORMAT)
+        except ValueError:
+            dates = pd.to_datetime(dates)
+    return dates.to_numpy(dtype="datetime64[D]").view(np.int64)
+
+
+def missing_days(days: np.ndarray) -> np.ndarray:
+    """Mask of the missing dates among days from parse_days"""
+    return np.isnat(days.view("datetime64[D]"))
+
+
+def periods(days: np.ndarray, freq: str) -> np.ndarray:
+    """Period numbers for days: the day itself, weeks starting on Monday, or months"""
+    if freq == "D":
+        return days
+    if freq == "W":
+        # 1970-01-01 was a Thursday, so shifting by 3 days puts Mondays on the boundary
+        return (days + 3) // 7
+    if freq == "M":
+        return days.astype("datetime64[D]").astype("datetime64[M]").view(np.int64)
+    raise ValueError(f"Unknown frequency: {freq}")
+
+
+def period_starts(start: int, n: int, freq: str) -> pd.DatetimeIndex:
+    numbers = np.arange(start, start + n)
+    if freq == "D":
+        return pd.DatetimeIndex(numbers.astype("datetime64[D]"))
+    if freq == "W":
+        return pd.DatetimeIndex((numbers * 7 - 3).astype("datetime64[D]"))
+    return pd.DatetimeIndex(numbers.astype("datetime64[M]").astype("datetime64[D]"))
+
+
+class PeriodAggregate:
+    def __init__(self, freq: str):
+        """Count, sum and sum of squares of a value per period, in dense arrays over
+        the periods from the earliest to the latest seen"""
+        self.freq = freq
+        self.start = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.sums = np.zeros(0)
+        self.squares = np.zeros(0)
+
+    def _grow(self, low: int, high: int) -> None:
+        """Widen the arrays to cover periods low to high"""
+        if not len(self.counts):
+            self.start = low
+        stop = max(high + 1, self.start + len(self.counts))
+        start = min(low, self.start)
+        if start == self.start and stop == self.start + len(self.counts):
+            return
+        before = self.start - start
+        for name in ("counts", "sums", "squares"):
+            old = getattr(self, name)
+            new = np.zeros(stop - start, dtype=old.dtype)
+            new[before : before + len(old)] = old
+            setattr(self, name, new)
+        self.start = start
+
+    def update(self, days: np.ndarray, values: np.ndarray, sign: int = 1) -> None:
+        """Add rows, or take them back out with sign -1"""
+        if not len(days):
+            return
+        numbers = periods(days, self.freq)
+        self._grow(int(numbers.min()), int(numbers.max()))
+        offsets = numbers - self.start
+        size = len(self.counts)
+        self.counts += sign * np.bincount(offsets, minlength=size)
+        self.sums += sign * np.bincount(offsets, weights=values, minlength=size)
+        self.squares += sign * np.bincount(
+            offsets, weights=values * values, minlength=size
+        )
+
+    def means(self) -> pd.Series:
+        """Mean per period between the first and last period with rows, with empty
+        periods taking the next period's mean as time_series_plot backfills them"""
+        occupied = np.flatnonzero(self.counts)
+        if not len(occupied):
+            return pd.Series(dtype=np.float64)
+        first, last = occupied[0], occupied[-1] + 1
+        counts = self.counts[first:last]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = self.sums[first:last] / counts
+        # backfill: each empty period takes the mean of the next occupied one
+        filled = np.flatnonzero(counts)
+        means = means[filled[np.searchsorted(filled, np.arange(len(counts)))]]
+        return pd.Series(
+            means, index=period_starts(self.start + first, last - first, self.freq)
+        )
+
+
+def rolling_statistics(values: np.ndarray, windows: list) -> dict:
+    """Trailing rolling means and standard deviations for several windows at once,
+    from one cumulative sum of the values and of their squares. Values are centered
+    first so the differences of the sums keep their precision.
+    Returns:
+        dict: window to (mean, std) arrays, NaN until a window is full
+    """
+    center = values.mean() if len(values) else 0.0
+    centered = values - center
+    sums = np.concatenate([[0.0], np.cumsum(centered)])
+    squares = np.concatenate([[0.0], np.cumsum(centered * centered)])
+    statistics = {}
+    for window in windows:
+        mean = np.full(len(values), np.nan)
+        std = np.full(len(values), np.nan)
+        if window <= len(values):
+            total = sums[window:] - sums[:-window]
+            total_squares = squares[window:] - squares[:-window]
+            mean[window - 1 :] = total / window + center
+            if window > 1:
+                variance = (total_squares - total * total / window) / (window - 1)
+                std[window - 1 :] = np.sqrt(np.maximum(variance, 0.0))
+        statistics[window] = (mean, std)
+    return statistics
+
+
+class TimeSeriesCache:
+    def __init__(self, dates, values, frequencies: tuple = FREQUENCIES):
+        """Daily, weekly and monthly aggregates of a value, built from dates parsed
+        once and kept current by adding or removing rows, so series and stationarity
+        tests are read from compact arrays instead of regrouping the table
+        Args:
+            dates: date column, datetimes or DATE_FORMAT strings
+            values: value column, such as the target
+            frequencies (tuple, optional): "D", "W" and/or "M". Defaults to all three.
+        """
+        self.aggregates = {freq: PeriodAggregate(freq) for freq in frequencies}
+        self.version = 0
+        self._adf = {}
+        self.add(dates, values)
+
+    def _update(self, dates, values, sign: int) -> None:
+        days = parse_days(dates)
+        values = np.asarray(values, dtype=np.float64)
+        present = ~np.isnan(values) & ~missing_days(days)
+        for aggregate in self.aggregates.values():
+            aggregate.update(days[present], values[present], sign)
+        self.version += 1
+
+    def add(self, dates, values) -> None:
+        self._update(dates, values, 1)
+
+    def remove(self, dates, values) -> None:
+        self._update(dates, values, -1)
+
+    def series(self, freq: str = "D") -> pd.Series:
+        """Mean value per period, backfilled over empty periods"""
+        return self.aggregates[freq].means()
+
+    def rolling(self, freq: str = "D", windows: list = [10]) -> pd.DataFrame:
+        """The series with rolling means and standard deviations for each window"""
+        series = self.series(freq)
+        columns = {"mean": series.to_numpy()}
+        for window, (mean, std) in rolling_statistics(
+            series.to_numpy(), windows
+        ).items():
+            columns[f"rolling_mean_{window}"] = mean
+            columns[f"rolling_std_{window}"] = std
+        return pd.DataFrame(columns, index=series.index)
+
+    def adf(self, freq: str = "D") -> pd.Series:
+        """Augmented Dickey-Fuller test of the series, kept until the data changes"""
+        key = (freq, self.version)
+        if key not in self._adf:
+            result = adfuller(self.series(freq).to_numpy())
+            output = pd.Series(
+                result[0:4],
+                index=[
+                    "Test Statistic",
+                    "p-value",
+                    "#Lags Used",
+                    "Number of Observations Used",
+                ],
+            )
+            for level, value in result[4].items():
+                output[f"Critical Value ({level})"] = value
+            self._adf = {
+                cached: value
+                for cached, value in self._adf.items()
+                if cached[1] == self.version
+            }
+            self._adf[key] = output
+        return self._adf[key]
+
+    def stationarity(
+        self, frequencies: Optional[list] = None, windows: list = [10]
+    ) -> dict:
+        """ADF tests and rolling statistics for several frequencies and windows in one
+        call
+        Args:
+            frequencies (list, optional): frequencies to analyse. Defaults to all cached.
+            windows (list, optional): rolling windows, in periods. Defaults to [10].
+        Returns:
+            dict: "adf", a frame of test results with one column per frequency, and
+                "rolling", frequency to its rolling statistics frame
+        """
+        frequencies = frequencies or list(self.aggregates)
+        return {
+            "adf": pd.DataFrame({freq: self.adf(freq) for freq in frequencies}),
+            "rolling": {freq: self.rolling(freq, windows) for freq in frequencies},
+        }
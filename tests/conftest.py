@@ -0,0 +1,17 @@
+import os
+
+import pytest
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "module6", "kc_house_data.csv")
+
+
+@pytest.fixture
+def kc_csv(tmp_path):
+    """The first 2000 King County rows in a temp directory, so caches land there"""
+    path = tmp_path / "kc_house_data.csv"
+    with open(DATA) as source, open(path, "w") as target:
+        for i, line in enumerate(source):
+            if i > 2000:
+                break
+            target.write(line)
+    return str(path)
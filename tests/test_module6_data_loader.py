@@ -0,0 +1,26 @@
+from module6.module6_data_loader import DataLoader
+from module6.module6_regression_model import RegressionModel
+
+
+def test_king_county_schema_applied_by_default(kc_csv):
+    df = DataLoader().load(kc_csv)
+    assert df["date"].dtype.kind == "M"
+    assert df["zipcode"].dtype == "category"
+    assert df["price"].dtype == "float32"
+    assert DataLoader(schema={}).load(kc_csv)["zipcode"].dtype == "int64"
+
+
+def test_model_loads_with_king_county_schema(kc_csv, tmp_path):
+    model = RegressionModel(kc_csv, storage="mmap", memo_dir=str(tmp_path / "memo"))
+    assert model.df["date"].dtype.kind == "M"
+    assert model.df["zipcode"].dtype == "category"
+
+
+def test_load_mapped_without_writable_cache_dir(kc_csv, tmp_path, monkeypatch):
+    blocker = tmp_path / "blocker"
+    blocker.write_text("")
+    loader = DataLoader()
+    monkeypatch.setattr(loader, "cache_path", lambda filename: str(blocker / "cache"))
+    table = loader.load_mapped(kc_csv)
+    assert len(table) == 2000
+    assert table.frame()["date"].dtype.kind == "M"
@@ -0,0 +1,20 @@
+import pandas as pd
+
+from module6.module6_data_loader import KING_COUNTY_SCHEMA
+from module6.module6_memo import hash_column
+from module6.module6_regression_model import RegressionModel
+
+
+def test_hash_parsed_date_column():
+    dates = pd.Series(pd.to_datetime(["20141013T000000", "20141209T000000"]))
+    assert hash_column(dates) == hash_column(dates.copy())
+    assert hash_column(dates) != hash_column(dates + pd.Timedelta(days=1))
+    assert hash_column(dates.diff()) == hash_column(dates.diff())
+
+
+def test_time_series_on_parsed_dates(kc_csv):
+    model = RegressionModel(kc_csv, schema=KING_COUNTY_SCHEMA)
+    model.set_target("price")
+    assert model.df["date"].dtype.kind == "M"
+    assert len(model.time_series().series("D")) > 0
+    assert model.memoized(len, model.df, columns=["date"]) == len(model.df)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from module6.module6_regression_model import RegressionModel
+
+
+def _model(kc_csv, tmp_path, **kwargs):
+    model = RegressionModel(
+        kc_csv,
+        split_dir=str(tmp_path / "splits"),
+        memo_dir=str(tmp_path / "memo"),
+        **kwargs,
+    )
+    model.set_target("price")
+    return model
+
+
+def _assert_correlations_current(model):
+    matrix = model.correlation_matrix()
+    expected = model.df[list(matrix.columns)].astype(float).corr()
+    pd.testing.assert_frame_equal(matrix, expected, check_exact=False, atol=1e-8)
+
+
+def test_in_place_edit_refits_correlations_in_memory(kc_csv, tmp_path):
+    model = _model(kc_csv, tmp_path)
+    model.correlation_matrix()
+    model.df["price"] = np.log(model.df["price"])
+    model.remove_outliers(["sqft_living"])
+    _assert_correlations_current(model)
+
+
+def test_added_column_checked_against_table_in_mmap(kc_csv, tmp_path):
+    model = _model(kc_csv, tmp_path, storage="mmap")
+    model.df["double_price"] = model.df["price"] * 2
+    model.correlation_matrix()
+    model.reset_index()
+    _assert_correlations_current(model)
+
+
+def test_mmap_frame_edits_survive_changes(kc_csv, tmp_path):
+    model = _model(kc_csv, tmp_path, storage="mmap")
+    model.df["price"] = np.log(model.df["price"])
+    model.df["double_price"] = model.df["price"] * 2
+    expected = model.df.copy()
+    model.remove_outliers(["sqft_living"])
+    assert model.table is None
+    kept = model.df.index
+    pd.testing.assert_frame_equal(model.df, expected.loc[kept])
+    model.reset_index()
+    model.drop_feature("double_price")
+    assert "double_price" not in model.df
+    assert model.df["price"].max() < 20
+    _assert_correlations_current(model)
+
+
+def test_unedited_mmap_frame_stays_mapped(kc_csv, tmp_path):
+    model = _model(kc_csv, tmp_path, storage="mmap")
+    model.correlation_matrix()
+    model.remove_outliers(["sqft_living"])
+    model.reset_index()
+    assert model.table is not None
+    _assert_correlations_current(model)
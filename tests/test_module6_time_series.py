@@ -0,0 +1,19 @@
+import numpy as np
+
+from module6.module6_time_series import TimeSeriesCache, parse_days
+
+
+def test_missing_date_is_left_out():
+    dates = ["20141013T000000", None, "20141015T000000"]
+    cache = TimeSeriesCache(dates, [1.0, 5.0, 3.0])
+    series = cache.series("D")
+    assert list(series) == [1.0, 3.0, 3.0]
+    assert cache.series("M").tolist() == [2.0]
+    cache.remove(dates, [1.0, 5.0, 3.0])
+    assert cache.series("W").empty
+
+
+def test_parse_days():
+    days = parse_days(["19700102T000000", "19700201T000000"])
+    assert days.tolist() == [1, 31]
+    assert days.dtype == np.int64